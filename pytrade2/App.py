@@ -12,11 +12,13 @@ from typing import Dict
 import pandas as pd
 import yaml
 
+from metrics.HostMetrics import HostMetrics
 from metrics.MetricServer import MetricServer
 
 from exch.Exchange import Exchange
 from metrics.Metrics import Metrics
 from strategy.common.StrategyBase import StrategyBase
+from strategy.feed.SharedFeeds import SharedFeeds
 
 
 class App:
@@ -70,12 +72,13 @@ class App:
             conf = {}
         return conf
 
-    def _load_config(self) -> dict:
+    def _load_config(self, strategy: str = None) -> dict:
         """
         Load config from cfg folder respecting the order: defaults, app.yaml, environment vars
+        :param strategy: strategy of host process to load config for, pytrade2.strategy if not set
         """
         args = self._parse_args()
-        strategy_key = "pytrade2.strategy"
+        strategy_key, strategies_key = "pytrade2.strategy", "pytrade2.strategies"
         config: Dict[str, str] = defaultdict()
 
         # App configs
@@ -88,12 +91,15 @@ class App:
         extra_config = self._read_config_file(f"cfg/{args['config']}", required=True) \
             if args.get("config") else defaultdict()
 
+        # Host process runs several strategies
+        strategies = args.get(strategies_key) or extra_config.get(strategies_key) or app_config.get(strategies_key)
         # Determine strategy name
-        final_strategy = args.get(strategy_key) or extra_config.get(strategy_key) or app_config.get(strategy_key)
-        if not final_strategy:
-            sys.exit("Please set pytrade2.strategy")
+        final_strategy = strategy or (None if strategies else args.get(strategy_key)
+                                      or extra_config.get(strategy_key) or app_config.get(strategy_key))
+        if not final_strategy and not strategies:
+            sys.exit("Please set pytrade2.strategy or pytrade2.strategies")
         # Read strategy config
-        strategy_config = self._read_config_file(f"cfg/{final_strategy.lower()}.yaml")
+        strategy_config = self._read_config_file(f"cfg/{final_strategy.lower()}.yaml") if final_strategy else {}
 
         # Create final config in priority order
         config.update(app_config)
@@ -102,6 +108,7 @@ class App:
         config.update(os.environ)
         config.update(args)
         config["pytrade2.strategy"] = final_strategy
+        config[strategies_key] = strategies
 
         self._logger.info(self._config_msg(config))
 
@@ -137,28 +144,57 @@ class App:
         parser = argparse.ArgumentParser()
         parser.add_argument('--pytrade2.strategy',
                             help='Strategy class, example: --pytrade2.strategy SimpleKerasStraategy')
+        parser.add_argument('--pytrade2.strategies',
+                            help='Strategy classes of host process, sharing exchange connections and feeds')
         parser.add_argument('--config', help='Additional config file')
         return vars(parser.parse_args())
 
-    def _create_strategy(self) -> StrategyBase:
+    def _create_strategy(self, config: dict = None, exchange: Exchange = None) -> StrategyBase:
         """ Create strategy class"""
-        exchange = Exchange(self.config)
+        config = config or self.config
+        exchange = exchange or Exchange(config)
 
-        strategy_file = "strategy." + self.config["pytrade2.strategy"]
+        strategy_file = "strategy." + config["pytrade2.strategy"]
         strategy_class_name = strategy_file.split(".")[-1]
         self._logger.info(f"Running the strategy: {strategy_file}")
         module = importlib.import_module(strategy_file, strategy_class_name)
-        strategy = getattr(module, strategy_class_name)(config=self.config, exchange_provider=exchange)
+        strategy = getattr(module, strategy_class_name)(config=config, exchange_provider=exchange)
         return strategy
 
+    def _create_host_strategies(self) -> [StrategyBase]:
+        """ Create strategies of host process. They share exchange connections and bid ask, level2 feeds.
+        Each strategy has own config, broker and trade db. """
+        configs = [self._load_config(name.strip()) for name in self.config["pytrade2.strategies"].split(",")
+                   if name.strip()]
+        for config in configs:
+            config["pytrade2.host.feeds.shared"] = True
+        # Exchange feeds subscribe to tickers and candles periods of all strategies
+        self.config["pytrade2.tickers"] = self.union_of(configs, "pytrade2.tickers")
+        periods = self.union_of(configs, "pytrade2.feed.candles.periods")
+        if periods:
+            self.config["pytrade2.feed.candles.periods"] = periods
+
+        host_exchange = Exchange(self.config)
+        host_exchange.shared_feeds = SharedFeeds()
+        return [self._create_strategy(config, host_exchange.for_strategy(config)) for config in configs]
+
+    @staticmethod
+    def union_of(configs: [dict], key: str) -> str:
+        """ Union of comma separated values of the key in configs, in order of appearance """
+        values = [value.strip(" []'") for config in configs for value in str(config.get(key) or "").split(",")]
+        return ",".join(dict.fromkeys(value for value in values if value))
+
     def run(self):
         """
         Application entry point
         """
-        self.strategy = self._create_strategy()
+        self.strategies = self._create_host_strategies() if self.config.get("pytrade2.strategies") \
+            else [self._create_strategy()]
 
-        # Create prometheus metrics endpoint
-        MetricServer.metrics = Metrics("pytrade2", self.strategy.__class__.__name__)
+        # Create prometheus metrics endpoint. Each strategy of host process has own metrics.
+        strategy_names = [strategy.__class__.__name__ for strategy in self.strategies]
+        MetricServer.metrics = HostMetrics("pytrade2", strategy_names) if self.config.get("pytrade2.strategies") \
+            else Metrics("pytrade2", strategy_names[0])
         MetricServer.app_config = {key: val for key, val in self.secured_config(self.config) if
                                    key.startswith("pytrade2")}
         MetricServer.auth_token = self.config.get("pytrade2.prometheus.token")
@@ -168,13 +204,14 @@ class App:
         threading.Timer(60, self.watchdog_check).start()
 
         # Run and wait until the end
-        self.strategy.run()
+        for strategy in self.strategies:
+            strategy.run()
 
         self._logger.info("Started the app")
 
     def watchdog_check(self):
         """ If not alive, reset websocket feed"""
-        if not self.strategy.is_alive():
+        if not all(strategy.is_alive() for strategy in self.strategies):
             self._logger.error("Strategy seems to be dead, exiting")
             os.kill(os.getpid(), signal.SIGINT)
         else:
@@ -4,7 +4,7 @@ from pathlib import Path
 from threading import RLock
 from typing import Optional, Dict
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func
 from sqlalchemy.orm import sessionmaker
 
 from datamodel.Trade import Trade
@@ -27,6 +27,8 @@ class Broker:
         self.min_trade_interval = timedelta(seconds=10)
         self.last_trade_time = datetime.utcnow() - self.min_trade_interval
         self.allow_trade = config.get("pytrade2.broker.trade.allow", False)
+        # Trades of this ticker only, when each ticker has own broker
+        self.trade_ticker = config.get("pytrade2.broker.ticker")
         self.__init_db__(config)
 
         # Load saved opened trade
@@ -79,10 +81,12 @@ class Broker:
 
     def read_last_opened_trade(self) -> Trade:
         """ Returns current opened trade, stored in db or none """
-        return self.db_session \
+        query = self.db_session \
             .query(Trade) \
-            .where(Trade.status.isnot(TradeStatus.closed)) \
-            .order_by(Trade.open_time.desc()).first()
+            .where(Trade.status.isnot(TradeStatus.closed))
+        if self.trade_ticker:
+            query = query.where(func.lower(Trade.ticker) == self.trade_ticker.lower())
+        return query.order_by(Trade.open_time.desc()).first()
 
     def update_cur_trade_status(self):
         """ Update current trade sl/tp status from exchange.
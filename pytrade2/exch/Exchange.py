@@ -9,11 +9,19 @@ from exch.Broker import Broker
 class Exchange:
     """ Provides binance or huobi exchange with broker and feed support"""
 
-    def __init__(self, config: Dict[str, str]):
+    def __init__(self, config: Dict[str, str], host: "Exchange" = None):
         self._logger = logging.getLogger(self.__class__.__name__)
 
         self.config = config
-        self.exchanges = defaultdict()
+        # Strategy of a host process shares exchanges, their connections and feeds, with other strategies
+        self.host = host
+        self.exchanges = host.exchanges if host else defaultdict()
+        # Strategy feeds, shared by strategies of a host process
+        self.shared_feeds = host.shared_feeds if host else None
+
+    def for_strategy(self, config: Dict[str, str]) -> "Exchange":
+        """ Provider for one strategy of a host process: shared exchanges and feeds, own brokers """
+        return Exchange(config, host=self)
 
     def exchange(self, exch_name: str):
         """ Get or create given exchange with broker and feed """
@@ -24,15 +32,22 @@ class Exchange:
             exchange_file = f"exch.{exch_name}"
             self._logger.info(f"Providing exchange: {exchange_file}")
             module = importlib.import_module(exchange_file, exchange_class_name)
-            exchange_object = getattr(module, exchange_class_name)(config=self.config)
+            exchange_config = self.host.config if self.host else self.config
+            exchange_object = getattr(module, exchange_class_name)(config=exchange_config)
             self.exchanges[exch_name] = exchange_object
 
         # Get old or created exchange
         return self.exchanges[exch_name]
 
-    def broker(self, exch_name: str) -> Broker:
-        """ Get or create broker for given exchange"""
-        return self.exchange(exch_name).broker()
+    def broker(self, exch_name: str, ticker: str = None) -> Broker:
+        """ Get or create broker for given exchange. Broker of the ticker only, if ticker is set.
+        Each strategy of a host process has own broker. """
+        exchange = self.exchange(exch_name)
+        if not ticker and not self.host:
+            return exchange.broker()
+        if not hasattr(exchange, "broker_of"):
+            raise ValueError(f"Exchange {exch_name} does not support broker per strategy or ticker")
+        return exchange.broker_of(self.config, ticker)
 
     def websocket_feed(self, exch_name: str):
         """ Get or create streaming feed for given exchange"""
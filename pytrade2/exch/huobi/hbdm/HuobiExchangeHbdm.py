@@ -1,5 +1,5 @@
 import logging
-from typing import Optional
+from typing import Optional, Dict
 
 from exch.huobi.hbdm.HuobiRestClient import HuobiRestClient
 from exch.huobi.hbdm.HuobiWebSocketClient import HuobiWebSocketClient
@@ -22,6 +22,8 @@ class HuobiExchangeHbdm:
         self.__candles_feed: Optional[HuobiCandlesFeedHbdm] = None
 
         self.__broker: Optional[HuobiBrokerHbdm] = None
+        # Brokers by strategy and ticker
+        self.__brokers_of: Dict[tuple, HuobiBrokerHbdm] = {}
 
     def _key_secret(self):
         key = self.config["pytrade2.exchange.huobi.connector.key"]
@@ -37,6 +39,19 @@ class HuobiExchangeHbdm:
                                             ws_feed=self.websocket_feed())
         return self.__broker
 
+    def broker_of(self, config: dict, ticker: str = None):
+        """ Own broker of a strategy, of one ticker if set. Shares clients and feed with other brokers.
+        Trade db is of the strategy in config. """
+        key = (config["pytrade2.strategy"], ticker)
+        if key not in self.__brokers_of:
+            broker_config = {**config, "pytrade2.tickers": ticker, "pytrade2.broker.ticker": ticker} \
+                if ticker else config
+            self.__brokers_of[key] = HuobiBrokerHbdm(broker_config,
+                                                     rest_client=self._rest_client(),
+                                                     ws_client=self._websocket_client_broker(),
+                                                     ws_feed=self.websocket_feed())
+        return self.__brokers_of[key]
+
     def candles_feed(self):
         if not self.__candles_feed:
             self.__candles_feed = HuobiCandlesFeedHbdm(self.config,
@@ -193,6 +193,10 @@ class HuobiWebSocketClient:
         self._logger.debug(f"Adding consumer, topic: {topic}, params: {params}, consumer: {consumer}")
         # topic -> (params, consumer obj)
         self._consumers[topic].add((json.dumps(params), consumer))
+        if self.is_opened and self._ws:
+            # Consumer of another strategy in the host process, added after the socket is opened
+            self._logger.info(f"Subscribing to socket data, params: {params}, consumer: {consumer}")
+            self._ws.send(json.dumps(params))
 
     def close(self):
         self._logger.info("Closing socket")
@@ -74,6 +74,8 @@ class HuobiBrokerHbdm(OrderCreator, TrailingStopSupport, OrderFollower, Broker):
 
     def on_socket_data(self, topic, msg):
         """ Got subscribed data from socket"""
+        # Socket thread is shared by brokers of host process strategies
+        MetricServer.bind_strategy(self.config.get("pytrade2.strategy"))
         try:
             status = msg.get("status")
             self._logger.info(f"Got order event: {msg}")
@@ -104,6 +106,7 @@ class HuobiBrokerHbdm(OrderCreator, TrailingStopSupport, OrderFollower, Broker):
 
     def on_ticker(self, ticker: dict):
         """On price changed, set metric and move trailing stop"""
+        MetricServer.bind_strategy(self.config.get("pytrade2.strategy"))
 
         with self.trade_lock:
             if self.cur_trade and self.cur_trade.ticker == ticker["symbol"]:
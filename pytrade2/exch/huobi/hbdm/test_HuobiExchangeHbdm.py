@@ -0,0 +1,47 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from exch.huobi.hbdm.HuobiExchangeHbdm import HuobiExchangeHbdm
+from metrics.MetricServer import MetricServer
+
+
+class TestHuobiExchangeHbdm(TestCase):
+
+    def setUp(self):
+        MetricServer.metrics = MagicMock()
+
+    def new_exchange(self) -> HuobiExchangeHbdm:
+        exchange = HuobiExchangeHbdm({"pytrade2.strategies": "Strategy1,Strategy2"})
+        exchange._rest_client = MagicMock()
+        exchange._websocket_client_broker = MagicMock()
+        exchange.websocket_feed = MagicMock()
+        return exchange
+
+    @staticmethod
+    def strategy_config(strategy: str) -> dict:
+        return {"pytrade2.strategy": strategy, "pytrade2.tickers": "BTC-USDT,ETH-USDT"}
+
+    @patch("exch.huobi.hbdm.HuobiExchangeHbdm.HuobiBrokerHbdm")
+    def test_broker_of__per_strategy_and_ticker(self, broker_class):
+        broker_class.side_effect = lambda config, **kwargs: MagicMock(config=config)
+        exchange = self.new_exchange()
+        config1, config2 = self.strategy_config("Strategy1"), self.strategy_config("Strategy2")
+
+        broker1, broker2 = exchange.broker_of(config1), exchange.broker_of(config2)
+        ticker_broker = exchange.broker_of(config1, "ETH-USDT")
+
+        # Broker is created once for the strategy and ticker
+        self.assertIs(broker1, exchange.broker_of(config1))
+        self.assertIs(ticker_broker, exchange.broker_of(config1, "ETH-USDT"))
+        self.assertEqual(3, broker_class.call_count)
+        # Brokers share clients of the exchange
+        for call in broker_class.call_args_list:
+            self.assertIs(exchange._rest_client.return_value, call.kwargs["rest_client"])
+            self.assertIs(exchange._websocket_client_broker.return_value, call.kwargs["ws_client"])
+        # Each strategy broker has own trade db, named by the strategy in broker config
+        self.assertListEqual(["Strategy1", "Strategy2", "Strategy1"],
+                             [broker.config["pytrade2.strategy"] for broker in (broker1, broker2, ticker_broker)])
+        # Ticker broker trades only its ticker
+        self.assertEqual("ETH-USDT", ticker_broker.config["pytrade2.tickers"])
+        self.assertEqual("ETH-USDT", ticker_broker.config["pytrade2.broker.ticker"])
+        self.assertEqual("BTC-USDT,ETH-USDT", config1["pytrade2.tickers"])
@@ -0,0 +1,36 @@
+import json
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from exch.huobi.hbdm.HuobiWebSocketClient import HuobiWebSocketClient
+
+
+class TestHuobiWebSocketClient(TestCase):
+    @staticmethod
+    def new_client() -> HuobiWebSocketClient:
+        return HuobiWebSocketClient(host="api.hbdm.com", path="/linear-swap-ws", access_key="key", secret_key="secret",
+                                    be_spot=False, is_broker=False)
+
+    def test_add_consumer__before_open(self):
+        client = self.new_client()
+        client._ws = MagicMock()
+        params = {"sub": "market.BTC-USDT.bbo"}
+
+        client.add_consumer("market.BTC-USDT.bbo", params, "consumer1")
+
+        # Subscribed later, when the socket is opened
+        client._ws.send.assert_not_called()
+        client._on_open(client._ws)
+        client._ws.send.assert_called_once_with(json.dumps(params))
+
+    def test_add_consumer__after_open(self):
+        client = self.new_client()
+        client._ws = MagicMock()
+        client._on_open(client._ws)
+        params = {"sub": "market.BTC-USDT.bbo"}
+
+        # Consumer of another strategy of the host process
+        client.add_consumer("market.BTC-USDT.bbo", params, "consumer2")
+
+        client._ws.send.assert_called_once_with(json.dumps(params))
+        self.assertSetEqual({(json.dumps(params), "consumer2")}, client._consumers["market.BTC-USDT.bbo"])
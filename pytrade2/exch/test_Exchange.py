@@ -0,0 +1,42 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from exch.Exchange import Exchange
+
+
+class TestExchange(TestCase):
+    @staticmethod
+    def new_host_exchange() -> Exchange:
+        host = Exchange({"pytrade2.strategies": "Strategy1,Strategy2"})
+        host.exchanges["test.TestExchange"] = MagicMock()
+        return host
+
+    def test_broker__single_strategy(self):
+        exchange = Exchange({"pytrade2.strategy": "Strategy1"})
+        exchange.exchanges["test.TestExchange"] = MagicMock()
+
+        broker = exchange.broker("test.TestExchange")
+
+        self.assertIs(exchange.exchanges["test.TestExchange"].broker.return_value, broker)
+        exchange.exchanges["test.TestExchange"].broker_of.assert_not_called()
+
+    def test_broker__own_broker_of_each_host_strategy(self):
+        host = self.new_host_exchange()
+        config1, config2 = {"pytrade2.strategy": "Strategy1"}, {"pytrade2.strategy": "Strategy2"}
+        exchange1, exchange2 = host.for_strategy(config1), host.for_strategy(config2)
+
+        exchange1.broker("test.TestExchange")
+        exchange2.broker("test.TestExchange", "BTC-USDT")
+
+        # Exchange is shared, broker is of the strategy config
+        self.assertIs(exchange1.exchange("test.TestExchange"), exchange2.exchange("test.TestExchange"))
+        broker_of = host.exchanges["test.TestExchange"].broker_of
+        self.assertListEqual([(config1, None), (config2, "BTC-USDT")], [call.args for call in broker_of.call_args_list])
+        host.exchanges["test.TestExchange"].broker.assert_not_called()
+
+    def test_broker__exchange_without_broker_of(self):
+        host = self.new_host_exchange()
+        host.exchanges["test.TestExchange"] = MagicMock(spec=["broker"])
+
+        with self.assertRaises(ValueError):
+            host.for_strategy({"pytrade2.strategy": "Strategy1"}).broker("test.TestExchange")
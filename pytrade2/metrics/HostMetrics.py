@@ -0,0 +1,31 @@
+from threading import local
+
+from metrics.Metrics import Metrics
+
+
+class HostMetrics:
+    """
+    Metrics of host process running several strategies. Each strategy has own metrics with strategy subsystem,
+    so strategies don't overwrite each other gauges. A thread works with metrics of the strategy bound to it,
+    threads not bound to a strategy, like shared feeds, use host metrics.
+    """
+
+    def __init__(self, app_name: str, strategy_names: [str]):
+        self.host = Metrics(app_name, "host")
+        self.by_strategy = {name: Metrics(app_name, name) for name in dict.fromkeys(strategy_names)}
+        self._local = local()
+
+    def bind(self, strategy_name: str):
+        """ Current thread works with metrics of the strategy """
+        self._local.metrics = self.by_strategy.get(strategy_name)
+
+    def current(self) -> Metrics:
+        return getattr(self._local, "metrics", None) or self.host
+
+    @property
+    def strategy(self) -> Metrics.Strategy:
+        return self.current().strategy
+
+    @property
+    def broker(self) -> Metrics.Broker:
+        return self.current().broker
@@ -6,14 +6,15 @@ from functools import wraps
 from flask import Flask, request, abort
 from prometheus_client import make_wsgi_app
 
+from metrics.HostMetrics import HostMetrics
 from metrics.Metrics import Metrics
 
 
 class MetricServer:
     """Work with Prometheus metrics"""
 
-    # Metric names to refer from the app
-    metrics: Metrics = None
+    # Metric names to refer from the app. HostMetrics of the current thread strategy in host process.
+    metrics: Metrics | HostMetrics = None
     app_config: dict[str, any] = {}
     app_params: dict[str, any] = {}
 
@@ -69,6 +70,12 @@ class MetricServer:
         logging.debug(f"Will return app info: {MetricServer.app_params}")
         return json.dumps(MetricServer.app_params)
 
+    @staticmethod
+    def bind_strategy(strategy_name: str):
+        """ Metrics of current thread are of the strategy, if host process runs several strategies """
+        if isinstance(MetricServer.metrics, HostMetrics):
+            MetricServer.metrics.bind(strategy_name)
+
     @staticmethod
     def start_http_server():
         """ Start Flask thread to expose metrics to prometheus server."""
@@ -1,4 +1,4 @@
-from prometheus_client import Gauge
+from prometheus_client import Gauge, Counter, Histogram
 
 from datamodel.Trade import Trade
 
@@ -43,12 +43,74 @@ class Metrics:
                 self.train_exec_duration_sec = Gauge("strategy_learn_train_exec_duration_sec",
                                                      "Model fit() process duration", namespace=app_name,
                                                      subsystem=strategy)
+                self.model_save_duration_sec = Gauge("strategy_learn_model_save_duration_sec",
+                                                     "Model write to disk duration", namespace=app_name,
+                                                     subsystem=strategy)
+                self.model_save_bytes = Gauge("strategy_learn_model_save_bytes",
+                                              "Written model size", namespace=app_name, subsystem=strategy)
+                self.stage_duration_sec = Histogram("strategy_learn_stage_duration_sec",
+                                                    "Duration of learning stages", ["stage"],
+                                                    namespace=app_name, subsystem=strategy,
+                                                    buckets=(.01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300,
+                                                             600))
+                self.train_iterations = Gauge("strategy_learn_train_iterations",
+                                              "Epochs or boosting iterations of last fit", namespace=app_name,
+                                              subsystem=strategy)
+                self.budget_overrun_sec = Gauge("strategy_learn_budget_overrun_sec",
+                                                "Last fit time over train budget", namespace=app_name,
+                                                subsystem=strategy)
+                self.budget_stops = Counter("strategy_learn_budget_stops",
+                                            "Fits stopped by train time budget", namespace=app_name,
+                                            subsystem=strategy)
+                self.new_rows = Gauge("strategy_learn_new_rows",
+                                      "New labeled rows since last learn", namespace=app_name, subsystem=strategy)
+                self.drift = Gauge("strategy_learn_drift",
+                                   "Recent features drift from train features", namespace=app_name,
+                                   subsystem=strategy)
+                self.skipped = Counter("strategy_learn_skipped",
+                                       "Learns skipped by scheduler", namespace=app_name, subsystem=strategy)
+                self.deferred = Counter("strategy_learn_deferred",
+                                        "Learns deferred because of high load", namespace=app_name,
+                                        subsystem=strategy)
 
         class Process:
             def __init__(self, app_name: str, strategy: str):
                 self.process_duration_sec = Gauge("strategy_process_duration_sec",
                                                   "Process new data duration", namespace=app_name,
                                                   subsystem=strategy)
+                self.stage_duration_sec = Histogram("strategy_process_stage_duration_sec",
+                                                    "Duration of process new data stages", ["stage"],
+                                                    namespace=app_name, subsystem=strategy,
+                                                    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5,
+                                                             1, 2.5, 5, 10))
+                self.skipped = Counter("strategy_process_skipped", "Processing skipped by stale or unchanged data",
+                                       ["reason"], namespace=app_name, subsystem=strategy)
+                self.degraded = Counter("strategy_process_degraded", "Actions degraded under overload",
+                                        ["action"], namespace=app_name, subsystem=strategy)
+                self.degradation_level = Gauge("strategy_process_degradation_level",
+                                               "Processing degradation level, 0 if not overloaded",
+                                               namespace=app_name, subsystem=strategy)
+                self.lock_wait_sec = Histogram("strategy_process_lock_wait_sec", "Wait for strategy data lock",
+                                               ["mode"], namespace=app_name, subsystem=strategy,
+                                               buckets=(.0001, .0005, .001, .0025, .005, .01, .025, .05, .1, .25,
+                                                        .5, 1, 2.5))
+                self.lock_hold_sec = Histogram("strategy_process_lock_hold_sec", "Hold of strategy data lock",
+                                               ["mode"], namespace=app_name, subsystem=strategy,
+                                               buckets=(.0001, .0005, .001, .0025, .005, .01, .025, .05, .1, .25,
+                                                        .5, 1, 2.5))
+                self.ticker_duration_sec = Histogram("strategy_process_ticker_duration_sec",
+                                                     "Processing duration of a ticker, including batch prediction",
+                                                     ["ticker"], namespace=app_name, subsystem=strategy,
+                                                     buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5,
+                                                              1, 2.5, 5, 10))
+                self.ticker_memory_bytes = Gauge("strategy_process_ticker_memory_bytes",
+                                                 "Memory of ticker feed data", ["ticker"], namespace=app_name,
+                                                 subsystem=strategy)
+                self.reaction_latency_sec = Histogram("strategy_process_reaction_latency_sec",
+                                                      "From triggering data arrival to processed prediction and order",
+                                                      namespace=app_name, subsystem=strategy,
+                                                      buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10,
+                                                               30, 60))
 
         class Prediction:
             def __init__(self, app_name: str, strategy: str):
@@ -0,0 +1,37 @@
+from threading import Thread
+from unittest import TestCase
+
+from metrics.HostMetrics import HostMetrics
+from metrics.MetricServer import MetricServer
+
+
+class TestHostMetrics(TestCase):
+    # Prometheus collectors are registered once per process
+    metrics = HostMetrics("test_host_metrics", ["Strategy1", "Strategy2"])
+
+    def test_bind__strategies_have_own_metrics(self):
+        def set_gauge(strategy_name: str, value: float):
+            self.metrics.bind(strategy_name)
+            self.metrics.strategy.signal.signal.set(value)
+
+        threads = [Thread(target=set_gauge, args=("Strategy1", 1)), Thread(target=set_gauge, args=("Strategy2", -1))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, self.metrics.by_strategy["Strategy1"].strategy.signal.signal._value.get())
+        self.assertEqual(-1, self.metrics.by_strategy["Strategy2"].strategy.signal.signal._value.get())
+        # Not bound thread works with host metrics
+        self.assertIs(self.metrics.host.broker, self.metrics.broker)
+
+    def test_bind_strategy__metrics_of_bound_strategy(self):
+        prev_metrics, MetricServer.metrics = MetricServer.metrics, self.metrics
+        try:
+            MetricServer.bind_strategy("Strategy2")
+            self.assertIs(self.metrics.by_strategy["Strategy2"].strategy, MetricServer.metrics.strategy)
+            # Unknown strategy falls back to host metrics
+            MetricServer.bind_strategy("Strategy3")
+            self.assertIs(self.metrics.host.strategy, MetricServer.metrics.strategy)
+        finally:
+            MetricServer.metrics = prev_metrics
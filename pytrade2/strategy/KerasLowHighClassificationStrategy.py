@@ -13,6 +13,8 @@ from strategy.common.LearnDataBalancer import LearnDataBalancer
 from strategy.common.SignalClassificationStrategyBase import SignalClassificationStrategyBase
 from strategy.common.StrategyBase import StrategyBase
 from strategy.features.LongCandleFeatures import LongCandleFeatures
+from strategy.inference.KerasPredictor import KerasPredictor
+from strategy.inference.TfLitePredictor import TfLitePredictor
 from strategy.signal.OrderParamsByLastCandle import OrderParamsByLastCandle
 
 
@@ -20,6 +22,10 @@ class KerasLowHighClassificationStrategy(SignalClassificationStrategyBase):
     """
      Predict long candle signal, classification model, target signals: -1, 0, 1
    """
+
+    # Predict on each close of smallest candles period
+    processing_triggers = "bar"
+
     def __init__(self, config: Dict, exchange_provider: Exchange):
         self.websocket_feed = None
 
@@ -34,7 +40,8 @@ class KerasLowHighClassificationStrategy(SignalClassificationStrategyBase):
         # Should keep 1 more candle for targets
         predict_window = config["pytrade2.strategy.predict.window"]
         self.target_period = predict_window
-        self.candles_feed.candles_cnt_by_interval[self.target_period] += 1
+        for slot in self.ticker_slots.values():
+            slot.candles_feed.candles_cnt_by_interval[self.target_period] += 1
 
         self._logger.info(f"Target period: {self.target_period}")
 
@@ -48,16 +55,38 @@ class KerasLowHighClassificationStrategy(SignalClassificationStrategyBase):
         # Balance by signal
         return LearnDataBalancer.balanced(x, y)
 
+    def change_key(self):
+        """ Features are of candles only """
+        return self.candles_change_key()
+
     def prepare_last_x(self) -> (pd.DataFrame, pd.DataFrame, pd.DataFrame):
-        return LongCandleFeatures.features_of(self.candles_feed.candles_by_interval,
-                                              self.candles_feed.candles_cnt_by_interval)
+        with self.data_lock.read():
+            return LongCandleFeatures.features_of(self.candles_feed.candles_by_interval,
+                                                  self.candles_feed.candles_cnt_by_interval)
 
     def predict(self, x):
-        x_trans = self.X_pipe.transform(x)
-        y_pred_raw = self.model.predict(x_trans, verbose=0)
-        y_pred_trans = self.y_pipe.inverse_transform(y_pred_raw)
-        last_signal = y_pred_trans[-1][0] if y_pred_trans.size > 0 else 0
-        return pd.DataFrame(data=[{"signal": last_signal}], index=x.tail(1).index)
+        return self.predict_batch({self.ticker: x})[self.ticker]
+
+    def predict_batch(self, xs: dict) -> dict:
+        """ Predict last rows of all tickers in one model call """
+        x_trans = self.transform_last_rows(xs)
+        y_pred_raw = self.predict_model.predict(x_trans) if self.predict_model \
+            else self.model.predict(x_trans, verbose=0)
+        y_pred_trans = self.inverse_transform_rows(list(xs), y_pred_raw)
+        signals = y_pred_trans[:, 0] if y_pred_trans.size > 0 else [0] * len(xs)
+        return {ticker: pd.DataFrame(data=[{"signal": signal}], index=x.tail(1).index)
+                for (ticker, x), signal in zip(xs.items(), signals)}
+
+    def create_predict_model(self, model):
+        """ Low latency predictor for the model, quantized tflite if configured """
+        if not self.is_compiled_predict:
+            return None
+        if self.predict_quantization:
+            predictor = TfLitePredictor.of(model, self.predict_quantization, self.recent_X_trans,
+                                           self.predict_quantization_tolerance)
+            if predictor:
+                return predictor
+        return KerasPredictor.of(model)
 
     def process_prediction(self, y_pred: pd.DataFrame):
         signal = y_pred['signal'].iloc[-1]
@@ -7,9 +7,11 @@ from sklearn.multioutput import MultiOutputRegressor
 
 from metrics.MetricServer import MetricServer
 from exch.Exchange import Exchange
+from strategy.common.ParallelMultiOutputRegressor import ParallelMultiOutputRegressor
 from strategy.common.StrategyBase import StrategyBase
 from strategy.features.LowHighTargets import LowHighTargets
 from strategy.features.MultiIndiFeatures import MultiIndiFeatures
+from strategy.inference.LgbCompiledModel import LgbCompiledModel
 from strategy.signal.SignalByFutLowHigh import SignalByFutLowHigh
 
 
@@ -18,6 +20,9 @@ class LgbLowHighRegressionStrategy(StrategyBase):
      Lgb regression, multiple indicators are features, predicts low/high
    """
 
+    # Predict on each close of smallest candles period
+    processing_triggers = "bar"
+
     def __init__(self, config: Dict, exchange_provider: Exchange):
         self.websocket_feed = None
         StrategyBase.__init__(self, config=config,
@@ -37,6 +42,9 @@ class LgbLowHighRegressionStrategy(StrategyBase):
         self.model_name = "MultiOutputRegressorLgb"
         self.history_days = config.get("pytrade2.feed.candles.history.days", 2)
         self.indi_params = config.get("pytrade2.features.indicators")
+        # Fit low and high models concurrently, with optional threads budget per model
+        self.is_parallel_fit = config.get("pytrade2.strategy.learn.parallel.enabled", True)
+        self.parallel_fit_threads = config.get("pytrade2.strategy.learn.parallel.threads")
 
         self._logger.info(f"Target period: {self.target_period}")
 
@@ -45,8 +53,12 @@ class LgbLowHighRegressionStrategy(StrategyBase):
 
         return bool(self.candles_feed.candles_by_interval)
 
+    def change_key(self):
+        """ Last candles and last closed bar by clock, because candles are also read from downloads """
+        return self.candles_change_key() + (pd.Timestamp.utcnow().floor(self.min_candles_period()),)
+
     def prepare_xy(self) -> (pd.DataFrame, pd.DataFrame):
-        with self.data_lock:
+        with self.data_lock.read():
             x = MultiIndiFeatures.multi_indi_features(self.candles_feed.candles_by_interval, params=self.indi_params)
 
             # Candles with minimal period
@@ -62,30 +74,35 @@ class LgbLowHighRegressionStrategy(StrategyBase):
     def prepare_last_x(self) -> (pd.DataFrame, pd.DataFrame, pd.DataFrame):
         self._logger.debug(f"Preparing last x. Candles by interval: {self.candles_feed.candles_by_interval.keys()}")
 
-        with self.data_lock:
-            self.candles_feed.read_candles()
-
-        if self._logger.isEnabledFor(logging.DEBUG):
-            self._logger.debug("Last candles:\n" + "\n".join(
-                [f"{period} : {candles.tail()}" for period, candles in
-                 self.candles_feed.candles_by_interval.items()]))
-        x = MultiIndiFeatures.multi_indi_features_last(
-            self.candles_feed.candles_by_interval) if self.candles_feed.candles_by_interval else pd.DataFrame.empty
+        # Downloads are read without lock, candles are swapped under short write lock
+        self.candles_feed.read_candles()
+
+        with self.data_lock.read():
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug("Last candles:\n" + "\n".join(
+                    [f"{period} : {candles.tail()}" for period, candles in
+                     self.candles_feed.candles_by_interval.items()]))
+            x = MultiIndiFeatures.multi_indi_features_last(
+                self.candles_feed.candles_by_interval) if self.candles_feed.candles_by_interval else pd.DataFrame.empty
         self._logger.debug(f"Prepared last x: {x}")
         return x
 
     def predict(self, x):
-        # Save to buffer, actual persist by schedule of data persister
-        self.data_persister.save_last_data(self.ticker, {'x': x})
-        with self.data_lock:
-            x_trans = self.X_pipe.transform(x)
-            y_arr = self.model.predict(x_trans)
-            y_arr = self.y_pipe.inverse_transform(y_arr)
-            y_arr = y_arr.reshape((-1, 2))[-1]  # Last and only row
-            fut_low_diff, fut_high_diff = y_arr[0], y_arr[1]
-            y_df = pd.DataFrame(data={'fut_low_diff': fut_low_diff, 'fut_high_diff': fut_high_diff},
-                                index=x.tail(1).index)
-        return y_df
+        return self.predict_batch({self.ticker: x})[self.ticker]
+
+    def predict_batch(self, xs: dict) -> dict:
+        """ Predict last rows of all tickers in one model call """
+        for ticker, x in xs.items():
+            # Save to buffer, actual persist by schedule of data persister
+            self.data_persister.save_last_data(ticker, {'x': x})
+        with self.data_lock.read():
+            # Each ticker is scaled by own pipes, so low and high are in its price units
+            x_trans = self.transform_last_rows(xs)
+            y_arr = (self.predict_model or self.model).predict(x_trans)
+            y_arr = self.inverse_transform_rows(list(xs), y_arr)  # Row per ticker
+        return {ticker: pd.DataFrame(data={'fut_low_diff': [fut_low_diff], 'fut_high_diff': [fut_high_diff]},
+                                     index=x.tail(1).index)
+                for (ticker, x), (fut_low_diff, fut_high_diff) in zip(xs.items(), y_arr)}
 
     def process_prediction(self, y_pred: pd.DataFrame):
         # Calc signal
@@ -156,14 +173,34 @@ class LgbLowHighRegressionStrategy(StrategyBase):
     def create_model(self, X_size, y_size):
         if not self.model:
             lgb_model = lgb.LGBMRegressor(verbose=-1)
-            self.model = MultiOutputRegressor(lgb_model)
+            # Load last saved model
+            self.model = self.model_persister.load_last_model(MultiOutputRegressor(lgb_model))
         self._logger.info(f'Created lgb model: {self.model}')
         return self.model
 
-    def apply_params(self, params: dict) -> None:
+    def fit_model(self, model, X, y, sample_weight=None):
+        """ Fit low and high models concurrently, within train budget if set """
+        if (self.is_parallel_fit or self.train_budget) and isinstance(model, MultiOutputRegressor):
+            model = ParallelMultiOutputRegressor.of(model, self.parallel_fit_threads)
+        if self.train_budget:
+            return self.train_budget.fit_lgb(model, X, y, sample_weight)
+        return super().fit_model(model, X, y, sample_weight)
+
+    def create_predict_model(self, model):
+        """ Trees compiled to numpy for fast prediction """
+        return LgbCompiledModel.compiled_or_model(model) if self.is_compiled_predict else None
+
+    def prepare_params(self, params: dict):
+        """ Download and resample candles for new periods in background
+        :return prepared candles by ticker """
+        history_days = int(params.get("history_days", self.history_days))
+        return {ticker: slot.candles_feed.prepare_periods(params["features_candles_periods"], history_days)
+                for ticker, slot in self.ticker_slots.items() if slot.candles_feed}
+
+    def apply_params(self, params: dict, prepared=None) -> None:
         """ After last model and params read from mlflow, apply params to strategy"""
         self._logger.info("Applying new params")
-        super().apply_params(params)
+        super().apply_params(params, prepared)
 
         with self.data_lock:
             # Signal calculator should be recreated with new params
@@ -173,8 +210,11 @@ class LgbLowHighRegressionStrategy(StrategyBase):
                                                   self.take_profit_max_coeff, self.comissionpct, self.price_precision)
             self._logger.info(f"Updated signal calc: {self.signal_calc}")
 
-            # Set new history days and candles periods
-            self.candles_feed.apply_history_days(self.history_days)
-            periods = params["features_candles_periods"]
-            self.candles_feed.apply_periods(periods, self.history_days)
+            # Set new history days and candles periods of each ticker
+            for ticker, slot in self.ticker_slots.items():
+                if prepared and ticker in prepared:
+                    slot.candles_feed.apply_prepared_periods(prepared[ticker])
+                else:
+                    slot.candles_feed.apply_history_days(self.history_days)
+                    slot.candles_feed.apply_periods(params["features_candles_periods"], self.history_days)
             MetricServer.app_params["candles_cnt_by_interval"] = self.candles_feed.candles_cnt_by_interval
@@ -4,6 +4,8 @@ from numpy import ndarray
 from exch.Exchange import Exchange
 from strategy.common.StrategyBase import StrategyBase
 from strategy.features.PredictBidAskFeatures import PredictBidAskFeatures
+from strategy.inference.KerasPredictor import KerasPredictor
+from strategy.inference.TfLitePredictor import TfLitePredictor
 from strategy.signal.SignalByFutBidAsk import SignalByFutBidAsk
 
 
@@ -12,6 +14,9 @@ class BidAskRegressionStrategyBase(StrategyBase):
     Listen price data from web socket, predict future low/high
     """
 
+    # Predict on each bid ask tick
+    processing_triggers = "bid_ask"
+
     def __init__(self, config: Dict, exchange_provider: Exchange):
         self.websocket_feed = None
 
@@ -30,18 +35,23 @@ class BidAskRegressionStrategyBase(StrategyBase):
         self._logger.info("Strategy parameters:\n" + "\n".join(
             [f"{key}: {value}" for key, value in self.config.items() if key.startswith("pytrade2.strategy.")]))
 
+    def change_key(self):
+        """ Last tick, level2 and candles times """
+        return self.feeds_change_key()
+
     def prepare_last_x(self) -> (pd.DataFrame, ndarray):
         """ Get last X for prediction"""
-        return PredictBidAskFeatures.last_features_of(self.bid_ask_feed.bid_ask,
-                                                      1,  # For diff
-                                                      self.level2_feed.level2,
-                                                      self.candles_feed.candles_by_interval,
-                                                      self.candles_feed.candles_cnt_by_interval,
-                                                      past_window=self.past_window)
+        with self.data_lock.read():
+            return PredictBidAskFeatures.last_features_of(self.bid_ask_feed.bid_ask,
+                                                          1,  # For diff
+                                                          self.level2_feed.level2,
+                                                          self.candles_feed.candles_by_interval,
+                                                          self.candles_feed.candles_cnt_by_interval,
+                                                          past_window=self.past_window)
 
     def prepare_xy(self) -> (pd.DataFrame, pd.DataFrame):
         """ Prepare train data """
-        with self.data_lock:
+        with self.data_lock.read():
             # Copy data for this thread only
             bid_ask = self.bid_ask_feed.bid_ask.copy()
             level2 = self.level2_feed.level2.copy()
@@ -54,16 +64,34 @@ class BidAskRegressionStrategyBase(StrategyBase):
             self.predict_window,
             self.past_window)
 
+    def prepare_xy_since(self, features_since, targets_since) -> (pd.DataFrame, pd.DataFrame):
+        """ New train data for feature store """
+        with self.data_lock.read():
+            # Copy data for this thread only
+            bid_ask = self.bid_ask_feed.bid_ask.copy()
+            level2 = self.level2_feed.level2.copy()
+
+        return PredictBidAskFeatures.features_targets_since(
+            bid_ask,
+            level2,
+            self.candles_feed.candles_by_interval,
+            self.candles_feed.candles_cnt_by_interval,
+            self.predict_window,
+            self.past_window,
+            features_since,
+            targets_since)
+
     def predict(self, x) -> pd.DataFrame:
         # X - features with absolute values, x_prepared - nd array fith final scaling and normalization
-        x_trans = self.X_pipe.transform(x)
+        x_trans = (self.predict_X_pipe or self.X_pipe).transform(x)
 
         # Predict
-        y = self.model.predict(x_trans, verbose=0)
+        predict_model = self.slot_predict_model()
+        y = predict_model.predict(x_trans) if predict_model else self.model.predict(x_trans, verbose=0)
         y = y.reshape((-1, 4))
 
         # Get prediction result
-        y = self.y_pipe.inverse_transform(y)
+        y = (self.predict_y_pipe or self.y_pipe).inverse_transform(y)
         (bid_max_fut_diff, bid_spread_fut, ask_min_fut_diff, ask_spread_fut) = y[-1]  # if y.shape[0] < 2 else y
         y_df = self.bid_ask_feed.bid_ask.loc[x.index][["bid", "ask"]]
         y_df["bid_max_fut"] = y_df["bid"] + bid_max_fut_diff
@@ -72,6 +100,21 @@ class BidAskRegressionStrategyBase(StrategyBase):
         y_df["ask_max_fut"] = y_df["ask_min_fut"] + ask_spread_fut
         return y_df
 
+    def slot_predict_model(self):
+        """ Predictor of current ticker slot """
+        return self.predict_model
+
+    def create_predict_model(self, model):
+        """ Low latency predictor for the model, quantized tflite if configured """
+        if not self.is_compiled_predict:
+            return None
+        if self.predict_quantization:
+            predictor = TfLitePredictor.of(model, self.predict_quantization, self.recent_X_trans,
+                                           self.predict_quantization_tolerance)
+            if predictor:
+                return predictor
+        return KerasPredictor.of(model)
+
     def process_prediction(self, y_pred) -> int:
         """ Process last prediction, open a new order, save history if needed
         @:return open signal where signal can be 0,-1,1 """
@@ -9,10 +9,13 @@ from sklearn.preprocessing import RobustScaler, MinMaxScaler, FunctionTransforme
 from exch.Exchange import Exchange
 from strategy.common.BidAskRegressionStrategyBase import BidAskRegressionStrategyBase
 from strategy.features.PredictBidAskFeatures import PredictBidAskFeatures
+from strategy.common.TickerSlot import TickerSlot
+from strategy.inference.StatefulLstmPredictor import StatefulLstmPredictor
 
 
 class LSTMBidAskRegressionStrategyBase(BidAskRegressionStrategyBase):
     """ LSTM Strategies base class with lstm window support"""
+    stateful_predictor = TickerSlot.Attr()
 
     def __init__(self, config: Dict, exchange_provider: Exchange):
         BidAskRegressionStrategyBase.__init__(self, config=config, exchange_provider=exchange_provider)
@@ -20,6 +23,11 @@ class LSTMBidAskRegressionStrategyBase(BidAskRegressionStrategyBase):
         self.lstm_window_size = config["pytrade2.strategy.lstm.window.size"]
         self.min_xy_len = self.lstm_window_size + 1
         self._logger.info(f"LSTM window size: {self.lstm_window_size}")
+        # Keep lstm state between predictions and feed only new timestep instead of the whole window
+        self.is_lstm_stateful = config.get("pytrade2.strategy.lstm.stateful", False)
+        # Reprime lstm state from the window every N steps, window size by default
+        reprime_steps = config.get("pytrade2.strategy.lstm.stateful.reprime.steps")
+        self.lstm_reprime_steps = int(reprime_steps) if reprime_steps not in (None, "") else None
 
     def create_pipe(self, X, y) -> (Pipeline, Pipeline):
         """ Create feature and target pipelines to use for transform and inverse transform """
@@ -42,6 +50,25 @@ class LSTMBidAskRegressionStrategyBase(BidAskRegressionStrategyBase):
         y_pipe.fit(y)
         return x_pipe, y_pipe
 
+    def create_predict_model(self, model):
+        """ Stateful lstm predictor if configured, primed from the last window on first prediction """
+        if self.is_compiled_predict and self.is_lstm_stateful:
+            predictor = StatefulLstmPredictor.of(model, self.lstm_reprime_steps)
+            if predictor:
+                return predictor
+        return super().create_predict_model(model)
+
+    def slot_predict_model(self):
+        """ Stateful predictor keeps recurrent state of one ticker sequence,
+        so each ticker slot predicts by own copy of the stateful predictor """
+        predict_model = self.predict_model
+        if not isinstance(predict_model, StatefulLstmPredictor):
+            return predict_model
+        if not (self.stateful_predictor and self.stateful_predictor.is_of(predict_model)):
+            # First prediction of the ticker or the model is updated
+            self.stateful_predictor = predict_model.with_own_state()
+        return self.stateful_predictor
+
     @staticmethod
     def reshape_x(x, window_shape):
         arr = x.values if isinstance(x, pd.DataFrame) else x
@@ -52,10 +79,10 @@ class LSTMBidAskRegressionStrategyBase(BidAskRegressionStrategyBase):
 
     def prepare_last_x(self) -> pd.DataFrame:
         """ Reshape last features to lstm window"""
-        x = PredictBidAskFeatures.last_features_of(self.bid_ask_feed.bid_ask,
-                                                   self.lstm_window_size,
-                                                   self.level2_feed.level2,
-                                                   self.candles_feed.candles_by_interval,
-                                                   self.candles_feed.candles_cnt_by_interval,
-                                                   past_window=self.past_window)
-        return x
+        with self.data_lock.read():
+            return PredictBidAskFeatures.last_features_of(self.bid_ask_feed.bid_ask,
+                                                          self.lstm_window_size,
+                                                          self.level2_feed.level2,
+                                                          self.candles_feed.candles_by_interval,
+                                                          self.candles_feed.candles_cnt_by_interval,
+                                                          past_window=self.past_window)
@@ -0,0 +1,106 @@
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class LearnScheduler:
+    """
+    Decides if learning is due instead of retraining at each learn interval.
+    Learning is triggered by enough new labeled rows, stale model or drift of recent features from train features.
+    While processing is slow or feed buffers are long, learning is deferred to not compete with inference.
+    """
+    learn, skip, defer = "learn", "skip", "defer"
+
+    def __init__(self,
+                 min_new_rows: int = 100,
+                 max_staleness: pd.Timedelta = pd.Timedelta("1h"),
+                 drift_threshold: float = 3.0,
+                 max_process_duration_sec: float = 1.0,
+                 max_queue_depth: int = 1000,
+                 max_defer: pd.Timedelta = pd.Timedelta("10min"),
+                 recent_rows: int = 100):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.min_new_rows = min_new_rows
+        self.max_staleness = max_staleness
+        # Max shift of recent features mean from train mean, in train standard deviations
+        self.drift_threshold = drift_threshold
+        self.max_process_duration_sec = max_process_duration_sec
+        self.max_queue_depth = max_queue_depth
+        # Learn anyway if deferred for this time
+        self.max_defer = max_defer
+
+        self.last_learn_time: Optional[datetime] = None
+        # Last labeled row time used by previous learn
+        self.labeled_until: Optional[pd.Timestamp] = None
+        self.deferred_since: Optional[datetime] = None
+        self.train_mean, self.train_std = None, None
+        self.recent_x = deque(maxlen=recent_rows)
+        # Moving average of processing duration
+        self.process_duration_sec = 0.0
+
+    def observe_x(self, x):
+        """ Remember features of recent prediction to check drift """
+        if self.train_mean is None:
+            return
+        rows = np.asarray(x, dtype=float)
+        if rows.size and rows.size % len(self.train_mean) == 0:
+            self.recent_x.extend(rows.reshape(-1, len(self.train_mean)))
+
+    def observe_process_duration(self, duration_sec: float, alpha: float = 0.2):
+        self.process_duration_sec = alpha * duration_sec + (1 - alpha) * self.process_duration_sec
+
+    def drift(self) -> float:
+        """ Max shift of recent features mean from train features mean, in train standard deviations """
+        if self.train_mean is None or not self.recent_x:
+            return 0.0
+        recent_mean = np.mean(np.array(self.recent_x), axis=0)
+        return float(np.nanmax(np.abs(recent_mean - self.train_mean) / self.train_std))
+
+    def decide(self, new_rows: int, queue_depth: int, now: datetime = None) -> (str, str):
+        """ Learn, skip or defer learning
+        :param new_rows: labeled rows after labeled_until
+        :param queue_depth: received rows not processed yet
+        :return decision and reason """
+        now = now or datetime.utcnow()
+        if self.last_learn_time is None:
+            return self.learn, "first learn"
+        if not new_rows:
+            return self.skip, "no new labeled rows"
+
+        drift = self.drift()
+        if new_rows >= self.min_new_rows:
+            reason = f"{new_rows} new rows"
+        elif now - self.last_learn_time >= self.max_staleness:
+            reason = f"model is older than {self.max_staleness}"
+        elif drift >= self.drift_threshold:
+            reason = f"features drift {drift:.2f}"
+        else:
+            return self.skip, f"{new_rows} new rows, drift {drift:.2f}"
+
+        is_busy = self.process_duration_sec > self.max_process_duration_sec or queue_depth > self.max_queue_depth
+        if is_busy:
+            self.deferred_since = self.deferred_since or now
+            if now - self.deferred_since < self.max_defer:
+                return self.defer, f"{reason}, but processing duration {self.process_duration_sec:.3f}s, " \
+                                   f"queue depth {queue_depth}"
+        return self.learn, reason
+
+    def on_learned(self, train_X, labeled_until: Optional[pd.Timestamp], now: datetime = None):
+        """ Remember learn time, last labeled row and train features distribution """
+        self.last_learn_time = now or datetime.utcnow()
+        self.labeled_until = labeled_until
+        self.deferred_since = None
+        try:
+            X = np.asarray(train_X, dtype=float)
+            X = X.reshape(-1, X.shape[-1])
+            self.train_mean = np.nanmean(X, axis=0)
+            # Constant features drift for any change
+            self.train_std = np.maximum(np.nanstd(X, axis=0), 1e-9)
+        except (ValueError, TypeError) as e:
+            self._logger.info(f"Cannot calculate train features distribution, drift is not checked. {e}")
+            self.train_mean, self.train_std = None, None
+        self.recent_x.clear()
@@ -0,0 +1,71 @@
+import logging
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+from metrics.MetricServer import MetricServer
+
+
+class LoadShedder:
+    """
+    Deadline for processing cycles: predictions on input older than max age are not traded.
+    After consecutive overloaded cycles, slower than max age, processing degrades level by level: persistence is skipped,
+    only the latest level2 snapshot of not shared feed is kept and processing interval is doubled per level.
+    Consecutive healthy cycles recover one level.
+    """
+
+    def __init__(self, max_age: pd.Timedelta, overload_cycles: int = 3, recover_cycles: int = 10, max_level: int = 3,
+                 min_interval: pd.Timedelta = pd.Timedelta("1s")):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.max_age = max_age
+        self.overload_cycles = overload_cycles
+        self.recover_cycles = recover_cycles
+        self.max_level = max_level
+        # Degraded interval is doubled from this if processing interval is shorter
+        self.min_interval = min_interval
+
+        self.level = 0
+        self.overloaded_count = 0
+        self.healthy_count = 0
+
+    @property
+    def is_degraded(self) -> bool:
+        return self.level > 0
+
+    def is_stale(self, data_time: Optional[datetime], reason: str, now: datetime = None) -> bool:
+        """ Is the newest input older than max age. Stale skip is counted with the reason. """
+        if data_time is None:
+            return False
+        age = (now or datetime.utcnow()) - data_time
+        if age <= self.max_age:
+            return False
+        self._logger.info(f"Skipping stale {reason}, data age {age} is more than {self.max_age}")
+        MetricServer.metrics.strategy.process.skipped.labels(reason).inc()
+        return True
+
+    def on_cycle(self, is_overloaded: bool):
+        """ Count overloaded or healthy cycle, change degradation level """
+        if is_overloaded:
+            self.overloaded_count, self.healthy_count = self.overloaded_count + 1, 0
+            if self.overloaded_count >= self.overload_cycles and self.level < self.max_level:
+                self.level, self.overloaded_count = self.level + 1, 0
+                self._logger.warning(f"Processing is overloaded, degradation level {self.level}")
+        else:
+            self.healthy_count, self.overloaded_count = self.healthy_count + 1, 0
+            if self.healthy_count >= self.recover_cycles and self.level > 0:
+                self.level, self.healthy_count = self.level - 1, 0
+                self._logger.info(f"Processing recovers, degradation level {self.level}")
+        MetricServer.metrics.strategy.process.degradation_level.set(self.level)
+
+    def degrade(self, action: str) -> bool:
+        """ Should the action be degraded now. Degraded action is counted. """
+        if self.is_degraded:
+            MetricServer.metrics.strategy.process.degraded.labels(action).inc()
+        return self.is_degraded
+
+    def interval(self, processing_interval: pd.Timedelta) -> pd.Timedelta:
+        """ Processing interval, widened when degraded """
+        if not self.degrade("interval"):
+            return processing_interval
+        return max(processing_interval, self.min_interval) * 2 ** (self.level - 1)
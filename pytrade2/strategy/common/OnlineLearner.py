@@ -0,0 +1,77 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+
+class OnlineLearner:
+    """
+    Online learning for resident keras models: train on newly labeled rows only,
+    mixed with samples from a replay buffer of recent rows.
+    """
+
+    def __init__(self, buffer_size: int = 10000, batch_size: int = 32, replay_ratio: float = 1.0):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        # Max rows in replay buffer
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        # How many replayed samples to add per one new sample
+        self.replay_ratio = replay_ratio
+
+        self.X_buf, self.y_buf = None, None
+        # Time of the last row the model was trained on
+        self.last_index = None
+
+    @staticmethod
+    def is_supported(model) -> bool:
+        """ Only models with incremental train api can learn online """
+        return hasattr(model, "train_on_batch")
+
+    @property
+    def is_started(self) -> bool:
+        return self.last_index is not None
+
+    def reset(self):
+        """ Forget learned rows, next learn starts from scratch """
+        self.X_buf, self.y_buf = None, None
+        self.last_index = None
+
+    def learn(self, model, X: np.ndarray, y: np.ndarray, index: pd.Index) -> int:
+        """
+        Train the model on rows newer than previous learn plus replayed rows
+        :param X: transformed features
+        :param y: transformed targets, aligned with X
+        :param index: times of X rows
+        :return: count of new rows the model was trained on
+        """
+        index = pd.Index(index)
+        new_mask = index > self.last_index if self.is_started else np.full(len(index), True)
+        X_new, y_new = X[new_mask], y[new_mask]
+        new_len = len(X_new)
+        if not new_len:
+            self._logger.info(f"No new labeled rows after {self.last_index}, nothing to learn")
+            return 0
+
+        # New rows mixed with random replayed ones
+        X_train, y_train = X_new, y_new
+        replay_len = min(int(new_len * self.replay_ratio), len(self.X_buf) if self.X_buf is not None else 0)
+        if replay_len:
+            replay_idx = np.random.choice(len(self.X_buf), replay_len, replace=False)
+            X_train = np.concatenate([X_new, self.X_buf[replay_idx]])
+            y_train = np.concatenate([y_new, self.y_buf[replay_idx]])
+        shuffled = np.random.permutation(len(X_train))
+        X_train, y_train = X_train[shuffled], y_train[shuffled]
+
+        for start in range(0, len(X_train), self.batch_size):
+            model.train_on_batch(X_train[start:start + self.batch_size], y_train[start:start + self.batch_size])
+
+        # Keep last rows in replay buffer
+        self.X_buf = np.concatenate([self.X_buf, X_new])[-self.buffer_size:] if self.X_buf is not None \
+            else np.array(X_new[-self.buffer_size:])
+        self.y_buf = np.concatenate([self.y_buf, y_new])[-self.buffer_size:] if self.y_buf is not None \
+            else np.array(y_new[-self.buffer_size:])
+        self.last_index = index[new_mask].max()
+
+        self._logger.info(f"Learned online on {new_len} new and {replay_len} replayed rows. "
+                          f"Replay buffer size: {len(self.X_buf)}")
+        return new_len
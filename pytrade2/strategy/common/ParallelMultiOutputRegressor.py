@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.multioutput import MultiOutputRegressor
+
+
+class ParallelMultiOutputRegressor(MultiOutputRegressor):
+    """
+    MultiOutputRegressor fitting estimators of all outputs concurrently in threads.
+    Each estimator gets fixed threads budget, so together they use the cores without oversubscription.
+    Lightgbm releases GIL during training, so threads run in parallel.
+    """
+
+    def __init__(self, estimator, *, n_jobs=None, threads_per_estimator=None):
+        super().__init__(estimator, n_jobs=n_jobs)
+        self.threads_per_estimator = threads_per_estimator
+
+    @staticmethod
+    def of(model: MultiOutputRegressor, threads_per_estimator=None) -> "ParallelMultiOutputRegressor":
+        """ Parallel regressor with the same estimator params. Fitted estimators of plain model are not copied. """
+        if isinstance(model, ParallelMultiOutputRegressor) and model.threads_per_estimator == threads_per_estimator:
+            return model
+        return ParallelMultiOutputRegressor(model.estimator, n_jobs=model.n_jobs,
+                                            threads_per_estimator=threads_per_estimator)
+
+    def estimator_threads(self, n_outputs: int) -> int:
+        """ Threads of one estimator: given budget or cores divided between concurrently fitted estimators """
+        if self.threads_per_estimator:
+            return self.threads_per_estimator
+        n_concurrent = min(self.n_jobs or n_outputs, n_outputs)
+        return max(1, (os.cpu_count() or 1) // n_concurrent)
+
+    def fit(self, X, y, sample_weight=None, eval_set=None, callbacks_of=None, **fit_params):
+        """ Fit estimators of all outputs
+        :param eval_set: [(X, y)] with all outputs, each estimator gets its output of y
+        :param callbacks_of: function creating new callbacks list for each estimator """
+        y = y.to_numpy() if isinstance(y, pd.DataFrame) else np.asarray(y)
+        if y.ndim != 2:
+            raise ValueError("y must have at least two dimensions for multi-output regression")
+        # Convert features once for all estimators instead of each estimator converting its own copy
+        X_arr = np.ascontiguousarray(X.to_numpy(dtype=np.float64) if isinstance(X, pd.DataFrame) else X)
+        n_outputs = y.shape[1]
+
+        estimators = [clone(self.estimator) for _ in range(n_outputs)]
+        threads = self.estimator_threads(n_outputs)
+        for estimator in estimators:
+            if "n_jobs" in estimator.get_params():
+                estimator.set_params(n_jobs=threads)
+
+        def fit_output(i):
+            output_params = dict(fit_params)
+            if eval_set is not None:
+                output_params["eval_set"] = [(eval_X, np.asarray(eval_y)[:, i]) for eval_X, eval_y in eval_set]
+            if callbacks_of is not None:
+                output_params["callbacks"] = callbacks_of()
+            return estimators[i].fit(X_arr, y[:, i], sample_weight=sample_weight, **output_params)
+
+        with ThreadPoolExecutor(max_workers=min(self.n_jobs or n_outputs, n_outputs)) as pool:
+            self.estimators_ = list(pool.map(fit_output, range(n_outputs)))
+
+        self.n_features_in_ = X_arr.shape[1]
+        return self
@@ -0,0 +1,112 @@
+import logging
+import time
+from threading import Event, Lock, Thread, Timer
+from typing import Optional
+
+import pandas as pd
+
+
+class ProcessingTrigger(Event):
+    """
+    Event waking processing loop on the data the strategy declared: bid ask tick, level2 snapshot, candle
+    or bar close of a period, scheduled at exact time boundary. Ticks are debounced: the first one wakes
+    processing at once, next ones during debounce interval wake it once at the interval end.
+    Keeps the time of the earliest data not processed yet to measure reaction latency.
+    """
+    bid_ask, level2, candles, bar = "bid_ask", "level2", "candles", "bar"
+
+    class Source:
+        """ Data source for a feed, the feed sets it on new data as an event """
+
+        def __init__(self, trigger: "ProcessingTrigger", kind: str):
+            self.trigger, self.kind = trigger, kind
+
+        def set(self):
+            self.trigger.on_data(self.kind)
+
+    def __init__(self, kinds: set, debounce: pd.Timedelta = pd.Timedelta(0), bar_period: Optional[str] = None,
+                 bar_delay: pd.Timedelta = pd.Timedelta(0)):
+        super().__init__()
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.kinds = set(kinds)
+        self.debounce_sec = debounce.total_seconds()
+        self.bar_period = pd.Timedelta(bar_period) if bar_period else None
+        # Wait after bar close for the closed candle to arrive
+        self.bar_delay_sec = bar_delay.total_seconds()
+
+        self._lock = Lock()
+        self._timer: Optional[Timer] = None
+        self.last_fire_time = -float("inf")
+        # Monotonic time of the earliest data, not processed yet
+        self.data_time: Optional[float] = None
+
+    @staticmethod
+    def parse(triggers: str) -> (set, Optional[str]):
+        """ Parse triggers like "bid_ask,level2" or "bar:1min". Bar without period is resolved later.
+        :return kinds and bar period """
+        kinds, bar_period = set(), None
+        for trigger in filter(None, (t.strip() for t in triggers.split(","))):
+            kind, _, period = trigger.partition(":")
+            if kind not in (ProcessingTrigger.bid_ask, ProcessingTrigger.level2, ProcessingTrigger.candles,
+                            ProcessingTrigger.bar):
+                raise ValueError(f"Unknown processing trigger {trigger}")
+            kinds.add(kind)
+            bar_period = period or bar_period
+        return kinds, bar_period
+
+    def source(self, kind: str) -> "ProcessingTrigger.Source":
+        return ProcessingTrigger.Source(self, kind)
+
+    def on_data(self, kind: str):
+        """ New data of the kind arrived """
+        if kind not in self.kinds:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self.data_time is None:
+                self.data_time = now
+            wait_sec = self.last_fire_time + self.debounce_sec - now
+            if wait_sec <= 0:
+                self.last_fire_time = now
+                self.set()
+            elif not self._timer:
+                self._timer = Timer(wait_sec, self._fire_debounced)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _fire_debounced(self):
+        with self._lock:
+            self._timer = None
+            self.last_fire_time = time.monotonic()
+            self.set()
+
+    def take(self, timeout: float = None) -> Optional[float]:
+        """ Wait for the trigger and reset it
+        :return monotonic time of the earliest data, which triggered processing """
+        self.wait(timeout)
+        with self._lock:
+            self.clear()
+            data_time, self.data_time = self.data_time, None
+        return data_time
+
+    def next_bar_time(self, now: float) -> float:
+        """ Next bar close after unix time now """
+        period_sec = self.bar_period.total_seconds()
+        return (now // period_sec + 1) * period_sec
+
+    def bar_loop(self):
+        while True:
+            bar_time = self.next_bar_time(time.time())
+            time.sleep(max(0.0, bar_time + self.bar_delay_sec - time.time()))
+            self.on_data(self.bar)
+
+    def start(self, bar_period: Optional[str] = None):
+        """ Start scheduling bar closes, bar period can be resolved by strategy """
+        if self.bar not in self.kinds:
+            return
+        if bar_period and not self.bar_period:
+            self.bar_period = pd.Timedelta(bar_period)
+        if not self.bar_period:
+            raise ValueError("Bar period of processing trigger is not set")
+        self._logger.info(f"Processing is triggered at each {self.bar_period} bar close")
+        Thread(target=self.bar_loop, daemon=True).start()
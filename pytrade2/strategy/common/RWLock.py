@@ -0,0 +1,133 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics.MetricServer import MetricServer
+
+
+class RWLock:
+    """
+    Reader-writer lock for strategy data within one process. Many readers compute features concurrently,
+    writers apply feed buffers exclusively. Waiting writers block new readers, so writers are not starved.
+    Write lock is reentrant, read lock can be taken inside write lock of the same thread.
+    Read lock can not be upgraded to write lock.
+    Using the lock itself as a context manager takes write lock, like the former data lock did.
+    Wait and hold times of outermost locks are exported to metrics by mode.
+    """
+    read_mode, write_mode = "read", "write"
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writer = None
+        self._write_depth = 0
+        self._write_start = 0.0
+        # Read depth and hold start of current thread
+        self._local = threading.local()
+
+    def _read_depth(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    def acquire_read(self):
+        if self._writer == threading.get_ident():
+            # Read inside write lock of this thread
+            self._write_depth += 1
+            return
+        depth = self._read_depth()
+        if depth:
+            # Nested read does not wait for writers, otherwise a waiting writer would deadlock
+            self._local.depth = depth + 1
+            return
+        wait_start = time.monotonic()
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._local.depth, self._local.start = 1, time.monotonic()
+        self.observe_wait(self.read_mode, self._local.start - wait_start)
+
+    def release_read(self):
+        if self._writer == threading.get_ident():
+            self._write_depth -= 1
+            return
+        depth = self._read_depth()
+        if depth < 1:
+            raise RuntimeError("Releasing read lock, not acquired by this thread")
+        self._local.depth = depth - 1
+        if self._local.depth:
+            return
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+        self.observe_hold(self.read_mode, time.monotonic() - self._local.start)
+
+    def acquire_write(self):
+        ident = threading.get_ident()
+        if self._writer == ident:
+            self._write_depth += 1
+            return
+        if self._read_depth():
+            raise RuntimeError("Read lock can not be upgraded to write lock")
+        wait_start = time.monotonic()
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer, self._write_depth = ident, 1
+        self._write_start = time.monotonic()
+        self.observe_wait(self.write_mode, self._write_start - wait_start)
+
+    def release_write(self):
+        if self._writer != threading.get_ident():
+            raise RuntimeError("Releasing write lock, not acquired by this thread")
+        self._write_depth -= 1
+        if self._write_depth:
+            return
+        hold_sec = time.monotonic() - self._write_start
+        with self._cond:
+            self._writer = None
+            self._cond.notify_all()
+        self.observe_hold(self.write_mode, hold_sec)
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield self
+        finally:
+            self.release_write()
+
+    def __enter__(self):
+        self.acquire_write()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release_write()
+
+    @staticmethod
+    def is_metrics_set() -> bool:
+        # Before app sets metrics, MetricServer.metrics is the flask endpoint function
+        return hasattr(MetricServer.metrics, "strategy")
+
+    @staticmethod
+    def observe_wait(mode: str, sec: float):
+        if RWLock.is_metrics_set():
+            MetricServer.metrics.strategy.process.lock_wait_sec.labels(mode).observe(sec)
+
+    @staticmethod
+    def observe_hold(mode: str, sec: float):
+        if RWLock.is_metrics_set():
+            MetricServer.metrics.strategy.process.lock_hold_sec.labels(mode).observe(sec)
@@ -0,0 +1,98 @@
+import logging
+from threading import Thread
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.persist.ModelBackends import ModelBackends, ModelBackend
+from strategy.persist.ModelCache import ModelCache
+from strategy.persist.ModelPersister import ModelPersister
+
+
+class ShadowModels:
+    """
+    Candidate mlflow model versions, evaluated in processing cycle without trading.
+    Shadows predict the same last features the live model gets, so features are computed once for all models.
+    Features are transformed once per ticker and X pipe: shadows without own pipes share the live ones.
+    Shadow own pipes are fitted on main ticker, other tickers are scaled by their live pipes.
+    Each model predicts last rows of all tickers in one call.
+    """
+
+    def __init__(self, model_persister: ModelPersister, specs: List[tuple], cache_keep: int = 3):
+        """ :param specs: (model name, version) of each shadow """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.model_persister = model_persister
+        self.specs = specs
+        self.cache_keep = cache_keep
+        # Loaded (label, model, X_pipe, y_pipe). Set at once to be read from processing thread.
+        self.models = []
+
+    @staticmethod
+    def parse(value: Optional[str], default_name: str) -> List[tuple]:
+        """ Shadow specs from comma separated <version> or <model name>:<version> items """
+        specs = []
+        for item in [item.strip() for item in str(value or "").split(",") if item.strip()]:
+            name, _, version = item.rpartition(":")
+            specs.append((name or default_name, version))
+        return specs
+
+    def start(self):
+        """ Load shadow models in background, processing goes on with the live model meanwhile """
+        Thread(target=self.load, daemon=True).start()
+
+    def load(self):
+        models = []
+        for name, version in self.specs:
+            try:
+                model_version = self.model_persister.get_model_version(name, version)
+                local_path = ModelCache(self.model_persister, name, self.model_persister.mlflow_cache_dir,
+                                        self.cache_keep).local_path_of(model_version)
+                model = self.model_persister.load_model_version(local_path)
+                x_pipe, y_pipe = self.model_persister.load_version_pipes(
+                    model_version, local_path if self.model_persister.mlflow_cache_dir else None)
+                if x_pipe is None or y_pipe is None:
+                    # Live pipes are fitted for the live model, shadow predictions can be in wrong scale
+                    self._logger.warning(f"Shadow model {name} v{version} has no pipes, live pipes are used")
+                models.append((f"{name} v{version}", model, x_pipe, y_pipe))
+                self._logger.info(f"Loaded shadow model {name} v{version}")
+            except Exception as e:
+                self._logger.error(f"Cannot load shadow model {name} v{version}, skipping it. {e}")
+        self.models = models
+
+    def predict(self, xs: dict, live_pipes: dict, main_ticker: str = None) -> dict:
+        """ Predict last features of each ticker by each shadow model
+        :param xs: features by ticker, the same the live model predicts
+        :param live_pipes: live (X pipe, y pipe) by ticker for shadows without own pipes
+        :param main_ticker: ticker the shadow own pipes are fitted on, other tickers are scaled by their live pipes
+        :return prediction data frame by ticker, row per shadow model """
+        models = self.models
+        if not models or not xs:
+            return {}
+        index = [x.index[-1] if hasattr(x, "index") else None for x in xs.values()]
+        x_trans_by_pipe, y_preds = {}, {ticker: [] for ticker in xs}
+        for label, model, shadow_x_pipe, shadow_y_pipe in models:
+            try:
+                x_rows, pipes = [], []
+                for ticker, x in xs.items():
+                    live_x_pipe, live_y_pipe = live_pipes[ticker]
+                    is_own = ticker == main_ticker
+                    cur_x_pipe = shadow_x_pipe if is_own and shadow_x_pipe is not None else live_x_pipe
+                    cur_y_pipe = shadow_y_pipe if is_own and shadow_y_pipe is not None else live_y_pipe
+                    key = (ticker, id(cur_x_pipe))
+                    if key not in x_trans_by_pipe:
+                        # Last transformed row of the ticker. Whole x is transformed for windowed pipes.
+                        x_trans_by_pipe[key] = cur_x_pipe.transform(x)[-1:]
+                    x_rows.append(x_trans_by_pipe[key])
+                    pipes.append(cur_y_pipe)
+                # Backend predicts quietly, without keras progress output in processing cycle
+                backend = ModelBackends.of(model) or ModelBackend()
+                y_arr = np.asarray(backend.predict(model, np.concatenate(x_rows))).reshape((len(xs), -1))
+                for (ticker, time), y_row, cur_y_pipe in zip(zip(xs, index), y_arr, pipes):
+                    y_pred = pd.DataFrame(cur_y_pipe.inverse_transform(y_row.reshape((1, -1))),
+                                          columns=getattr(cur_y_pipe, "feature_names_in_", None), index=[time])
+                    y_pred.insert(0, "model", label)
+                    y_preds[ticker].append(y_pred)
+            except Exception as e:
+                self._logger.error(f"Cannot predict by shadow model {label}. {e}")
+        return {ticker: pd.concat(preds) for ticker, preds in y_preds.items() if preds}
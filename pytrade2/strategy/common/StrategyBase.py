@@ -1,31 +1,64 @@
 import gc
 import logging
-import multiprocessing
 import time
 import traceback
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from threading import Thread, Event, Timer
-from typing import Dict
+from pathlib import Path
+from threading import Thread, Timer, Lock, local
+from typing import Dict, Optional
 
+import numpy as np
 import pandas as pd
-import tensorflow.python.keras.backend
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler, MaxAbsScaler
 
 from exch.Exchange import Exchange
 from metrics.MetricServer import MetricServer
+from strategy.common.LearnScheduler import LearnScheduler
+from strategy.common.LoadShedder import LoadShedder
+from strategy.common.OnlineLearner import OnlineLearner
+from strategy.common.ProcessingTrigger import ProcessingTrigger
+from strategy.common.RWLock import RWLock
 from strategy.common.RiskManager import RiskManager
+from strategy.common.ShadowModels import ShadowModels
+from strategy.common.TickerSlot import TickerSlot
+from strategy.common.TrainBudget import TrainBudget
+from strategy.common.TrainDataStream import TrainDataStream
+from strategy.common.TrainSampler import TrainSampler
 from strategy.feed.BidAskFeed import BidAskFeed
 from strategy.feed.CandlesFeed import CandlesFeed
 from strategy.feed.Level2Feed import Level2Feed
+from strategy.inference.AffinePipe import AffinePipe
 from strategy.persist.DataPersister import DataPersister
+from strategy.persist.FeatureStore import FeatureStore
+from strategy.persist.ModelBackends import ModelBackends, ModelBackend
+from strategy.persist.ModelCache import ModelCache
 from strategy.persist.ModelPersister import ModelPersister
 
 
 class StrategyBase:
     """ Any strategy """
 
+    # Data waking processing when triggers are enabled: bid_ask, level2, candles, bar or bar:<period>.
+    # Bar without period is the smallest candles period.
+    processing_triggers = "bid_ask,level2,candles"
+
+    # Per ticker state, stored in the ticker slot of current thread
+    ticker = TickerSlot.Attr()
+    candles_feed = TickerSlot.Attr()
+    bid_ask_feed = TickerSlot.Attr()
+    level2_feed = TickerSlot.Attr()
+    broker = TickerSlot.Attr()
+    risk_manager = TickerSlot.Attr()
+    last_trade_check_time = TickerSlot.Attr()
+    last_prediction = TickerSlot.Attr()
+    X_pipe = TickerSlot.Attr()
+    y_pipe = TickerSlot.Attr()
+    predict_X_pipe = TickerSlot.Attr()
+    predict_y_pipe = TickerSlot.Attr()
+
     def __init__(self, config: Dict, exchange_provider: Exchange, is_candles_feed: bool, is_bid_ask_feed: bool,
                  is_level2_feed: bool):
         self._logger = logging.getLogger(self.__class__.__name__)
@@ -39,19 +72,49 @@ class StrategyBase:
 
         self.config = config
         self.tickers = self.config["pytrade2.tickers"].split(",")
-        self.ticker = self.tickers[-1]
-
-        self.risk_manager = None
-        self.data_lock = multiprocessing.RLock()
-        self.new_data_event: Event = Event()
-        self.candles_feed = self.bid_ask_feed = self.level2_feed = None
-        if is_candles_feed:
-            self.candles_feed = CandlesFeed(config, self.ticker, exchange_provider, self.data_lock, self.new_data_event,
-                                            strategy_name)
-        if is_level2_feed:
-            self.level2_feed = Level2Feed(config, exchange_provider, self.data_lock, self.new_data_event)
-        if is_bid_ask_feed:
-            self.bid_ask_feed = BidAskFeed(config, exchange_provider, self.data_lock, self.new_data_event)
+        # Multi ticker strategy keeps feeds and trade slot of each ticker, predicts them in one batch.
+        # The last ticker is the main one, its data is used for learning.
+        self.is_multi_ticker = config.get("pytrade2.strategy.multi.ticker.enabled", False)
+        self._slot_local = local()
+        self.main_slot = TickerSlot(self.tickers[-1])
+        self.ticker_slots: Dict[str, TickerSlot] = {
+            **({ticker: TickerSlot(ticker) for ticker in self.tickers[:-1]} if self.is_multi_ticker else {}),
+            self.main_slot.ticker: self.main_slot}
+
+        # Bid ask and level2 data are shared by strategies of a host process
+        self.shared_feeds = exchange_provider.shared_feeds \
+            if config.get("pytrade2.host.feeds.shared", False) else None
+        # Feeds write, feature computation reads strategy data
+        self.data_lock = self.shared_feeds.data_lock if self.shared_feeds else RWLock()
+        # Wake processing on declared data only, otherwise on any new data
+        self.is_processing_triggers = config.get("pytrade2.strategy.processing.triggers.enabled", False)
+        trigger_kinds, bar_period = ProcessingTrigger.parse(
+            config.get("pytrade2.strategy.processing.triggers", self.processing_triggers)) \
+            if self.is_processing_triggers else ({ProcessingTrigger.bid_ask, ProcessingTrigger.level2,
+                                                  ProcessingTrigger.candles}, None)
+        self.new_data_event = ProcessingTrigger(
+            trigger_kinds,
+            debounce=pd.Timedelta(config.get("pytrade2.strategy.processing.debounce", "0s")),
+            bar_period=bar_period,
+            bar_delay=pd.Timedelta(config.get("pytrade2.strategy.processing.bar.delay", "0s")))
+        for slot in self.ticker_slots.values():
+            # Feeds of multi ticker or host strategy take their ticker data only
+            feed_ticker = slot.ticker if self.is_multi_ticker or self.shared_feeds else None
+            feed_config = config if slot is self.main_slot else {**config, "pytrade2.tickers": slot.ticker}
+            if is_candles_feed:
+                slot.candles_feed = CandlesFeed(feed_config, slot.ticker, exchange_provider, self.data_lock,
+                                                self.new_data_event.source(ProcessingTrigger.candles), strategy_name,
+                                                is_ticker_only=feed_ticker is not None)
+            if is_level2_feed:
+                slot.level2_feed = self.create_feed(
+                    "level2", slot.ticker, lambda event: Level2Feed(config, exchange_provider, self.data_lock, event,
+                                                                    feed_ticker),
+                    self.new_data_event.source(ProcessingTrigger.level2))
+            if is_bid_ask_feed:
+                slot.bid_ask_feed = self.create_feed(
+                    "bid_ask", slot.ticker, lambda event: BidAskFeed(config, exchange_provider, self.data_lock, event,
+                                                                     feed_ticker),
+                    self.new_data_event.source(ProcessingTrigger.bid_ask))
         # self.learn_data_balancer = LearnDataBalancer()
         self.order_quantity = config["pytrade2.order.quantity"]
         self.is_trailing_stop = config.get("pytrade2.order.is_trailingstop", False)
@@ -60,12 +123,63 @@ class StrategyBase:
         self.amount_precision = config["pytrade2.amount.precision"]
         self.learn_interval = pd.Timedelta(config['pytrade2.strategy.learn.interval']) \
             if 'pytrade2.strategy.learn.interval' in config else None
+        # Learn when new labeled rows, staleness or drift trigger it, checked each learn interval
+        self.learn_scheduler = LearnScheduler(
+            min_new_rows=int(config.get("pytrade2.strategy.learn.scheduler.min.new.rows", 100)),
+            max_staleness=pd.Timedelta(config.get("pytrade2.strategy.learn.scheduler.max.staleness", "1h")),
+            drift_threshold=float(config.get("pytrade2.strategy.learn.scheduler.drift.threshold", 3.0)),
+            max_process_duration_sec=float(config.get("pytrade2.strategy.learn.scheduler.max.process.sec", 1.0)),
+            max_queue_depth=int(config.get("pytrade2.strategy.learn.scheduler.max.queue.depth", 1000)),
+            max_defer=pd.Timedelta(config.get("pytrade2.strategy.learn.scheduler.max.defer", "10min"))) \
+            if config.get("pytrade2.strategy.learn.scheduler.enabled", False) else None
+        # Targets of a row are known after predict window
+        self.label_delay = pd.Timedelta(config.get("pytrade2.strategy.predict.window", "0s"))
         self._wait_after_loss = pd.Timedelta(config["pytrade2.strategy.riskmanager.wait_after_loss"])
         self.exchange_provider = exchange_provider
         self.model = None
-        self.broker = None
+        # Fast inference of the model: compiled trees, numpy or tf.function predictor. None if not created.
+        self.is_compiled_predict = config.get("pytrade2.strategy.predict.compiled", True)
+        self.predict_model = None
+        # Keras models can be predicted by quantized tflite: dynamic or int8. Checked against float model on recent X.
+        self.predict_quantization = config.get("pytrade2.strategy.predict.quantization")
+        self.predict_quantization_tolerance = float(config.get("pytrade2.strategy.predict.quantization.tolerance", 0.05))
+        self.recent_X_trans = None
+        # Stream keras train data from memory mapped files instead of holding it in memory
+        self.train_stream = None
+        if config.get("pytrade2.strategy.learn.stream.enabled", False):
+            data_dir = config.get("pytrade2.data.dir")
+            self.train_stream = TrainDataStream(str(Path(data_dir, strategy_name, "train")) if data_dir else None,
+                                                int(config.get("pytrade2.strategy.learn.stream.batch.size", 32)),
+                                                int(config.get("pytrade2.strategy.learn.stream.chunk.size", 10000)))
+        # Features and targets stored on disk, only rows after the last stored are calculated before learning
+        self.feature_store = None
+        if config.get("pytrade2.strategy.learn.store.enabled", False):
+            data_dir = config.get("pytrade2.data.dir")
+            self.feature_store = FeatureStore(str(Path(data_dir, strategy_name, "features")) if data_dir else None,
+                                              int(config.get("pytrade2.strategy.learn.store.max.rows", 1000000)))
+        # Stop training at wall clock budget or by early stopping, to not outlast learn interval
+        self.train_budget = TrainBudget(
+            budget_sec=pd.Timedelta(config.get("pytrade2.strategy.learn.budget.time", "10s")).total_seconds(),
+            epochs=int(config.get("pytrade2.strategy.learn.budget.epochs", 100)),
+            patience=int(config.get("pytrade2.strategy.learn.budget.patience", 3)),
+            early_stopping_rounds=int(config.get("pytrade2.strategy.learn.budget.early.stopping.rounds", 20)),
+            validation_fraction=float(config.get("pytrade2.strategy.learn.budget.validation.fraction", 0.1))) \
+            if config.get("pytrade2.strategy.learn.budget.enabled", False) else None
+        # Train on all recent rows and weighted sample of older rows, bounded number of rows
+        self.train_sampler = TrainSampler(
+            max_rows=int(config.get("pytrade2.strategy.learn.sample.max.rows", 20000)),
+            recent_rows=int(config.get("pytrade2.strategy.learn.sample.recent.rows", 5000)),
+            half_life=pd.Timedelta(config["pytrade2.strategy.learn.sample.half.life"])
+            if config.get("pytrade2.strategy.learn.sample.half.life") else None) \
+            if config.get("pytrade2.strategy.learn.sample.enabled", False) else None
         self.is_processing = False
         self.is_learn_enabled = config.get("pytrade2.strategy.learn.enabled", True)
+        # Online learning: keep the model resident and train it on new rows only
+        self.online_learner = OnlineLearner(
+            buffer_size=int(config.get("pytrade2.strategy.learn.online.buffer.size", 10000)),
+            batch_size=int(config.get("pytrade2.strategy.learn.online.batch.size", 32)),
+            replay_ratio=float(config.get("pytrade2.strategy.learn.online.replay.ratio", 1.0))) \
+            if config.get("pytrade2.strategy.learn.online.enabled", False) else None
 
         # Expected profit/loss >= ratio means signal to trade
         self.profit_loss_ratio = float(config.get("pytrade2.strategy.profitloss.ratio", 1.0))
@@ -87,59 +201,126 @@ class StrategyBase:
         self.history_max_window = pd.Timedelta(config["pytrade2.strategy.history.max.window"])
 
         self.trade_check_interval = timedelta(seconds=30)
-        self.last_trade_check_time = datetime.utcnow() - self.trade_check_interval
 
         self.model_check_interval = timedelta(seconds=30)
-        self.last_model_check_time = datetime.utcnow() - self.model_check_interval
+        # Mlflow models prefetched in background, created on run when model name is final
+        self.model_cache = None
+        self.model_cache_keep = int(config.get("pytrade2.mlflow.cache.keep", 3))
+        # Log learned models with their pipes to mlflow as new versions
+        self.is_mlflow_log = config.get("pytrade2.mlflow.log.enabled", False)
+        # Candidate model versions, predicting the features of live model without trading. Created on run.
+        self.shadow_models: Optional[ShadowModels] = None
+        # New model prepared in background, swapped in between processing cycles
+        self.staged_model = None
+        self.staged_model_lock = Lock()
 
         self.min_xy_len = 2
         self.X_pipe, self.y_pipe = None, None
-
-        self.processing_interval = pd.Timedelta(config.get('pytrade2.strategy.processing.interval', '30 seconds'))
+        # Pipes compiled for fast inference, refreshed when pipes are refit or replaced
+        self.predict_X_pipe, self.predict_y_pipe = None, None
+
+        # Don't trade on stale input, degrade processing under sustained overload
+        self.load_shedder = LoadShedder(
+            max_age=pd.Timedelta(config["pytrade2.strategy.processing.max.age"]),
+            overload_cycles=int(config.get("pytrade2.strategy.processing.overload.cycles", 3)),
+            recover_cycles=int(config.get("pytrade2.strategy.processing.recover.cycles", 10))) \
+            if config.get("pytrade2.strategy.processing.max.age") else None
+        # Skip features and prediction while strategy change key is unchanged, reuse previous prediction
+        self.is_skip_unchanged = config.get("pytrade2.strategy.processing.skip.unchanged", False)
+        # Triggered processing is not delayed, debounce limits its rate
+        self.processing_interval = pd.Timedelta(config.get('pytrade2.strategy.processing.interval',
+                                                           '0s' if self.is_processing_triggers else '30 seconds'))
 
         self._logger.info("Strategy parameters:\n" + "\n".join(
             [f"{key}: {value}" for key, value in self.config.items() if key.startswith("pytrade2.strategy.")]))
 
+    def create_feed(self, kind: str, ticker: str, create, source):
+        """ Create the feed with the new data source, or take the feed shared by host strategies """
+        if not self.shared_feeds:
+            return create(source)
+        return self.shared_feeds.feed(kind, ticker, self.config, create, source)
+
+    def current_slot(self) -> TickerSlot:
+        """ Ticker slot, current thread works with. Main ticker slot by default. """
+        return getattr(self._slot_local, "slot", None) or self.main_slot
+
+    @contextmanager
+    def ticker_slot(self, slot: TickerSlot):
+        """ Work with the ticker slot in current thread """
+        prev_slot = getattr(self._slot_local, "slot", None)
+        self._slot_local.slot = slot
+        try:
+            yield slot
+        finally:
+            self._slot_local.slot = prev_slot
+
     def run(self):
+        MetricServer.bind_strategy(self.__class__.__name__)
         exchange_name = self.config["pytrade2.exchange"]
-        self.broker = self.exchange_provider.broker(exchange_name)
-        if self.candles_feed:
-            self.candles_feed.read_candles()
-        self.risk_manager = RiskManager(self.broker, self._wait_after_loss)
+        for slot in self.ticker_slots.values():
+            # Each ticker has own trade slot in multi ticker strategy
+            slot.broker = self.exchange_provider.broker(exchange_name, slot.ticker) if self.is_multi_ticker \
+                else self.exchange_provider.broker(exchange_name)
+            if slot.candles_feed:
+                slot.candles_feed.read_candles()
+            slot.risk_manager = RiskManager(slot.broker, self._wait_after_loss)
+        self.model_cache = ModelCache(self.model_persister, self.model_name, self.model_persister.mlflow_cache_dir,
+                                      self.model_cache_keep, self.model_check_interval,
+                                      on_new_version=self.stage_model)
+        self.model_cache.start()
+        shadow_specs = ShadowModels.parse(self.config.get("pytrade2.strategy.shadow.models"), self.model_name)
+        if shadow_specs:
+            self.shadow_models = ShadowModels(self.model_persister, shadow_specs, self.model_cache_keep)
+            self.shadow_models.start()
 
         with self.data_lock:
             # Create pipe and model
             self.update_model()
-            train_X, train_y = self.prepare_xy()
-            self.X_pipe, self.y_pipe = self.create_pipe(train_X, train_y)
-            # Learn the model
+            if not self.model_version:
+                # Pipes fitted for locally saved model
+                self.X_pipe, self.y_pipe = self.model_persister.load_last_pipes()
+            is_pipes_loaded = self.X_pipe is not None and self.y_pipe is not None
+            if is_pipes_loaded and not self.model:
+                self.load_last_local_model()
+            if not is_pipes_loaded:
+                train_X, train_y = self.prepare_train_xy()
+                self.X_pipe, self.y_pipe = self.create_pipe(train_X, train_y)
+            self.on_pipes_updated()
+            self.fit_ticker_pipes()
+            # Learn the model. If pipes and model are loaded, the strategy is ready to predict,
+            # so don't wait for learning.
             if self.is_learn_enabled:
-                self.learn()
+                Thread(target=self.learn, daemon=True).start() if is_pipes_loaded and self.model else self.learn()
 
         # Start main processing loop
+        self.new_data_event.start(self.min_candles_period())
         Thread(target=self.processing_loop).start()
-        self.broker.run()
+        for slot in self.ticker_slots.values():
+            slot.broker.run()
 
     def processing_loop(self):
         self._logger.info("Starting processing loop")
+        MetricServer.bind_strategy(self.__class__.__name__)
 
         # If alive is None, not started, so continue loop
         is_alive = self.is_alive()
         while is_alive or is_alive is None:
             try:
                 # Wait for new data received
-                # while not self.new_data_event.is_set():
-                if self.new_data_event:
-                    self.new_data_event.wait()
-                    self.new_data_event.clear()
+                data_time = self.new_data_event.take() if self.new_data_event else None
 
                 # Learn and predict only if no gap between level2 and bidask
-                self.update_model(is_periodical=True)
+                self.update_model()
                 self.process_new_data()
+                if data_time is not None and self.model:
+                    # From triggering data to prediction processed and order created
+                    MetricServer.metrics.strategy.process.reaction_latency_sec.observe(time.monotonic() - data_time)
 
-                if self.processing_interval.total_seconds() > 0:
+                processing_interval = self.load_shedder.interval(self.processing_interval) \
+                    if self.load_shedder else self.processing_interval
+                if processing_interval.total_seconds() > 0:
                     # Delay before next processing cycle
-                    time.sleep(self.processing_interval.total_seconds())
+                    time.sleep(processing_interval.total_seconds())
                 # Refresh live status
                 is_alive = self.is_alive()
             except Exception as e:
@@ -149,10 +330,14 @@ class StrategyBase:
 
         self._logger.info("End main processing loop")
 
+    def min_candles_period(self):
+        """ Smallest candles period, None if no candles """
+        periods = self.candles_feed.candles_cnt_by_interval.keys() if self.candles_feed else []
+        return min(periods, key=pd.Timedelta) if periods else None
+
     def is_alive(self):
         maxdelta = self.history_min_window + pd.Timedelta("60s")
-        feeds = filter(lambda f: f, [self.candles_feed, self.bid_ask_feed, self.level2_feed])
-        is_alive = all([feed.is_alive(maxdelta) for feed in feeds])
+        is_alive = all([feed.is_alive(maxdelta) for slot in self.ticker_slots.values() for feed in slot.feeds()])
         if not is_alive:
             self._logger.info(self.get_report())
             self._logger.error(f"Strategy is not alive for {maxdelta}")
@@ -195,32 +380,182 @@ class StrategyBase:
             self._logger.info(f"Can not learn because some datasets have not enough data. Filled status {status}")
         return has_min_history
 
-    def update_model(self, is_periodical=False):
-        """ Read last trade ready model from mlflow"""
-        if is_periodical and (datetime.utcnow() - self.last_model_check_time) < self.model_check_interval:
-            # For periodical update, skip if check interval is not elapsed
+    def labeled_index(self) -> pd.DatetimeIndex:
+        """ Times of main data rows, whose targets are already known """
+        with self.data_lock.read():
+            if self.bid_ask_feed:
+                index = self.bid_ask_feed.bid_ask.index
+            elif self.candles_feed and self.candles_feed.candles_by_interval:
+                index = max(self.candles_feed.candles_by_interval.values(), key=len).index
+            else:
+                return pd.DatetimeIndex([])
+        return index[index <= index.max() - self.label_delay] if len(index) else index
+
+    def buffered_rows(self) -> int:
+        """ Received rows waiting in feed buffers """
+        with self.data_lock.read():
+            bufs = [self.bid_ask_feed.bid_ask_buf] if self.bid_ask_feed else []
+            bufs += [self.level2_feed.level2_buf] if self.level2_feed else []
+            bufs += list(self.candles_feed.candles_by_interval_buf.values()) if self.candles_feed else []
+            return sum(len(buf) for buf in bufs)
+
+    def is_learn_due(self, labeled_index: pd.DatetimeIndex) -> bool:
+        """ Ask learn scheduler should we learn now """
+        scheduler = self.learn_scheduler
+        since = scheduler.labeled_until
+        new_rows = len(labeled_index) if since is None else int((labeled_index > since).sum())
+        decision, reason = scheduler.decide(new_rows, self.buffered_rows())
+        MetricServer.metrics.strategy.learn.new_rows.set(new_rows)
+        MetricServer.metrics.strategy.learn.drift.set(scheduler.drift())
+        if decision == LearnScheduler.skip:
+            MetricServer.metrics.strategy.learn.skipped.inc()
+        elif decision == LearnScheduler.defer:
+            MetricServer.metrics.strategy.learn.deferred.inc()
+        self._logger.info(f"Learn decision: {decision}, {reason}")
+        return decision == LearnScheduler.learn
+
+    def stage_model(self, model, model_version, params, pipes=(None, None)):
+        """ Prepare new model in background: validate, create predictor, warm up, prepare params.
+        The model is swapped in by update_model() between processing cycles. """
+        try:
+            backend = ModelBackends.of(model) or ModelBackend()
+            input_shape = backend.input_shape(model)
+            # Model should fit the features of its own pipes or current ones
+            x_pipe = pipes[0] if pipes[0] is not None else self.X_pipe
+            x_size = getattr(x_pipe, "n_features_in_", None)
+            if input_shape and x_size and input_shape[-1] != x_size:
+                raise ValueError(f"model expects {input_shape[-1]} features, but pipe produces {x_size}")
+            predict_model = self.create_predict_model(model)
+            # Warm up
+            if input_shape:
+                dummy_x = np.zeros((1,) + input_shape, dtype=np.float32)
+                predict_model.predict(dummy_x) if predict_model else backend.predict(model, dummy_x)
+            prepared_params = self.prepare_params(params) if params and params != self.app_params else None
+
+            with self.staged_model_lock:
+                self.staged_model = (model, model_version, params, pipes, predict_model, prepared_params)
+            self._logger.info(f"Staged model {self.model_name} v{model_version.version}")
+        except Exception as e:
+            self._logger.error(f"Cannot stage model {self.model_name} v{model_version.version}, skipping it. {e}")
+
+    def update_model(self):
+        """ Swap to the model staged in background. Called between processing cycles, so it's atomic for them. """
+        with self.staged_model_lock:
+            staged, self.staged_model = self.staged_model, None
+        if not staged:
             return
+        model, model_version, params, (x_pipe, y_pipe), predict_model, prepared_params = staged
 
-        model, model_version, params = self.model_persister.get_last_trade_ready_model(self.model_name)
         is_model_changed = model and model_version and (model_version != self.model_version)
         is_params_changed = params and (params != self.app_params)
-        # Set model if changaed
+        # Set model if changed
         if is_model_changed:
             self._logger.info(f"Updating model {self.model_name} from v{self.model_version} to {model_version}")
-            self.model, self.model_version = model, model_version
-
-        # Set params i
+            self.model, self.model_version, self.predict_model = model, model_version, predict_model
+            # Pipes fitted together with the model
+            if x_pipe is not None and y_pipe is not None:
+                self.X_pipe, self.y_pipe = x_pipe, y_pipe
+                self.on_pipes_updated()
+            if self.online_learner:
+                self.online_learner.reset()
+
+        # Set params if changed
         if is_params_changed:
             self._logger.info(f"Updating model params from {self.app_params} to {params}")
-            self.apply_params(params)
+            self.apply_params(params, prepared_params)
             self.app_params = params
 
-        MetricServer.app_params["model"] = f"{self.model_version.name} v{self.model_version.version}"
-        self.last_model_check_time = datetime.utcnow()
+        if self.model_version:
+            MetricServer.app_params["model"] = f"{self.model_version.name} v{self.model_version.version}"
 
     def create_model(self, x_size, y_size):
         raise NotImplementedError()
 
+    def load_last_local_model(self):
+        """ Create the model with locally saved weights, fitted with loaded pipes,
+        so the strategy predicts before the first learn. Model sizes are of the pipes output. """
+        if not self.model_persister.has_last_model():
+            return
+        try:
+            x_zeros, y_zeros = (pd.DataFrame(np.zeros((1, pipe.n_features_in_)), columns=pipe.feature_names_in_)
+                                for pipe in (self.X_pipe, self.y_pipe))
+            self.model = self.create_model(self.X_pipe.transform(x_zeros).shape[-1],
+                                           self.y_pipe.transform(y_zeros).shape[-1])
+            self.on_model_updated()
+            self._logger.info("Loaded last local model, ready to predict before learning")
+        except Exception as e:
+            self._logger.warning(f"Cannot create the model for loaded pipes, waiting for learning. {e}")
+
+    def on_model_updated(self):
+        """ Called when the model is trained. Prepare fast inference of the new model and pipes refit for it."""
+        self.predict_model = self.create_predict_model(self.model)
+        self.on_pipes_updated()
+
+    def on_pipes_updated(self):
+        """ Compile X, y pipes to affine transformations for fast inference """
+        if self.is_compiled_predict:
+            self.predict_X_pipe = AffinePipe.compiled_or_pipe(self.X_pipe)
+            self.predict_y_pipe = AffinePipe.compiled_or_pipe(self.y_pipe)
+        else:
+            self.predict_X_pipe, self.predict_y_pipe = None, None
+
+    def fit_ticker_pipes(self):
+        """ Fit pipes of other tickers on their own data. The model learns on main ticker data,
+        other tickers features are scaled and predictions are inverse transformed by their own pipes. """
+        for slot in self.ticker_slots.values():
+            if slot is self.main_slot or (slot.X_pipe is not None and self.is_online_learn()):
+                continue
+            with self.ticker_slot(slot):
+                try:
+                    if not self.can_learn():
+                        continue
+                    train_X, train_y = self.prepare_xy()
+                    x_pipe, y_pipe = self.create_pipe(train_X, train_y)
+                    with self.data_lock:
+                        self.X_pipe, self.y_pipe = x_pipe, y_pipe
+                        self.on_pipes_updated()
+                except Exception as e:
+                    self._logger.error(f"Cannot fit pipes of {slot.ticker}. {e}")
+
+    def transform_last_rows(self, xs: dict) -> np.ndarray:
+        """ Last row of each ticker features, transformed by the ticker pipe, stacked for one model call """
+        rows = []
+        for ticker, x in xs.items():
+            with self.ticker_slot(self.ticker_slots[ticker]):
+                rows.append((self.predict_X_pipe or self.X_pipe).transform(x.tail(1)))
+        return np.concatenate(rows)
+
+    def inverse_transform_rows(self, tickers, y_arr: np.ndarray) -> np.ndarray:
+        """ Predicted row of each ticker to the ticker units by its target pipe """
+        rows = []
+        for ticker, y_row in zip(tickers, np.asarray(y_arr).reshape((len(tickers), -1))):
+            with self.ticker_slot(self.ticker_slots[ticker]):
+                rows.append((self.predict_y_pipe or self.y_pipe).inverse_transform(y_row.reshape((1, -1))))
+        return np.concatenate(rows)
+
+    def sample_train(self, train_X, train_y, X_trans, y_trans) -> (np.ndarray, np.ndarray, np.ndarray):
+        """ Bounded sample of transformed train data with sample weights. Windows are already built from
+        contiguous rows, so sampled windows keep their history. Signal classes are sampled proportionally. """
+        n = X_trans.shape[0]
+        strata = train_y["signal"].to_numpy()[-n:] if "signal" in getattr(train_y, "columns", []) else None
+        positions, sample_weight = self.train_sampler.sample(train_X.index[-n:], strata)
+        return X_trans[positions], y_trans[positions], sample_weight
+
+    def fit_model(self, model, X, y, sample_weight=None):
+        """ Train the model on transformed data, return trained model """
+        backend = ModelBackends.of(model)
+        if self.train_budget and backend and backend.module_name == "keras":
+            return self.train_budget.fit_keras(model, X, y, sample_weight)
+        if sample_weight is not None:
+            model.fit(X, y, sample_weight=sample_weight)
+        else:
+            model.fit(X, y)
+        return model
+
+    def create_predict_model(self, model):
+        """ Fast inference wrapper of the model, None to predict by the model itself """
+        return None
+
     def create_pipe(self, X, y) -> (Pipeline, Pipeline):
         """ Create feature and target pipelines to use for transform and inverse transform """
 
@@ -241,20 +576,48 @@ class StrategyBase:
     def prepare_xy(self):
         raise NotImplementedError("prepare_Xy")
 
+    def prepare_xy_since(self, features_since, targets_since):
+        """ New features after features_since and new targets after targets_since for feature store.
+        None if the strategy cannot calculate them incrementally. """
+        return None
+
+    def prepare_train_xy(self) -> (pd.DataFrame, pd.DataFrame):
+        """ Train data, calculated from scratch or appended to feature store and read from it """
+        store = self.feature_store
+        new_xy = self.prepare_xy_since(store.last_time("X"), store.last_time("y")) if store else None
+        if new_xy is None:
+            return self.prepare_xy()
+        new_X, new_y = new_xy
+        if not (store.append("X", new_X) and store.append("y", new_y)):
+            # Features or targets changed, stored rows are not valid anymore
+            store.reset()
+            new_X, new_y = self.prepare_xy_since(None, None)
+            store.append("X", new_X)
+            store.append("y", new_y)
+        last_time = store.last_time("X")
+        return store.read_xy(last_time - self.history_max_window if last_time is not None else None)
+
     def learn(self):
+        MetricServer.bind_strategy(self.__class__.__name__)
         if not self.is_learn_enabled:
             self._logger.info("Learning is disabled")
             return
         try:
-            # Update model and clear buffers
+            labeled_index = None
+            if self.learn_scheduler:
+                # Check before buffers are applied to see feed queue depth
+                labeled_index = self.labeled_index()
+                if not self.is_learn_due(labeled_index):
+                    return
+            # Clear buffers
             self.apply_buffers()
-            self.update_model()
 
             self._logger.debug("Learning")
             if not self.can_learn():
                 return
 
-            train_X, train_y = self.prepare_xy()
+            with self.learn_timer("prepare_xy"):
+                train_X, train_y = self.prepare_train_xy()
 
             # Metrics
             train_period_sec = (train_X.index.max() - train_X.index.min()).total_seconds()
@@ -266,28 +629,57 @@ class StrategyBase:
                 start_time = datetime.utcnow()
                 if not (self.X_pipe and self.y_pipe):
                     self.X_pipe, self.y_pipe = self.create_pipe(train_X, train_y)
-                # Final scaling and normalization
-                self.X_pipe.fit(train_X)
-                self.y_pipe.fit(train_y)
-
-                X_trans, y_trans = self.X_pipe.transform(train_X), self.y_pipe.transform(train_y)
-                # If x window transformation applied, x size reduced => adjust y
-                y_trans = y_trans[-X_trans.shape[0]:]
+                # Final scaling and normalization. Resident online model keeps the scaling of its first learn.
+                if not self.is_online_learn():
+                    with self.learn_timer("pipe_fit"):
+                        self.X_pipe.fit(train_X)
+                        self.y_pipe.fit(train_y)
+
+                is_stream = self.train_stream is not None and not self.is_online_learn()
+                with self.learn_timer("transform"):
+                    if is_stream:
+                        # Memory mapped rows, windows are created by batches during fit
+                        X_trans, y_trans = self.train_stream.write(self.X_pipe, self.y_pipe, train_X, train_y)
+                    else:
+                        X_trans, y_trans = self.X_pipe.transform(train_X), self.y_pipe.transform(train_y)
+                        # If x window transformation applied, x size reduced => adjust y
+                        y_trans = y_trans[-X_trans.shape[0]:]
 
                 # Get or create model, parameters
                 if not self.model:
                     self.model = self.create_model(X_trans.shape[-1], y_trans.shape[-1])
 
                 # Train
-                self.model.fit(X_trans, y_trans)
+                with self.learn_timer("fit"):
+                    if self.online_learner and OnlineLearner.is_supported(self.model):
+                        self.online_learner.learn(self.model, X_trans, y_trans, train_X.index[-X_trans.shape[0]:])
+                    elif is_stream and TrainDataStream.is_supported(self.model):
+                        self.model = self.train_budget.fit_keras_stream(self.train_stream, self.model, X_trans,
+                                                                        y_trans) \
+                            if self.train_budget else self.train_stream.fit(self.model, X_trans, y_trans)
+                    elif self.train_sampler:
+                        self.model = self.fit_model(self.model, *self.sample_train(train_X, train_y, X_trans, y_trans))
+                    else:
+                        self.model = self.fit_model(self.model, X_trans, y_trans)
+                # Recent features to check fast predictor of the new model
+                self.recent_X_trans = self.train_stream.recent_x(self.model, X_trans, 256) \
+                    if is_stream and TrainDataStream.is_supported(self.model) else X_trans[-256:]
 
                 # Save weights and xy new delta
                 # todo: uncomment
-                self.model_persister.save_model(self.model)
-
-                # to avoid OOM
-                tensorflow.keras.backend.clear_session()
-                gc.collect()
+                with self.learn_timer("save"):
+                    self.model_persister.save_model(self.model, (self.X_pipe, self.y_pipe))
+                if self.is_mlflow_log:
+                    self.log_model_version()
+
+                backend = ModelBackends.of(self.model)
+                if backend and not self.is_online_learn():
+                    backend.clear_session()
+                    gc.collect()
+                self.on_model_updated()
+                self.fit_ticker_pipes()
+                if self.learn_scheduler:
+                    self.learn_scheduler.on_learned(train_X, labeled_index.max() if len(labeled_index) else None)
                 self._logger.info("Learning completed")
                 learn_duration = datetime.utcnow() - start_time
                 MetricServer.metrics.strategy.learn.train_exec_duration_sec.set(learn_duration.total_seconds())
@@ -298,7 +690,29 @@ class StrategyBase:
             if self.learn_interval and self.is_learn_enabled:
                 Timer(self.learn_interval.seconds, self.learn).start()
 
-    def apply_params(self, params: dict) -> None:
+    def log_model_version(self):
+        """ Log learned model with its X, y pipes and params to mlflow, so the version is loaded with own pipes """
+        backend = ModelBackends.of(self.model)
+        if backend and backend.module_name == "keras":
+            self._logger.info("Keras models are not logged to mlflow, they are loaded by sklearn flavor")
+            return
+        try:
+            with self.learn_timer("mlflow_log"):
+                self.model_persister.log_model_version(self.model_name, self.model, (self.X_pipe, self.y_pipe),
+                                                       self.app_params)
+        except Exception as e:
+            self._logger.error(f"Cannot log model {self.model_name} to mlflow. {e}")
+
+    def is_online_learn(self) -> bool:
+        """ Online learning is enabled and already started for current model """
+        return bool(self.online_learner and self.online_learner.is_started)
+
+    def prepare_params(self, params: dict):
+        """ Heavy preparation of new params, called in background before apply_params()
+        :return prepared data to pass to apply_params() """
+        return None
+
+    def apply_params(self, params: dict, prepared=None) -> None:
         """ After last model and params read from mlflow, apply params to strategy"""
         for name, val in {name: val for name, val in params.items() if hasattr(self, name)}.items():
             val_type = type(getattr(self, name))
@@ -318,8 +732,48 @@ class StrategyBase:
     def predict(self, x: pd.DataFrame):
         raise NotImplementedError()
 
+    def change_key(self):
+        """ Key of the data prediction depends on, like last closed bar or last tick time.
+        Processing cycle with unchanged key reuses previous prediction. None to predict each cycle. """
+        return None
+
+    def candles_change_key(self) -> tuple:
+        """ Change key of candles: last candle time of each period """
+        if not self.candles_feed:
+            return ()
+        with self.data_lock.read():
+            return tuple((period, candles.index.max() if not candles.empty else None)
+                         for period, candles in sorted(self.candles_feed.candles_by_interval.items()))
+
+    def feeds_change_key(self) -> tuple:
+        """ Change key of all feeds: last bid ask time, last level2 time and last candles """
+        key = ()
+        with self.data_lock.read():
+            if self.bid_ask_feed:
+                key += (self.bid_ask_feed.bid_ask.index.max() if not self.bid_ask_feed.bid_ask.empty else None,)
+            if self.level2_feed:
+                key += (self.level2_feed.level2["datetime"].max() if not self.level2_feed.level2.empty else None,)
+        return key + self.candles_change_key()
+
+    def cached_prediction(self, change_key):
+        """ Previous prediction if it was made by current model on data with the same change key, otherwise None """
+        if not self.is_skip_unchanged or change_key is None or not self.last_prediction:
+            return None
+        last_key, last_model, y_pred = self.last_prediction
+        return y_pred if last_key == change_key and last_model is self.model else None
+
+    def last_data_time(self):
+        """ Time of the newest input data: bid ask time or expected close of the next candle of the smallest period.
+        Last candle trails real time up to its period, so candles are late only after the next one is expected. """
+        if self.bid_ask_feed:
+            return self.bid_ask_feed.bid_ask.index.max() if not self.bid_ask_feed.bid_ask.empty else None
+        period = self.min_candles_period()
+        candles = self.candles_feed.candles_by_interval.get(period) if period else None
+        return candles.index.max() + pd.Timedelta(period) if candles is not None and not candles.empty else None
+
     def apply_buffers(self):
         # Append new data from buffers to main data frames
+        is_degraded = bool(self.load_shedder and self.load_shedder.is_degraded)
         with (self.data_lock):
             save_dict = {}
             # Form saving dict structure and copy from buffers to main datasets
@@ -333,9 +787,13 @@ class StrategyBase:
                 self.candles_feed.apply_buf()
             if self.level2_feed:
                 # Don't call save_dict.update() because Level 2 is too big, don't save, just apply buf
-                self.level2_feed.apply_buf()
+                # Overloaded processing takes only the latest snapshot. Feed shared by host strategies is
+                # kept whole: one degraded strategy should not drop level2 data of others.
+                self.level2_feed.apply_buf(is_latest_only=is_degraded and not self.shared_feeds
+                                           and self.load_shedder.degrade("level2"))
 
-            self.data_persister.save_last_data(self.ticker, save_dict)
+            if not (is_degraded and self.load_shedder.degrade("persist")):
+                self.data_persister.save_last_data(self.ticker, save_dict)
 
     def process_new_data(self):
 
@@ -343,30 +801,139 @@ class StrategyBase:
             start_time = datetime.utcnow()
             try:
                 self.is_processing = True
-                self.apply_buffers()
-                x = self.prepare_last_x()
-                # x can be dataframe or np array, check is it empty
-                if (hasattr(x, 'empty') and x.empty) or (hasattr(x, 'shape') and x.shape[0] == 0):
-                    self._logger.info('Cannot process new data: features are empty. ')
-                    return
-                # Predict
-                y_pred = self.predict(x)
-
-                # Update current trade status
-                self.check_cur_trade()
-
-                # Open or close or do nothing
-                self.process_prediction(y_pred)
-
-                # Save to disk for analysis
-                self.data_persister.save_last_data(self.ticker, {'y_pred': y_pred})
+                slots = list(self.ticker_slots.values())
+                durations = {slot.ticker: 0.0 for slot in slots}
+                with self.process_timer("apply_buffers"):
+                    for slot in slots:
+                        with self.ticker_slot(slot):
+                            self.apply_buffers()
+
+                # Last features of each ticker or previous prediction if ticker data is unchanged
+                xs, y_preds, change_keys = {}, {}, {}
+                for slot in slots:
+                    slot_start = time.monotonic()
+                    with self.ticker_slot(slot):
+                        change_keys[slot.ticker] = self.change_key() if self.is_skip_unchanged else None
+                        y_pred = self.cached_prediction(change_keys[slot.ticker])
+                        if y_pred is not None:
+                            # No new data for the model since previous cycle
+                            MetricServer.metrics.strategy.process.skipped.labels("unchanged").inc()
+                            y_preds[slot.ticker] = y_pred
+                        else:
+                            x = self.prepare_valid_x()
+                            if x is not None:
+                                xs[slot.ticker] = x
+                    durations[slot.ticker] += time.monotonic() - slot_start
+
+                # Predict all tickers in one batch
+                if xs:
+                    predict_start = time.monotonic()
+                    with self.process_timer("predict"):
+                        predicted = self.predict_batch(xs)
+                    predict_duration = time.monotonic() - predict_start
+                    for ticker, y_pred in predicted.items():
+                        durations[ticker] += predict_duration
+                        if change_keys[ticker] is not None:
+                            self.ticker_slots[ticker].last_prediction = (change_keys[ticker], self.model, y_pred)
+                    y_preds.update(predicted)
+
+                # Check current trades even without prediction, trade by predictions
+                for slot in slots:
+                    slot_start = time.monotonic()
+                    with self.ticker_slot(slot):
+                        with self.process_timer("check_cur_trade"):
+                            self.check_cur_trade()
+                        if slot.ticker in y_preds:
+                            self.process_slot_prediction(y_preds[slot.ticker], slot.ticker in xs)
+                    durations[slot.ticker] += time.monotonic() - slot_start
+                # Shadow models predict the same features after live trading is done
+                self.predict_shadows(xs)
+
+                for slot in slots:
+                    MetricServer.metrics.strategy.process.ticker_duration_sec.labels(slot.ticker).observe(
+                        durations[slot.ticker])
+                    MetricServer.metrics.strategy.process.ticker_memory_bytes.labels(slot.ticker).set(
+                        slot.memory_bytes())
             except Exception as e:
                 self._logger.error(f"{e}. Traceback: {traceback.format_exc()}")
             finally:
                 # Set metrics
                 process_duration = datetime.utcnow() - start_time
                 MetricServer.metrics.strategy.process.process_duration_sec.set(process_duration.total_seconds())
+                MetricServer.metrics.strategy.process.stage_duration_sec.labels("total").observe(
+                    process_duration.total_seconds())
+                if self.learn_scheduler:
+                    self.learn_scheduler.observe_process_duration(process_duration.total_seconds())
+                if self.load_shedder:
+                    # Only slow processing is overload, stale input can be late feed and is skipped already
+                    self.load_shedder.on_cycle(process_duration > self.load_shedder.max_age)
                 self.is_processing = False
 
+    def prepare_valid_x(self):
+        """ Last features of current ticker
+        :return features or None if they are empty or stale """
+        with self.process_timer("prepare_last_x"):
+            x = self.prepare_last_x()
+        # x can be dataframe or np array, check is it empty
+        if (hasattr(x, 'empty') and x.empty) or (hasattr(x, 'shape') and x.shape[0] == 0):
+            self._logger.info('Cannot process new data: features are empty. ')
+            return None
+        if self.X_pipe is None and self.current_slot() is not self.main_slot:
+            # Main ticker model is not applied to other ticker data without its own pipes
+            self._logger.info(f"Cannot process {self.ticker} data: ticker pipes are not fitted yet")
+            return None
+        if self.load_shedder and self.load_shedder.is_stale(self.last_data_time(), "stale_input"):
+            return None
+        if self.learn_scheduler:
+            self.learn_scheduler.observe_x(x)
+        return x
+
+    def predict_batch(self, xs: dict) -> dict:
+        """ Predict last features of each ticker
+        :param xs: features by ticker
+        :return predictions by ticker. Strategies can predict all tickers in one model call. """
+        y_preds = {}
+        for ticker, x in xs.items():
+            with self.ticker_slot(self.ticker_slots[ticker]):
+                y_preds[ticker] = self.predict(x)
+        return y_preds
+
+    def predict_shadows(self, xs: dict):
+        """ Predict features of live model by shadow models, save predictions for offline comparison """
+        if not self.shadow_models or (self.load_shedder and self.load_shedder.degrade("shadow")):
+            return
+        with self.process_timer("predict_shadow"):
+            with self.data_lock.read():
+                live_pipes = {ticker: (slot.X_pipe, slot.y_pipe) for ticker, slot in self.ticker_slots.items()}
+                shadow_preds = self.shadow_models.predict(xs, live_pipes, self.main_slot.ticker)
+        for ticker, y_pred in shadow_preds.items():
+            self.data_persister.save_last_data(ticker, {"y_pred_shadow": y_pred})
+
+    def process_slot_prediction(self, y_pred, is_predicted: bool):
+        """ Trade by prediction of current ticker
+        :param is_predicted: prediction is new, not reused from previous cycle """
+        # Prediction is too late to trade
+        if self.load_shedder and self.load_shedder.is_stale(self.last_data_time(), "stale_prediction"):
+            return
+
+        # Open or close or do nothing
+        with self.process_timer("process_prediction"):
+            self.process_prediction(y_pred)
+
+        # Save to disk for analysis
+        if is_predicted and not (self.load_shedder and self.load_shedder.degrade("persist")):
+            with self.process_timer("save_last_data"):
+                self.data_persister.save_last_data(self.ticker, {'y_pred': y_pred})
+
+    @staticmethod
+    def process_timer(stage: str):
+        """ Context manager observing duration of processing stage """
+        return MetricServer.metrics.strategy.process.stage_duration_sec.labels(stage).time()
+
+    @staticmethod
+    def learn_timer(stage: str):
+        """ Context manager observing duration of learning stage """
+        return MetricServer.metrics.strategy.learn.stage_duration_sec.labels(stage).time()
+
     def process_prediction(self, y_pred):
         raise NotImplementedError()
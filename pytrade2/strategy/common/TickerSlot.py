@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pandas as pd
+
+
+class TickerSlot:
+    """
+    State of one ticker of multi ticker strategy: feeds, feature and target pipes, broker trade slot,
+    risk manager and last prediction.
+    Strategy attributes declared as TickerSlot.Attr are stored in the slot of current thread,
+    so strategy code works with one ticker at a time. Threads without a slot use the main ticker slot.
+    """
+
+    class Attr:
+        """ Strategy attribute, stored in the ticker slot of current thread """
+
+        def __set_name__(self, owner, name):
+            self.name = name
+
+        def __get__(self, strategy, owner=None):
+            if strategy is None:
+                return self
+            return getattr(strategy.current_slot(), self.name)
+
+        def __set__(self, strategy, value):
+            setattr(strategy.current_slot(), self.name, value)
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.candles_feed = self.bid_ask_feed = self.level2_feed = None
+        # Pipes fitted on this ticker data: features are scaled and predictions are in the ticker units
+        self.X_pipe = self.y_pipe = None
+        self.predict_X_pipe = self.predict_y_pipe = None
+        # Predictor keeping recurrent state of this ticker sequence
+        self.stateful_predictor = None
+        self.broker = None
+        self.risk_manager = None
+        # Current trade is checked at once
+        self.last_trade_check_time = datetime.min
+        # Change key, model and prediction of the last predicted cycle
+        self.last_prediction = None
+
+    def feeds(self) -> list:
+        return [feed for feed in (self.candles_feed, self.bid_ask_feed, self.level2_feed) if feed]
+
+    def memory_bytes(self) -> int:
+        """ Memory of the ticker data frames """
+        frames = []
+        if self.candles_feed:
+            frames += list(self.candles_feed.candles_by_interval.values())
+        if self.bid_ask_feed:
+            frames.append(self.bid_ask_feed.bid_ask)
+        if self.level2_feed:
+            frames.append(self.level2_feed.level2)
+        return int(sum(frame.memory_usage(index=True).sum() for frame in frames if isinstance(frame, pd.DataFrame)))
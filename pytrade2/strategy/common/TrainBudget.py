@@ -0,0 +1,132 @@
+import logging
+import time
+
+import numpy as np
+
+from metrics.MetricServer import MetricServer
+from strategy.common.ParallelMultiOutputRegressor import ParallelMultiOutputRegressor
+
+
+class TrainBudget:
+    """
+    Wall clock budget for model training. Keras training stops at the deadline or when validation loss plateaus.
+    Lightgbm training stops at the deadline or by early stopping rounds on validation rows.
+    Validation rows are the last rows by time. Achieved epochs or iterations are kept for metrics.
+    """
+
+    def __init__(self, budget_sec: float = 10.0, epochs: int = 100, patience: int = 3,
+                 early_stopping_rounds: int = 20, validation_fraction: float = 0.1):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.budget_sec = budget_sec
+        # Max keras epochs and epochs without val loss improvement
+        self.epochs = epochs
+        self.patience = patience
+        # Lightgbm rounds without validation improvement
+        self.early_stopping_rounds = early_stopping_rounds
+        self.validation_fraction = validation_fraction
+
+        # Last training results
+        self.deadline = None
+        self.iterations = 0
+        self.is_stopped_by_time = False
+        self.overrun_sec = 0.0
+
+    def start(self):
+        self.deadline = time.monotonic() + self.budget_sec
+        self.iterations = 0
+        self.is_stopped_by_time = False
+        self.overrun_sec = 0.0
+
+    def is_over(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    def finish(self):
+        self.overrun_sec = max(0.0, time.monotonic() - self.deadline)
+        self._logger.info(f"Trained {self.iterations} iterations, stopped by time: {self.is_stopped_by_time}, "
+                          f"overrun {self.overrun_sec:.3f}s")
+        MetricServer.metrics.strategy.learn.train_iterations.set(self.iterations)
+        MetricServer.metrics.strategy.learn.budget_overrun_sec.set(self.overrun_sec)
+        if self.is_stopped_by_time:
+            MetricServer.metrics.strategy.learn.budget_stops.inc()
+
+    def validation_size(self, n: int) -> int:
+        """ Last rows count for validation, 0 if too few rows """
+        size = int(n * self.validation_fraction)
+        return size if 0 < size < n else 0
+
+    def keras_callbacks(self, monitor: str = "val_loss") -> list:
+        import keras
+
+        budget = self
+
+        class TimeBudgetCallback(keras.callbacks.Callback):
+            """ Stop training after the batch at the deadline """
+
+            def on_train_batch_end(self, batch, logs=None):
+                if budget.is_over():
+                    budget.is_stopped_by_time = True
+                    self.model.stop_training = True
+
+            def on_epoch_end(self, epoch, logs=None):
+                budget.iterations = epoch + 1
+
+        return [TimeBudgetCallback(),
+                keras.callbacks.EarlyStopping(monitor=monitor, patience=self.patience, restore_best_weights=True)]
+
+    def fit_keras(self, model, X, y, sample_weight=None):
+        """ Fit keras model on rows or windows X within the budget """
+        self.start()
+        val_size = self.validation_size(len(X))
+        if val_size:
+            val_weight = sample_weight[-val_size:] if sample_weight is not None else None
+            model.fit(X[:-val_size], y[:-val_size],
+                      sample_weight=sample_weight[:-val_size] if sample_weight is not None else None,
+                      validation_data=(X[-val_size:], y[-val_size:], val_weight),
+                      epochs=self.epochs, callbacks=self.keras_callbacks("val_loss"), verbose=0)
+        else:
+            model.fit(X, y, sample_weight=sample_weight, epochs=self.epochs,
+                      callbacks=self.keras_callbacks("loss"), verbose=0)
+        self.finish()
+        return model
+
+    def fit_keras_stream(self, stream, model, X, y):
+        """ Fit keras model on memory mapped data of train stream within the budget """
+        self.start()
+        stream.fit(model, X, y, epochs=self.epochs, callbacks=self.keras_callbacks("loss"))
+        self.finish()
+        return model
+
+    def lgb_callbacks(self, is_validation: bool = True) -> list:
+        """ New callbacks for one lightgbm model, early stopping callback keeps state of one training """
+        import lightgbm as lgb
+
+        budget = self
+
+        def time_budget_callback(env):
+            budget.iterations = max(budget.iterations, env.iteration + 1)
+            if budget.is_over():
+                budget.is_stopped_by_time = True
+                raise lgb.callback.EarlyStopException(env.iteration, env.evaluation_result_list)
+
+        callbacks = [time_budget_callback]
+        if is_validation and self.early_stopping_rounds:
+            callbacks.append(lgb.early_stopping(self.early_stopping_rounds, verbose=False))
+        return callbacks
+
+    def fit_lgb(self, model, X, y, sample_weight=None):
+        """ Fit lightgbm regressor or ParallelMultiOutputRegressor of lightgbm regressors within the budget """
+        self.start()
+        X, y = np.asarray(X), np.asarray(y)
+        val_size = self.validation_size(len(X))
+        fit_params = {"sample_weight": sample_weight}
+        if val_size:
+            X, y, fit_params["eval_set"] = X[:-val_size], y[:-val_size], [(X[-val_size:], y[-val_size:])]
+            if sample_weight is not None:
+                fit_params["sample_weight"] = sample_weight[:-val_size]
+        if isinstance(model, ParallelMultiOutputRegressor):
+            fit_params["callbacks_of"] = lambda: self.lgb_callbacks(bool(val_size))
+        else:
+            fit_params["callbacks"] = self.lgb_callbacks(bool(val_size))
+        model.fit(X, y, **fit_params)
+        self.finish()
+        return model
@@ -0,0 +1,132 @@
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+
+from strategy.persist.ModelBackends import ModelBackends
+
+
+class TrainDataStream:
+    """
+    Transformed train data in memory mapped files, streamed to keras fit by tf.data in batches.
+    Features are transformed and written by chunks, lstm windows are built per batch,
+    so memory is bounded by chunk and batch sizes, not by history length.
+    """
+
+    def __init__(self, data_dir: Optional[str], batch_size: int = 32, chunk_size: int = 10000):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        # Temp dir without data dir, removed on exit
+        self.temp_dir = None
+        if not data_dir:
+            data_dir = self.temp_dir = tempfile.mkdtemp(prefix="pytrade2_train_")
+            atexit.register(self.cleanup)
+        Path(data_dir).mkdir(parents=True, exist_ok=True)
+        self.X_path, self.y_path = str(Path(data_dir, "X.npy")), str(Path(data_dir, "y.npy"))
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+
+    def cleanup(self):
+        """ Remove temp dir of memory mapped files, data dir is kept """
+        if self.temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @staticmethod
+    def is_supported(model) -> bool:
+        """ Keras model can fit tf.data dataset """
+        backend = ModelBackends.of(model)
+        return backend is not None and backend.module_name == "keras"
+
+    @staticmethod
+    def rows_pipe(pipe):
+        """ Pipe without trailing reshape to windows, transforms each row independently """
+        if isinstance(pipe, Pipeline) and isinstance(pipe.steps[-1][1], FunctionTransformer):
+            return pipe[:-1]
+        return pipe
+
+    def write_transformed(self, pipe, data: pd.DataFrame, path: str) -> np.ndarray:
+        """ Transform data by chunks to memory mapped file
+        :return read only memory mapped array of transformed rows """
+        pipe = self.rows_pipe(pipe)
+        # Write to temp file and rename, arrays mapped from previous file stay valid
+        tmp_path = f"{path}.tmp.npy"
+        out = None
+        for start in range(0, len(data), self.chunk_size):
+            chunk = pipe.transform(data.iloc[start:start + self.chunk_size])
+            if out is None:
+                out = open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(len(data), chunk.shape[1]))
+            out[start:start + len(chunk)] = chunk
+        out.flush()
+        del out
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode="r")
+
+    def write(self, X_pipe, y_pipe, train_X: pd.DataFrame, train_y: pd.DataFrame) -> (np.ndarray, np.ndarray):
+        """ Write transformed train data
+        :return memory mapped X, y rows, not reshaped to windows """
+        X = self.write_transformed(X_pipe, train_X, self.X_path)
+        y = self.write_transformed(y_pipe, train_y, self.y_path)
+        self._logger.debug(f"Written {X.shape} train features, {y.shape} targets")
+        return X, y
+
+    @staticmethod
+    def window_of(model) -> Optional[int]:
+        """ Window size of the model input (batch, window, features), None if the model takes rows """
+        input_shape = model.inputs[0].shape
+        return int(input_shape[1]) if len(input_shape) == 3 else None
+
+    @staticmethod
+    def windows(X: np.ndarray, start: int, end: int, window: Optional[int]) -> np.ndarray:
+        """ Samples start..end. Sample i is the window of rows ending at i + window - 1. """
+        if not window:
+            return np.array(X[start:end], dtype=np.float32)
+        windows = np.lib.stride_tricks.sliding_window_view(X[start:end + window - 1], window, axis=0)
+        # sliding_window_view puts window axis last: (samples, features, window) -> (samples, window, features)
+        return np.ascontiguousarray(windows.transpose(0, 2, 1), dtype=np.float32)
+
+    def dataset(self, X: np.ndarray, y: np.ndarray, window: Optional[int], shuffle=True):
+        """ tf.data dataset of (x, y) batches loaded from memory mapped files in parallel with prefetch """
+        import tensorflow as tf
+
+        offset = (window or 1) - 1
+        n_samples = len(X) - offset
+        batch_size = self.batch_size
+        starts = np.arange(0, n_samples, batch_size)
+
+        def load_batch(start):
+            start = int(start)
+            end = min(start + batch_size, n_samples)
+            return self.windows(X, start, end, window), np.array(y[start + offset:end + offset], dtype=np.float32)
+
+        x_shape = [None, window, X.shape[1]] if window else [None, X.shape[1]]
+        y_shape = [None, y.shape[1]]
+
+        def load(start):
+            x_batch, y_batch = tf.numpy_function(load_batch, [start], (tf.float32, tf.float32))
+            return tf.ensure_shape(x_batch, x_shape), tf.ensure_shape(y_batch, y_shape)
+
+        ds = tf.data.Dataset.from_tensor_slices(starts)
+        if shuffle:
+            ds = ds.shuffle(len(starts), reshuffle_each_iteration=True)
+        return ds.map(load, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+    def fit(self, model, X: np.ndarray, y: np.ndarray, **fit_args):
+        """ Fit keras model on memory mapped data
+        :param fit_args: epochs, callbacks and other keras fit args """
+        window = self.window_of(model)
+        model.fit(self.dataset(X, y, window), shuffle=False, verbose=0, **fit_args)
+        return model
+
+    def recent_x(self, model, X: np.ndarray, count: int) -> np.ndarray:
+        """ Last samples in model input shape """
+        window = self.window_of(model)
+        n_samples = len(X) - (window or 1) + 1
+        return self.windows(X, max(0, n_samples - count), n_samples, window)
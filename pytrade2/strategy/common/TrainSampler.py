@@ -0,0 +1,70 @@
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class TrainSampler:
+    """
+    Bounded train set: all recent rows plus stratified sample of older rows, with sample weights.
+    Older rows are stratified by signal class if given, so balanced classes stay balanced, otherwise by time.
+    Each sampled row is weighted by the number of older rows it represents, optionally decayed by age.
+    Training cost stays flat when more history is kept.
+    """
+
+    def __init__(self, max_rows: int = 20000, recent_rows: int = 5000, half_life: Optional[pd.Timedelta] = None,
+                 seed: Optional[int] = None):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.max_rows = max_rows
+        self.recent_rows = min(recent_rows, max_rows)
+        # Weight of a row halves each half life of its age, None for no decay
+        self.half_life = half_life
+        self.rng = np.random.default_rng(seed)
+
+    def systematic(self, positions: np.ndarray, k: int) -> np.ndarray:
+        """ k of positions, evenly spread over time with random offset """
+        if k >= len(positions):
+            return positions
+        step = len(positions) / k
+        return positions[(self.rng.uniform(0, step) + np.arange(k) * step).astype(int)]
+
+    def sample_old(self, n_old: int, k: int, strata: Optional[np.ndarray]) -> (np.ndarray, np.ndarray):
+        """ Sample k of n_old older rows
+        :return positions and weights """
+        if strata is None:
+            positions = self.systematic(np.arange(n_old), k)
+            return positions, np.full(len(positions), n_old / len(positions))
+        positions, weights = [], []
+        for stratum in np.unique(strata):
+            stratum_positions = np.flatnonzero(strata == stratum)
+            # Proportional allocation keeps classes ratio
+            stratum_k = max(1, round(k * len(stratum_positions) / n_old))
+            sampled = self.systematic(stratum_positions, stratum_k)
+            positions.append(sampled)
+            weights.append(np.full(len(sampled), len(stratum_positions) / len(sampled)))
+        positions, weights = np.concatenate(positions), np.concatenate(weights)
+        order = np.argsort(positions)
+        return positions[order], weights[order]
+
+    def sample(self, index: pd.DatetimeIndex, strata=None) -> (np.ndarray, np.ndarray):
+        """ Sample train rows
+        :param index: times of train rows, sorted
+        :param strata: class of each row, None to stratify by time
+        :return positions of sampled rows and their weights with mean 1 """
+        n = len(index)
+        strata = np.asarray(strata) if strata is not None else None
+        if n <= self.max_rows:
+            positions, weights = np.arange(n), np.ones(n)
+        else:
+            n_old = n - self.recent_rows
+            old_positions, old_weights = self.sample_old(n_old, self.max_rows - self.recent_rows,
+                                                         strata[:n_old] if strata is not None else None)
+            positions = np.concatenate([old_positions, np.arange(n_old, n)])
+            weights = np.concatenate([old_weights, np.ones(self.recent_rows)])
+            self._logger.info(f"Sampled {len(positions)} of {n} train rows, recent {self.recent_rows}")
+
+        if self.half_life is not None and n:
+            age = (index[-1] - index[positions]) / self.half_life
+            weights = weights * np.power(0.5, np.asarray(age, dtype=float))
+        return positions, weights / weights.mean()
@@ -3,12 +3,15 @@ import multiprocessing
 import threading
 import time
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import numpy as np
 import pandas as pd
 
 from strategy.common.LSTMBidAskRegressionStrategyBase import LSTMBidAskRegressionStrategyBase
+from strategy.common.RWLock import RWLock
+from strategy.common.TickerSlot import TickerSlot
+from strategy.inference.StatefulLstmPredictor import StatefulLstmPredictor
 
 
 class TestLSTMBidAskRegressionStrategyBase(TestCase):
@@ -41,3 +44,40 @@ class TestLSTMBidAskRegressionStrategyBase(TestCase):
         x = np.array([[1, 1, 1]])
         actual = LSTMBidAskRegressionStrategyBase.reshape_x(x, window_shape=(10, 3))
         self.assertListEqual([], actual.tolist())
+
+    def test_prepare_last_x__features_under_read_lock(self):
+        strategy = LSTMBidAskRegressionStrategyBase.__new__(LSTMBidAskRegressionStrategyBase)
+        strategy._slot_local, strategy.main_slot = threading.local(), TickerSlot("test")
+        strategy.bid_ask_feed, strategy.level2_feed, strategy.candles_feed = MagicMock(), MagicMock(), MagicMock()
+        strategy.data_lock, strategy.lstm_window_size, strategy.past_window = RWLock(), 2, "1s"
+
+        with patch("strategy.common.LSTMBidAskRegressionStrategyBase.PredictBidAskFeatures.last_features_of",
+                   side_effect=lambda *args, **kwargs: strategy.data_lock._read_depth()) as features:
+            read_depth = strategy.prepare_last_x()
+
+        # Feed frames are not mutated by feed threads while features are built
+        features.assert_called_once()
+        self.assertEqual(1, read_depth)
+
+    def test_slot_predict_model__stateful_predictor_of_each_ticker(self):
+        strategy = LSTMBidAskRegressionStrategyBase.__new__(LSTMBidAskRegressionStrategyBase)
+        strategy._slot_local, strategy.main_slot = threading.local(), TickerSlot("test")
+        strategy.ticker_slots = {"ticker1": TickerSlot("ticker1"), "test": strategy.main_slot}
+        strategy.predict_model = MagicMock(spec=StatefulLstmPredictor)
+        strategy.predict_model.with_own_state.side_effect = lambda: MagicMock(spec=StatefulLstmPredictor)
+
+        predictors = {}
+        for _ in range(2):
+            for ticker, slot in strategy.ticker_slots.items():
+                with strategy.ticker_slot(slot):
+                    predictors.setdefault(ticker, set()).add(id(strategy.slot_predict_model()))
+
+        # Each ticker keeps own predictor state between cycles
+        self.assertEqual(2, strategy.predict_model.with_own_state.call_count)
+        self.assertEqual([1, 1], [len(ids) for ids in predictors.values()])
+
+        # Updated model gets new state
+        prev_predictor = strategy.ticker_slots["ticker1"].stateful_predictor
+        prev_predictor.is_of.return_value = False
+        with strategy.ticker_slot(strategy.ticker_slots["ticker1"]):
+            self.assertIsNot(prev_predictor, strategy.slot_predict_model())
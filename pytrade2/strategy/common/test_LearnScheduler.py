@@ -0,0 +1,44 @@
+from datetime import datetime
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from strategy.common.LearnScheduler import LearnScheduler
+
+
+class TestLearnScheduler(TestCase):
+    now = datetime(2023, 1, 1, 12)
+
+    def new_scheduler(self) -> LearnScheduler:
+        scheduler = LearnScheduler(min_new_rows=10, max_staleness=pd.Timedelta("1h"), drift_threshold=3,
+                                   max_process_duration_sec=1, max_queue_depth=100, max_defer=pd.Timedelta("10min"))
+        train_X = pd.DataFrame({"a": np.arange(100.0), "b": np.ones(100)})
+        scheduler.on_learned(train_X, pd.Timestamp("2023-01-01 11:59"), self.now)
+        return scheduler
+
+    def test_decide__first_learn(self):
+        self.assertEqual(LearnScheduler.learn, LearnScheduler().decide(0, 0)[0])
+
+    def test_decide__skip_without_new_rows(self):
+        scheduler = self.new_scheduler()
+        self.assertEqual(LearnScheduler.skip, scheduler.decide(0, 0, self.now + pd.Timedelta("2h"))[0])
+        self.assertEqual(LearnScheduler.skip, scheduler.decide(9, 0, self.now + pd.Timedelta("1min"))[0])
+
+    def test_decide__triggers(self):
+        scheduler = self.new_scheduler()
+        self.assertEqual(LearnScheduler.learn, scheduler.decide(10, 0, self.now + pd.Timedelta("1min"))[0])
+        self.assertEqual(LearnScheduler.learn, scheduler.decide(1, 0, self.now + pd.Timedelta("1h"))[0])
+
+        # Constant feature b changed
+        scheduler.observe_x(pd.DataFrame({"a": [50.0], "b": [2.0]}))
+        self.assertGreater(scheduler.drift(), 3)
+        self.assertEqual(LearnScheduler.learn, scheduler.decide(1, 0, self.now + pd.Timedelta("1min"))[0])
+
+    def test_decide__defer_under_load(self):
+        scheduler = self.new_scheduler()
+        self.assertEqual(LearnScheduler.defer, scheduler.decide(10, 101, self.now + pd.Timedelta("1min"))[0])
+        scheduler.observe_process_duration(10)
+        self.assertEqual(LearnScheduler.defer, scheduler.decide(10, 0, self.now + pd.Timedelta("5min"))[0])
+        # Deferred too long
+        self.assertEqual(LearnScheduler.learn, scheduler.decide(10, 0, self.now + pd.Timedelta("11min"))[0])
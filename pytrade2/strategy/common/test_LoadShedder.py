@@ -0,0 +1,43 @@
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from metrics.MetricServer import MetricServer
+from strategy.common.LoadShedder import LoadShedder
+
+
+class TestLoadShedder(TestCase):
+
+    def setUp(self):
+        MetricServer.metrics = MagicMock()
+
+    def test_is_stale(self):
+        shedder = LoadShedder(pd.Timedelta("5s"))
+        now = datetime(2023, 1, 1, 12)
+        self.assertFalse(shedder.is_stale(now - pd.Timedelta("5s"), "stale_input", now))
+        self.assertFalse(shedder.is_stale(None, "stale_input", now))
+        self.assertTrue(shedder.is_stale(now - pd.Timedelta("6s"), "stale_input", now))
+        MetricServer.metrics.strategy.process.skipped.labels.assert_called_once_with("stale_input")
+
+    def test_on_cycle__degrade_and_recover(self):
+        shedder = LoadShedder(pd.Timedelta("5s"), overload_cycles=2, recover_cycles=3, max_level=2)
+        for _ in range(5):
+            shedder.on_cycle(True)
+        self.assertEqual(2, shedder.level)
+        self.assertEqual(pd.Timedelta("2s"), shedder.interval(pd.Timedelta(0)))
+        self.assertEqual(pd.Timedelta("20s"), shedder.interval(pd.Timedelta("10s")))
+
+        for _ in range(3):
+            shedder.on_cycle(False)
+        self.assertEqual(1, shedder.level)
+        # Overloaded cycle resets healthy count
+        shedder.on_cycle(False)
+        shedder.on_cycle(True)
+        shedder.on_cycle(False)
+        self.assertEqual(1, shedder.level)
+        for _ in range(2):
+            shedder.on_cycle(False)
+        self.assertFalse(shedder.is_degraded)
+        self.assertEqual(pd.Timedelta("10s"), shedder.interval(pd.Timedelta("10s")))
@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from strategy.common.OnlineLearner import OnlineLearner
+
+
+class ModelStub:
+    """ Collect rows the model was trained on """
+
+    def __init__(self):
+        self.batches = []
+
+    def train_on_batch(self, X, y):
+        self.batches.append((X, y))
+
+    def trained_rows(self):
+        return sorted([row for X, _ in self.batches for row in X[:, 0].tolist()])
+
+
+class TestOnlineLearner(TestCase):
+
+    @staticmethod
+    def new_xy(values):
+        X = np.array([[v, v] for v in values], dtype=float)
+        y = np.array([[v] for v in values], dtype=float)
+        return X, y, pd.Index(values)
+
+    def test_is_supported(self):
+        self.assertTrue(OnlineLearner.is_supported(ModelStub()))
+        self.assertFalse(OnlineLearner.is_supported(object()))
+
+    def test_learn__first_learn_all_rows(self):
+        learner, model = OnlineLearner(batch_size=2), ModelStub()
+        X, y, index = self.new_xy([1, 2, 3])
+
+        new_len = learner.learn(model, X, y, index)
+
+        self.assertEqual(3, new_len)
+        self.assertEqual([1, 2, 3], model.trained_rows())
+        self.assertEqual(2, len(model.batches))
+        self.assertEqual(3, learner.last_index)
+
+    def test_learn__new_rows_with_replay(self):
+        learner, model = OnlineLearner(batch_size=10, replay_ratio=1), ModelStub()
+        learner.learn(model, *self.new_xy([1, 2, 3]))
+        model.batches.clear()
+
+        new_len = learner.learn(model, *self.new_xy([2, 3, 4]))
+
+        # Only row 4 is new, one row is replayed from previous rows
+        self.assertEqual(1, new_len)
+        trained = model.trained_rows()
+        self.assertEqual(2, len(trained))
+        self.assertIn(4, trained)
+        self.assertEqual([1, 2, 3, 4], learner.X_buf[:, 0].tolist())
+
+    def test_learn__no_new_rows(self):
+        learner, model = OnlineLearner(), ModelStub()
+        learner.learn(model, *self.new_xy([1, 2]))
+        model.batches.clear()
+
+        self.assertEqual(0, learner.learn(model, *self.new_xy([1, 2])))
+        self.assertFalse(model.batches)
+
+    def test_learn__buffer_size_limited(self):
+        learner, model = OnlineLearner(buffer_size=2), ModelStub()
+        learner.learn(model, *self.new_xy([1, 2, 3]))
+        learner.learn(model, *self.new_xy([4]))
+        self.assertEqual([3, 4], learner.X_buf[:, 0].tolist())
+        self.assertEqual([3, 4], learner.y_buf[:, 0].tolist())
+
+    def test_reset(self):
+        learner = OnlineLearner()
+        learner.learn(ModelStub(), *self.new_xy([1, 2]))
+        learner.reset()
+        self.assertFalse(learner.is_started)
+        self.assertIsNone(learner.X_buf)
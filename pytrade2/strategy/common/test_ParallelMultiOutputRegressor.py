@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+import lightgbm as lgb
+import numpy as np
+from sklearn.multioutput import MultiOutputRegressor
+
+from strategy.common.ParallelMultiOutputRegressor import ParallelMultiOutputRegressor
+
+
+class TestParallelMultiOutputRegressor(TestCase):
+
+    def test_fit__same_as_sequential(self):
+        rnd = np.random.default_rng(0)
+        X, y = rnd.random((200, 3)), rnd.random((200, 2))
+        estimator = lgb.LGBMRegressor(verbose=-1, n_estimators=5, deterministic=True, force_row_wise=True)
+        sequential = MultiOutputRegressor(estimator).fit(X, y)
+
+        parallel = ParallelMultiOutputRegressor.of(MultiOutputRegressor(estimator), threads_per_estimator=1).fit(X, y)
+
+        self.assertEqual(2, len(parallel.estimators_))
+        self.assertEqual(1, parallel.estimators_[0].n_jobs)
+        np.testing.assert_allclose(sequential.predict(X), parallel.predict(X))
+
+    def test_of__keeps_parallel_model(self):
+        model = ParallelMultiOutputRegressor(lgb.LGBMRegressor(), threads_per_estimator=2)
+        self.assertIs(model, ParallelMultiOutputRegressor.of(model, 2))
+        self.assertIsNot(model, ParallelMultiOutputRegressor.of(model, 4))
+
+    def test_estimator_threads(self):
+        model = ParallelMultiOutputRegressor(lgb.LGBMRegressor())
+        self.assertGreaterEqual(model.estimator_threads(n_outputs=2), 1)
+        self.assertEqual(3, ParallelMultiOutputRegressor(lgb.LGBMRegressor(),
+                                                         threads_per_estimator=3).estimator_threads(2))
@@ -0,0 +1,42 @@
+import time
+from unittest import TestCase
+
+import pandas as pd
+
+from strategy.common.ProcessingTrigger import ProcessingTrigger
+
+
+class TestProcessingTrigger(TestCase):
+
+    def test_parse(self):
+        self.assertEqual(({"bid_ask", "bar"}, "5min"), ProcessingTrigger.parse("bid_ask, bar:5min"))
+        self.assertEqual(({"bar"}, None), ProcessingTrigger.parse("bar"))
+        self.assertRaises(ValueError, ProcessingTrigger.parse, "tick")
+
+    def test_on_data__only_declared_kinds(self):
+        trigger = ProcessingTrigger({ProcessingTrigger.bar})
+        trigger.source(ProcessingTrigger.bid_ask).set()
+        self.assertFalse(trigger.is_set())
+
+        trigger.source(ProcessingTrigger.bar).set()
+        self.assertTrue(trigger.is_set())
+
+    def test_on_data__debounce(self):
+        trigger = ProcessingTrigger({ProcessingTrigger.bid_ask}, debounce=pd.Timedelta("0.2s"))
+        source = trigger.source(ProcessingTrigger.bid_ask)
+        source.set()
+        first_time = trigger.take(0)
+        self.assertIsNotNone(first_time)
+
+        # Ticks during debounce wake processing once at debounce end
+        source.set()
+        source.set()
+        self.assertFalse(trigger.is_set())
+        self.assertTrue(trigger.wait(1))
+        # Latency is measured from the earliest tick
+        self.assertLessEqual(trigger.take(0), time.monotonic() - 0.1)
+
+    def test_next_bar_time(self):
+        trigger = ProcessingTrigger({ProcessingTrigger.bar}, bar_period="1min")
+        self.assertEqual(120, trigger.next_bar_time(60))
+        self.assertEqual(120, trigger.next_bar_time(119.9))
@@ -0,0 +1,101 @@
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from metrics.MetricServer import MetricServer
+from strategy.common.RWLock import RWLock
+
+
+class TestRWLock(TestCase):
+
+    def setUp(self):
+        MetricServer.metrics = MagicMock()
+
+    def test_readers_concurrent(self):
+        lock = RWLock()
+        barrier = threading.Barrier(3, timeout=5)
+
+        def read():
+            with lock.read():
+                # All readers are inside the lock at once, otherwise barrier breaks
+                barrier.wait()
+
+        threads = [threading.Thread(target=read) for _ in range(3)]
+        [t.start() for t in threads]
+        [t.join(5) for t in threads]
+        self.assertFalse(barrier.broken)
+
+    def test_writer_excludes_readers(self):
+        lock, events = RWLock(), []
+
+        def read():
+            with lock.read():
+                events.append("read")
+
+        with lock:
+            reader = threading.Thread(target=read)
+            reader.start()
+            time.sleep(0.05)
+            events.append("write")
+        reader.join(5)
+
+        self.assertEqual(["write", "read"], events)
+
+    def test_waiting_writer_blocks_new_readers(self):
+        lock, events = RWLock(), []
+
+        def write():
+            with lock.write():
+                events.append("write")
+
+        def read():
+            with lock.read():
+                events.append("read")
+
+        with lock.read():
+            writer = threading.Thread(target=write)
+            writer.start()
+            time.sleep(0.05)
+            reader = threading.Thread(target=read)
+            reader.start()
+            time.sleep(0.05)
+            self.assertEqual([], events)
+        writer.join(5)
+        reader.join(5)
+
+        self.assertEqual(["write", "read"], events)
+
+    def test_reentrant(self):
+        lock = RWLock()
+        with lock:
+            with lock.write():
+                with lock.read():
+                    pass
+        with lock.read():
+            with lock.read():
+                pass
+        # Released, other thread can write
+        writer = threading.Thread(target=lambda: lock.acquire_write() or lock.release_write())
+        writer.start()
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+
+    def test_upgrade_not_allowed(self):
+        lock = RWLock()
+        with lock.read():
+            self.assertRaises(RuntimeError, lock.acquire_write)
+
+    def test_metrics(self):
+        lock = RWLock()
+        with lock.read():
+            with lock.read():
+                pass
+        with lock:
+            pass
+
+        process_metrics = MetricServer.metrics.strategy.process
+        process_metrics.lock_wait_sec.labels.assert_any_call("read")
+        process_metrics.lock_hold_sec.labels.assert_any_call("write")
+        # Outermost locks only
+        self.assertEqual(2, process_metrics.lock_hold_sec.labels.return_value.observe.call_count)
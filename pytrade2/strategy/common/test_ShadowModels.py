@@ -0,0 +1,121 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from strategy.common.ShadowModels import ShadowModels
+from strategy.persist.ModelBackends import ModelBackends
+
+
+class TestShadowModels(TestCase):
+    X = pd.DataFrame({"x1": [1.0, 2.0, 3.0, 4.0], "x2": [2.0, 1.0, 4.0, 3.0]},
+                     index=pd.date_range("2024-01-01", periods=4, freq="1min"))
+    y = pd.DataFrame({"fut_low_diff": [1.0, 2.0, 3.0, 4.0], "fut_high_diff": [3.0, 2.0, 5.0, 4.0]}, index=X.index)
+
+    def fitted_pipes(self):
+        x_pipe = Pipeline([("xrs", StandardScaler())]).fit(self.X)
+        y_pipe = Pipeline([("yrs", StandardScaler())]).fit(self.y)
+        return x_pipe, y_pipe
+
+    def fitted_model(self, x_pipe, y_pipe):
+        return LinearRegression().fit(x_pipe.transform(self.X), y_pipe.transform(self.y))
+
+    def test_parse(self):
+        self.assertListEqual([("Model1", "3"), ("Model2", "5")], ShadowModels.parse(" 3, Model2:5,", "Model1"))
+        self.assertListEqual([], ShadowModels.parse(None, "Model1"))
+
+    def test_predict_shared_features(self):
+        x_pipe, y_pipe = self.fitted_pipes()
+        model1, model2 = self.fitted_model(x_pipe, y_pipe), self.fitted_model(x_pipe, y_pipe)
+        x_pipe.transform = MagicMock(wraps=x_pipe.transform)
+        model2.predict = MagicMock(wraps=model2.predict)
+        shadows = ShadowModels(MagicMock(), [])
+        # Shadows without own pipes use live ones
+        shadows.models = [("Model v1", model1, None, None), ("Model v2", model2, None, None)]
+        xs = {"ticker1": self.X.head(2), "ticker2": self.X}
+
+        y_preds = shadows.predict(xs, {"ticker1": (x_pipe, y_pipe), "ticker2": (x_pipe, y_pipe)}, "ticker2")
+
+        # Features of each ticker transformed once for both models
+        self.assertEqual(2, x_pipe.transform.call_count)
+        # Each model predicts all tickers in one call
+        model2.predict.assert_called_once()
+        self.assertEqual((2, 2), model2.predict.call_args.args[0].shape)
+        self.assertListEqual(["ticker1", "ticker2"], list(y_preds.keys()))
+        self.assertListEqual(["model", "fut_low_diff", "fut_high_diff"], y_preds["ticker2"].columns.tolist())
+        self.assertListEqual(["Model v1", "Model v2"], y_preds["ticker2"]["model"].tolist())
+        self.assertListEqual([self.X.index[1]] * 2, y_preds["ticker1"].index.tolist())
+        np.testing.assert_almost_equal(self.y.iloc[-1].values,
+                                       y_preds["ticker2"][["fut_low_diff", "fut_high_diff"]].values[0])
+
+    def test_predict_own_pipes_for_main_ticker_only(self):
+        x_pipe, y_pipe = self.fitted_pipes()
+        model = self.fitted_model(x_pipe, y_pipe)
+        # Other ticker prices are 100 times higher, its live pipes are fitted on its own data
+        other_x_pipe = Pipeline([("xrs", StandardScaler())]).fit(self.X * 100)
+        other_y_pipe = Pipeline([("yrs", StandardScaler())]).fit(self.y * 100)
+        shadows = ShadowModels(MagicMock(), [])
+        shadows.models = [("Model v1", model, x_pipe, y_pipe)]
+        live_pipes = {"ticker1": (other_x_pipe, other_y_pipe), "ticker2": (MagicMock(), MagicMock())}
+
+        y_preds = shadows.predict({"ticker1": self.X * 100, "ticker2": self.X}, live_pipes, "ticker2")
+
+        # Each ticker prediction is in its own units
+        np.testing.assert_almost_equal(self.y.iloc[-1].values * 100,
+                                       y_preds["ticker1"][["fut_low_diff", "fut_high_diff"]].values[0])
+        np.testing.assert_almost_equal(self.y.iloc[-1].values,
+                                       y_preds["ticker2"][["fut_low_diff", "fut_high_diff"]].values[0])
+
+    def test_predict_failed_model_skipped(self):
+        x_pipe, y_pipe = self.fitted_pipes()
+        bad_model = MagicMock()
+        bad_model.predict.side_effect = ValueError("wrong features")
+        shadows = ShadowModels(MagicMock(), [])
+        shadows.models = [("Model v1", bad_model, None, None),
+                          ("Model v2", self.fitted_model(x_pipe, y_pipe), x_pipe, y_pipe)]
+
+        y_preds = shadows.predict({"ticker1": self.X}, {"ticker1": (MagicMock(), MagicMock())}, "ticker1")
+
+        self.assertListEqual(["Model v2"], y_preds["ticker1"]["model"].tolist())
+
+    def test_predict_by_model_backend(self):
+        x_pipe, y_pipe = self.fitted_pipes()
+        model = self.fitted_model(x_pipe, y_pipe)
+        backend = MagicMock()
+        backend.predict.side_effect = lambda m, x: m.predict(x)
+        shadows = ShadowModels(MagicMock(), [])
+        shadows.models = [("Model v1", model, None, None)]
+
+        with patch.object(ModelBackends, "of", return_value=backend):
+            y_preds = shadows.predict({"ticker1": self.X}, {"ticker1": (x_pipe, y_pipe)}, "ticker1")
+
+        backend.predict.assert_called_once()
+        self.assertIs(model, backend.predict.call_args.args[0])
+        self.assertListEqual(["Model v1"], y_preds["ticker1"]["model"].tolist())
+
+    def test_load_without_pipes_warned(self):
+        persister = MagicMock()
+        persister.mlflow_cache_dir = None
+        persister.load_version_pipes.return_value = (None, None)
+        shadows = ShadowModels(persister, [("Model", "1")])
+
+        with self.assertLogs("ShadowModels", "WARNING") as logs:
+            shadows.load()
+
+        self.assertListEqual(["Model v1"], [label for label, *_ in shadows.models])
+        self.assertIn("Model v1 has no pipes", logs.output[0])
+
+    def test_load_bad_version_skipped(self):
+        persister = MagicMock()
+        persister.mlflow_cache_dir = None
+        persister.get_model_version.side_effect = [ValueError("not found"), MagicMock()]
+        persister.load_version_pipes.return_value = (None, None)
+        shadows = ShadowModels(persister, [("Model", "1"), ("Model", "2")])
+
+        shadows.load()
+
+        self.assertListEqual(["Model v2"], [label for label, *_ in shadows.models])
@@ -4,6 +4,7 @@ from unittest import TestCase
 from unittest.mock import MagicMock
 import pandas as pd
 from strategy.common.SignalClassificationStrategyBase import SignalClassificationStrategyBase
+from strategy.common.RWLock import RWLock
 
 
 class SignalClassificationStrategyBaseTest(TestCase):
@@ -35,7 +36,7 @@ class SignalClassificationStrategyBaseTest(TestCase):
         strategy.X_pipe = MagicMock()
         strategy.y_pipe = MagicMock()
         strategy.data_persister = MagicMock()
-        strategy.data_lock = multiprocessing.RLock()
+        strategy.data_lock = RWLock()
         # strategy.new_data_event = multiprocessing.Event()
         # strategy.candles_cnt_by_interval = {'1min': 1, '5min': 1}
         # strategy.candles_feed.candles_by_interval = dict()
@@ -1,7 +1,18 @@
+import tempfile
+from datetime import datetime
 from unittest import TestCase
 from unittest.mock import MagicMock
 
+import numpy as np
+import pandas as pd
+
+from metrics.MetricServer import MetricServer
+from strategy.common.LearnScheduler import LearnScheduler
+from strategy.common.LoadShedder import LoadShedder
 from strategy.common.StrategyBase import StrategyBase
+from strategy.common.TickerSlot import TickerSlot
+from strategy.common.TrainSampler import TrainSampler
+from strategy.persist.FeatureStore import FeatureStore
 
 
 class TestStrategyBase(TestCase):
@@ -79,3 +90,293 @@ class TestStrategyBase(TestCase):
 
         strategy.apply_params({"is_trailing_stop": True})
         self.assertTrue(strategy.is_trailing_stop)
+
+    def test_stage_model__swapped_on_update(self):
+        strategy = self.new_strategy()
+        model, model_version = MagicMock(), MagicMock()
+        model_version.version = "2"
+        strategy.stage_model(model, model_version, {"intParam": 5})
+
+        # Staged model is not used until update_model is called in processing loop
+        self.assertFalse(strategy.model_version)
+        self.assertEqual(1, strategy.intParam)
+
+        strategy.update_model()
+        self.assertEqual(model, strategy.model)
+        self.assertEqual(model_version, strategy.model_version)
+        self.assertEqual(5, strategy.intParam)
+        self.assertIsNone(strategy.staged_model)
+
+    def test_stage_model__wrong_features_skipped(self):
+        strategy = self.new_strategy()
+        strategy.X_pipe = MagicMock()
+        strategy.X_pipe.n_features_in_ = 3
+        model = MagicMock()
+        model.n_features_in_ = 2
+
+        strategy.stage_model(model, MagicMock(), {})
+
+        self.assertIsNone(strategy.staged_model)
+        strategy.update_model()
+        self.assertFalse(strategy.model_version)
+
+    def test_stage_model__pipes_swapped_with_model(self):
+        strategy = self.new_strategy()
+        strategy.X_pipe, strategy.y_pipe = MagicMock(), MagicMock()
+        strategy.X_pipe.n_features_in_ = 3
+        model, x_pipe, y_pipe = MagicMock(), MagicMock(), MagicMock()
+        model.n_features_in_, x_pipe.n_features_in_ = 2, 2
+
+        # Model fits its own pipes, not current ones
+        strategy.stage_model(model, MagicMock(), {}, (x_pipe, y_pipe))
+        strategy.update_model()
+
+        self.assertEqual(model, strategy.model)
+        self.assertEqual((x_pipe, y_pipe), (strategy.X_pipe, strategy.y_pipe))
+
+    def test_prepare_train_xy__new_rows_appended_to_store(self):
+        strategy = self.new_strategy()
+        index = pd.date_range("2023-01-01", periods=20, freq="1s")
+        X, y = pd.DataFrame({"x": range(20)}, index=index), pd.DataFrame({"y": range(20)}, index=index)
+        # New features after features_since, targets only known up to 00:00:14
+        strategy.prepare_xy_since = MagicMock(side_effect=lambda features_since, targets_since: (
+            X[X.index > features_since] if features_since is not None else X,
+            y[(y.index > targets_since if targets_since is not None else True) & (y.index <= index[14])]))
+
+        with tempfile.TemporaryDirectory() as store_dir:
+            strategy.feature_store = FeatureStore(store_dir)
+            strategy.prepare_train_xy()
+            train_X, train_y = strategy.prepare_train_xy()
+
+            strategy.prepare_xy_since.assert_called_with(index[19], index[14])
+            # Last 10s history window of rows with targets
+            self.assertListEqual(list(range(10, 15)), train_X["x"].tolist())
+            self.assertListEqual(train_X.index.tolist(), train_y.index.tolist())
+
+    def test_learn__skipped_by_scheduler(self):
+        strategy = self.new_strategy()
+        strategy.learn_scheduler = LearnScheduler()
+        strategy.learn_scheduler.on_learned(pd.DataFrame({"x": [1.0, 2.0]}), pd.Timestamp("2023-01-01"))
+        strategy.labeled_index = MagicMock(return_value=pd.DatetimeIndex([pd.Timestamp("2023-01-01")]))
+        strategy.prepare_xy = MagicMock()
+        MetricServer.metrics = MagicMock()
+
+        strategy.learn()
+
+        # No new labeled rows after previous learn
+        strategy.prepare_xy.assert_not_called()
+        MetricServer.metrics.strategy.learn.skipped.inc.assert_called_once()
+
+    def test_fit_ticker_pipes__other_tickers_own_pipes(self):
+        strategy = self.new_strategy()
+        main_pipes = strategy.X_pipe, strategy.y_pipe = MagicMock(), MagicMock()
+        strategy.ticker_slots = {"ticker1": TickerSlot("ticker1"), "test": strategy.main_slot}
+        strategy.can_learn = MagicMock(return_value=True)
+        strategy.prepare_xy = MagicMock(side_effect=lambda: (f"X_{strategy.ticker}", f"y_{strategy.ticker}"))
+        strategy.create_pipe = MagicMock(side_effect=lambda X, y: (f"{X}_pipe", f"{y}_pipe"))
+
+        strategy.fit_ticker_pipes()
+
+        # Main ticker pipes are fitted with the model, other ticker pipes on own data
+        strategy.create_pipe.assert_called_once_with("X_ticker1", "y_ticker1")
+        slot = strategy.ticker_slots["ticker1"]
+        self.assertEqual(("X_ticker1_pipe", "y_ticker1_pipe"), (slot.X_pipe, slot.y_pipe))
+        self.assertEqual(main_pipes, (strategy.X_pipe, strategy.y_pipe))
+
+    def test_load_last_local_model__sized_by_pipes(self):
+        strategy = self.new_strategy()
+        X = pd.DataFrame({"x1": [1.0, 2.0], "x2": [2.0, 1.0], "x3": [0.0, 1.0]})
+        y = pd.DataFrame({"y1": [1.0, 2.0], "y2": [2.0, 3.0]})
+        strategy.X_pipe, strategy.y_pipe = strategy.create_pipe(X, y)
+        strategy.model_persister = MagicMock()
+        strategy.create_model = MagicMock()
+
+        strategy.model_persister.has_last_model.return_value = False
+        strategy.load_last_local_model()
+        # Nothing saved locally, wait for learning
+        strategy.create_model.assert_not_called()
+        self.assertIsNone(strategy.model)
+
+        strategy.model_persister.has_last_model.return_value = True
+        strategy.load_last_local_model()
+        strategy.create_model.assert_called_once_with(3, 2)
+        self.assertIs(strategy.create_model.return_value, strategy.model)
+
+    def test_sample_train__windows_sampled_with_signal_strata(self):
+        strategy = self.new_strategy()
+        strategy.train_sampler = TrainSampler(max_rows=6, recent_rows=2, seed=1)
+        index = pd.date_range("2023-01-01", periods=12, freq="1s")
+        train_X = pd.DataFrame({"x": range(12)}, index=index)
+        train_y = pd.DataFrame({"signal": [-1, 1] * 6}, index=index)
+        # Windows of 3 rows: 10 samples, aligned with last 10 rows
+        X_trans, y_trans = np.arange(10)[:, None], np.arange(2, 12)[:, None]
+
+        X_sample, y_sample, sample_weight = strategy.sample_train(train_X, train_y, X_trans, y_trans)
+
+        self.assertEqual(6, len(X_sample))
+        self.assertListEqual((X_sample + 2).tolist(), y_sample.tolist())
+        self.assertListEqual([8, 9], X_sample[-2:, 0].tolist())
+        self.assertEqual(6, len(sample_weight))
+
+    def test_process_new_data__stages_timed(self):
+        strategy = self.new_strategy()
+        strategy.model = MagicMock()
+        strategy.prepare_last_x = MagicMock(return_value=pd.DataFrame({"x": [1]}))
+        strategy.predict = MagicMock()
+        strategy.check_cur_trade = MagicMock()
+        strategy.process_prediction = MagicMock()
+        strategy.data_persister = MagicMock()
+        MetricServer.metrics = MagicMock()
+
+        strategy.process_new_data()
+
+        stages = [c.args[0] for c in MetricServer.metrics.strategy.process.stage_duration_sec.labels.call_args_list]
+        self.assertListEqual(["apply_buffers", "prepare_last_x", "predict", "check_cur_trade", "process_prediction",
+                              "save_last_data", "total"], stages)
+
+    def test_process_new_data__stale_input_not_predicted(self):
+        strategy = self.new_strategy()
+        strategy.model = MagicMock()
+        strategy.load_shedder = LoadShedder(pd.Timedelta("5s"), overload_cycles=1)
+        strategy.last_data_time = MagicMock(return_value=datetime.utcnow() - pd.Timedelta("1min"))
+        strategy.prepare_last_x = MagicMock(return_value=pd.DataFrame({"x": [1]}))
+        strategy.predict = MagicMock()
+        strategy.check_cur_trade = MagicMock()
+        strategy.process_prediction = MagicMock()
+        strategy.data_persister = MagicMock()
+        MetricServer.metrics = MagicMock()
+
+        strategy.process_new_data()
+
+        strategy.predict.assert_not_called()
+        strategy.process_prediction.assert_not_called()
+        MetricServer.metrics.strategy.process.skipped.labels.assert_called_once_with("stale_input")
+        # Current trade is checked anyway
+        strategy.check_cur_trade.assert_called_once()
+        # Late input is not an overload of fast processing
+        self.assertFalse(strategy.load_shedder.is_degraded)
+
+    def test_process_new_data__stale_prediction_not_traded(self):
+        strategy = self.new_strategy()
+        strategy.model = MagicMock()
+        strategy.load_shedder = LoadShedder(pd.Timedelta("5s"))
+        # Input is fresh before predict, prediction is late
+        strategy.last_data_time = MagicMock(side_effect=[datetime.utcnow(), datetime.utcnow() - pd.Timedelta("1min")])
+        strategy.prepare_last_x = MagicMock(return_value=pd.DataFrame({"x": [1]}))
+        strategy.predict = MagicMock(return_value="y1")
+        strategy.check_cur_trade = MagicMock()
+        strategy.process_prediction = MagicMock()
+        strategy.data_persister = MagicMock()
+        MetricServer.metrics = MagicMock()
+
+        strategy.process_new_data()
+
+        strategy.predict.assert_called_once()
+        strategy.check_cur_trade.assert_called_once()
+        strategy.process_prediction.assert_not_called()
+        MetricServer.metrics.strategy.process.skipped.labels.assert_called_once_with("stale_prediction")
+
+    def test_apply_buffers__degraded_keeps_latest_level2(self):
+        strategy = self.new_strategy()
+        strategy.load_shedder = LoadShedder(pd.Timedelta("5s"), overload_cycles=1)
+        strategy.level2_feed = MagicMock()
+        strategy.data_persister = MagicMock()
+        MetricServer.metrics = MagicMock()
+        strategy.load_shedder.on_cycle(True)
+
+        strategy.apply_buffers()
+
+        strategy.level2_feed.apply_buf.assert_called_once_with(is_latest_only=True)
+
+    def test_apply_buffers__degraded_keeps_shared_level2(self):
+        strategy = self.new_strategy()
+        strategy.load_shedder = LoadShedder(pd.Timedelta("5s"), overload_cycles=1)
+        strategy.shared_feeds = MagicMock()
+        strategy.level2_feed = MagicMock()
+        strategy.data_persister = MagicMock()
+        MetricServer.metrics = MagicMock()
+        strategy.load_shedder.on_cycle(True)
+
+        strategy.apply_buffers()
+
+        # Other strategies of the host read the same level2, it is not thinned
+        strategy.level2_feed.apply_buf.assert_called_once_with(is_latest_only=False)
+        MetricServer.metrics.strategy.process.degraded.labels.assert_called_once_with("persist")
+
+    def test_last_data_time__next_candle_expected(self):
+        strategy = self.new_strategy()
+        strategy.candles_feed = MagicMock()
+        strategy.candles_feed.candles_cnt_by_interval = {"1min": 1, "5min": 1}
+        strategy.candles_feed.candles_by_interval = {
+            "1min": pd.DataFrame({"close": [1]}, index=[pd.Timestamp("2024-01-01 00:01")])}
+
+        # Last 1min candle is late only after the next one is expected
+        self.assertEqual(pd.Timestamp("2024-01-01 00:02"), strategy.last_data_time())
+
+    def test_process_new_data__unchanged_key_reuses_prediction(self):
+        strategy = self.new_strategy()
+        strategy.model = MagicMock()
+        strategy.is_skip_unchanged = True
+        strategy.change_key = MagicMock(side_effect=[("bar1",), ("bar1",), ("bar2",)])
+        strategy.prepare_last_x = MagicMock(return_value=pd.DataFrame({"x": [1]}))
+        strategy.predict = MagicMock(side_effect=["y1", "y2"])
+        strategy.check_cur_trade = MagicMock()
+        strategy.process_prediction = MagicMock()
+        strategy.data_persister = MagicMock()
+        MetricServer.metrics = MagicMock()
+
+        for _ in range(3):
+            strategy.process_new_data()
+
+        self.assertEqual(2, strategy.predict.call_count)
+        self.assertEqual(3, strategy.check_cur_trade.call_count)
+        self.assertListEqual(["y1", "y1", "y2"], [c.args[0] for c in strategy.process_prediction.call_args_list])
+        MetricServer.metrics.strategy.process.skipped.labels.assert_called_once_with("unchanged")
+
+    def test_process_new_data__shadows_predict_live_features(self):
+        strategy = self.new_strategy()
+        strategy.model = MagicMock()
+        x = pd.DataFrame({"x": [1]})
+        strategy.prepare_last_x = MagicMock(return_value=x)
+        strategy.predict = MagicMock(return_value="y1")
+        strategy.check_cur_trade = MagicMock()
+        strategy.process_prediction = MagicMock()
+        strategy.data_persister = MagicMock()
+        strategy.shadow_models = MagicMock()
+        shadow_pred = pd.DataFrame({"model": ["Model v1"], "y": [2]})
+        strategy.shadow_models.predict.return_value = {"test": shadow_pred}
+        MetricServer.metrics = MagicMock()
+
+        strategy.process_new_data()
+
+        # Features are prepared once for live and shadow models
+        strategy.prepare_last_x.assert_called_once()
+        self.assertIs(x, strategy.shadow_models.predict.call_args.args[0]["test"])
+        # Shadow predictions are saved, not traded
+        strategy.process_prediction.assert_called_once_with("y1")
+        strategy.data_persister.save_last_data.assert_any_call("test", {"y_pred_shadow": shadow_pred})
+
+    def test_process_new_data__multi_ticker_batch(self):
+        strategy = self.new_strategy()
+        strategy.is_multi_ticker = True
+        strategy.ticker_slots = {"ticker1": TickerSlot("ticker1"), "test": strategy.main_slot}
+        for slot in strategy.ticker_slots.values():
+            slot.broker, slot.X_pipe = MagicMock(), MagicMock()
+        strategy.model = MagicMock()
+        strategy.prepare_last_x = MagicMock(side_effect=lambda: pd.DataFrame({"x": [strategy.ticker]}))
+        strategy.predict_batch = MagicMock(side_effect=lambda xs: {ticker: f"y_{ticker}" for ticker in xs})
+        strategy.process_prediction = MagicMock(side_effect=lambda y_pred: strategy.broker.trade(strategy.ticker))
+        strategy.data_persister = MagicMock()
+        MetricServer.metrics = MagicMock()
+
+        strategy.process_new_data()
+
+        # One model call for all tickers
+        strategy.predict_batch.assert_called_once()
+        self.assertListEqual(["ticker1", "test"], list(strategy.predict_batch.call_args.args[0].keys()))
+        self.assertListEqual(["y_ticker1", "y_test"], [c.args[0] for c in strategy.process_prediction.call_args_list])
+        # Each ticker trades with own broker
+        strategy.ticker_slots["ticker1"].broker.trade.assert_called_once_with("ticker1")
+        strategy.main_slot.broker.trade.assert_called_once_with("test")
+        self.assertEqual("test", strategy.ticker)
+        self.assertEqual(2, MetricServer.metrics.strategy.process.ticker_duration_sec.labels.call_count)
@@ -0,0 +1,36 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from strategy.common.TickerSlot import TickerSlot
+
+
+class TestTickerSlot(TestCase):
+    class Strategy:
+        ticker = TickerSlot.Attr()
+
+        def __init__(self):
+            self.main_slot, self.slot = TickerSlot("main"), None
+
+        def current_slot(self):
+            return self.slot or self.main_slot
+
+    def test_attr__current_slot(self):
+        strategy, other = self.Strategy(), TickerSlot("other")
+        self.assertEqual("main", strategy.ticker)
+
+        strategy.slot = other
+        self.assertEqual("other", strategy.ticker)
+        strategy.ticker = "other2"
+        self.assertEqual("other2", other.ticker)
+        self.assertEqual("main", strategy.main_slot.ticker)
+
+    def test_memory_bytes(self):
+        slot = TickerSlot("ticker1")
+        self.assertEqual(0, slot.memory_bytes())
+
+        slot.bid_ask_feed = MagicMock()
+        slot.bid_ask_feed.bid_ask = pd.DataFrame({"bid": [1.0] * 10}, index=pd.RangeIndex(10))
+        self.assertEqual(slot.bid_ask_feed.bid_ask.memory_usage(index=True).sum(), slot.memory_bytes())
+        self.assertListEqual([slot.bid_ask_feed], slot.feeds())
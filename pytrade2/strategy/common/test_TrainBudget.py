@@ -0,0 +1,65 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import lightgbm as lgb
+import numpy as np
+from keras import Sequential, Input
+from keras.layers import Dense
+from keras.optimizers import SGD
+
+from metrics.MetricServer import MetricServer
+from strategy.common.ParallelMultiOutputRegressor import ParallelMultiOutputRegressor
+from strategy.common.TrainBudget import TrainBudget
+
+
+class TestTrainBudget(TestCase):
+
+    def setUp(self):
+        MetricServer.metrics = MagicMock()
+        rnd = np.random.default_rng(0)
+        self.X = rnd.random((200, 3))
+        self.y = np.column_stack([self.X.sum(axis=1), self.X[:, 0]])
+
+    def test_fit_keras__stopped_by_time(self):
+        model = Sequential([Input(shape=(3,)), Dense(2)])
+        model.compile(optimizer="adam", loss="mae")
+
+        budget = TrainBudget(budget_sec=0, epochs=1000)
+        budget.fit_keras(model, self.X, self.y)
+
+        self.assertTrue(budget.is_stopped_by_time)
+        self.assertEqual(1, budget.iterations)
+        MetricServer.metrics.strategy.learn.budget_stops.inc.assert_called_once()
+
+    def test_fit_keras__early_stopping(self):
+        model = Sequential([Input(shape=(3,)), Dense(2)])
+        # Zero learning rate, validation loss does not improve
+        model.compile(optimizer=SGD(learning_rate=0.0), loss="mae")
+
+        budget = TrainBudget(budget_sec=600, epochs=1000, patience=1)
+        budget.fit_keras(model, self.X, self.y)
+
+        self.assertFalse(budget.is_stopped_by_time)
+        self.assertEqual(2, budget.iterations)
+        MetricServer.metrics.strategy.learn.train_iterations.set.assert_called_once_with(budget.iterations)
+
+    def test_fit_lgb__early_stopping_per_output(self):
+        model = ParallelMultiOutputRegressor(lgb.LGBMRegressor(n_estimators=1000, verbose=-1))
+
+        budget = TrainBudget(budget_sec=600, early_stopping_rounds=5)
+        budget.fit_lgb(model, self.X, np.random.default_rng(1).random((200, 2)))
+
+        self.assertFalse(budget.is_stopped_by_time)
+        self.assertLess(budget.iterations, 1000)
+        self.assertEqual(2, len(model.estimators_))
+        self.assertTrue(all(0 < estimator.best_iteration_ < 1000 for estimator in model.estimators_))
+
+    def test_fit_lgb__stopped_by_time(self):
+        model = lgb.LGBMRegressor(n_estimators=1000, verbose=-1)
+
+        budget = TrainBudget(budget_sec=0)
+        budget.fit_lgb(model, self.X, self.y[:, 0])
+
+        self.assertTrue(budget.is_stopped_by_time)
+        self.assertEqual(1, budget.iterations)
+        self.assertEqual(1, model.booster_.current_iteration())
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from keras import Sequential, Input
+from keras.layers import Dense, LSTM
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, FunctionTransformer
+
+from strategy.common.LSTMBidAskRegressionStrategyBase import LSTMBidAskRegressionStrategyBase
+from strategy.common.TrainDataStream import TrainDataStream
+
+
+class TestTrainDataStream(TestCase):
+
+    @staticmethod
+    def new_xy(n=25):
+        rnd = np.random.default_rng(0)
+        return pd.DataFrame(rnd.random((n, 3))), pd.DataFrame(rnd.random((n, 2)))
+
+    def test_write__same_as_pipe_transform(self):
+        X, y = self.new_xy()
+        X_pipe = Pipeline([("xrs", StandardScaler()),
+                           ("reshape", FunctionTransformer(LSTMBidAskRegressionStrategyBase.reshape_x,
+                                                           kw_args={"window_shape": (4, 3)}))]).fit(X)
+        y_pipe = Pipeline([("yrs", StandardScaler())]).fit(y)
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            stream = TrainDataStream(data_dir, chunk_size=7)
+            X_rows, y_rows = stream.write(X_pipe, y_pipe, X, y)
+
+            # Windows created by the stream are the same as created by the pipe
+            expected_x = X_pipe.transform(X)
+            np.testing.assert_allclose(expected_x, stream.windows(X_rows, 0, len(expected_x), 4), rtol=1e-6)
+            np.testing.assert_allclose(y_pipe.transform(y), y_rows, rtol=1e-6)
+
+    def test_dataset__lstm_windows(self):
+        X, y = self.new_xy()
+        X_rows, y_rows = X.to_numpy(dtype=np.float32), y.to_numpy(dtype=np.float32)
+        stream = TrainDataStream(None, batch_size=8)
+
+        batches = list(stream.dataset(X_rows, y_rows, window=4, shuffle=False).as_numpy_iterator())
+
+        x_batches, y_batches = zip(*batches)
+        self.assertEqual([8, 8, 6], [len(b) for b in x_batches])
+        # Sample i is window of rows i..i+3 and target of row i+3
+        np.testing.assert_allclose(X_rows[5:9], np.concatenate(x_batches)[5])
+        np.testing.assert_allclose(y_rows[3:], np.concatenate(y_batches))
+
+    def test_fit(self):
+        X, y = self.new_xy()
+        model = Sequential([Input(shape=(4, 3)), LSTM(2), Dense(2)])
+        model.compile(optimizer="adam", loss="mae")
+        stream = TrainDataStream(None)
+
+        stream.fit(model, X.to_numpy(dtype=np.float32), y.to_numpy(dtype=np.float32))
+
+        self.assertTrue(TrainDataStream.is_supported(model))
+        self.assertEqual((5, 4, 3), stream.recent_x(model, X.to_numpy(), 5).shape)
+
+    def test_cleanup__temp_dir_removed(self):
+        X, y = self.new_xy()
+        stream = TrainDataStream(None)
+        stream.write(Pipeline([("xrs", StandardScaler())]).fit(X), Pipeline([("yrs", StandardScaler())]).fit(y), X, y)
+        stream.cleanup()
+        self.assertFalse(os.path.exists(stream.temp_dir))
@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from strategy.common.TrainSampler import TrainSampler
+
+
+class TestTrainSampler(TestCase):
+    index = pd.date_range("2023-01-01", periods=1000, freq="1min")
+
+    def test_sample__all_rows_if_small(self):
+        positions, weights = TrainSampler(max_rows=1000, recent_rows=100).sample(self.index)
+        self.assertListEqual(list(range(1000)), positions.tolist())
+        self.assertTrue(np.allclose(1, weights))
+
+    def test_sample__recent_and_old_rows(self):
+        positions, weights = TrainSampler(max_rows=300, recent_rows=100, seed=1).sample(self.index)
+
+        self.assertEqual(300, len(positions))
+        self.assertTrue(np.all(np.diff(positions) > 0))
+        # All recent rows are kept
+        self.assertListEqual(list(range(900, 1000)), positions[-100:].tolist())
+        # Old rows are spread over all old history, each represents 900 / 200 rows
+        self.assertLess(positions[0], 5)
+        self.assertGreater(positions[199], 895)
+        self.assertAlmostEqual(4.5, weights[0] / weights[-1])
+        self.assertAlmostEqual(1, weights.mean())
+
+    def test_sample__stratified_by_signal(self):
+        # Balanced signals stay balanced
+        strata = np.tile([-1, 0, 1], 334)[:1000]
+        positions, weights = TrainSampler(max_rows=400, recent_rows=100, seed=1).sample(self.index, strata)
+
+        old_counts = pd.Series(strata[positions[:-100]]).value_counts()
+        self.assertListEqual([100, 100, 100], old_counts.tolist())
+
+    def test_sample__recency_weights(self):
+        positions, weights = TrainSampler(max_rows=1000, recent_rows=100, half_life=pd.Timedelta("100min")) \
+            .sample(self.index)
+        self.assertAlmostEqual(0.5, weights[-101] / weights[-1])
@@ -50,6 +50,38 @@ class PredictBidAskFeatures:
         targets = merged[targets.columns]
         return features, targets
 
+    @staticmethod
+    def features_targets_since(bid_ask: pd.DataFrame,
+                               level2: pd.DataFrame,
+                               candles_by_interval: Dict[str, pd.DataFrame],
+                               candles_cnt_by_interval: Dict[str, int],
+                               predict_window: str, past_window: str,
+                               features_since: pd.Timestamp = None, targets_since: pd.Timestamp = None) \
+            -> (pd.DataFrame, pd.DataFrame):
+        """ Features of rows after features_since and targets of rows after targets_since.
+        Targets are only of rows whose predict window has elapsed. """
+        if features_since is not None:
+            # Past window before the first new row is needed for rolling features
+            lookback_time = features_since - pd.Timedelta(past_window)
+            bid_ask_x = bid_ask[bid_ask.index >= lookback_time]
+            # Level2 snapshot before the lookback is merged to the rows after it
+            l2_start_time = level2.loc[level2["datetime"] <= lookback_time, "datetime"].max()
+            level2_x = level2[level2["datetime"] >= (lookback_time if pd.isnull(l2_start_time) else l2_start_time)]
+        else:
+            bid_ask_x, level2_x = bid_ask, level2
+        features = PredictBidAskFeatures.features_of(bid_ask_x,
+                                                     level2_x,
+                                                     candles_by_interval,
+                                                     candles_cnt_by_interval,
+                                                     past_window)
+        if features_since is not None and not features.empty:
+            features = features[features.index > features_since]
+        # Targets of a row are calculated from the rows after it
+        bid_ask_y = bid_ask[bid_ask.index > targets_since] if targets_since is not None else bid_ask
+        targets = PredictBidAskFeatures.targets_of(bid_ask_y, predict_window) \
+            if not bid_ask_y.empty else pd.DataFrame()
+        return features, targets
+
     @staticmethod
     def features_of(bid_ask: pd.DataFrame,
                     level2: pd.DataFrame,
@@ -283,3 +283,26 @@ class TestPredictBidAskFeatures(TestCase):
         self.assertListEqual([4, 4, 4], actual_features.ask_diff.values.tolist())
         self.assertListEqual([4, 4, 4], actual_features.ask_vol_diff.values.tolist())
         self.assertListEqual([2, 2, 2], actual_features.spread.values.tolist())
+
+    def test_features_targets_since__new_rows_only(self):
+        bid_ask = pd.DataFrame([
+            {"datetime": datetime.fromisoformat(f"2023-03-17 15:56:{s:02d}"), "symbol": "asset1",
+             "bid": s, "bid_vol": 1, "ask": s + 1, "ask_vol": 1} for s in range(1, 40)
+        ]).set_index("datetime", drop=False)
+        level2 = pd.DataFrame([
+            {'datetime': datetime.fromisoformat('2023-03-17 15:56:01'), 'ask': 0.9, 'ask_vol': 1, 'bid_vol': None},
+            {'datetime': datetime.fromisoformat('2023-03-17 15:56:01'), 'bid': -0.9, 'ask_vol': None, 'bid_vol': 1},
+        ])
+        features_since = pd.Timestamp("2023-03-17 15:56:20")
+        targets_since = pd.Timestamp("2023-03-17 15:56:10")
+
+        # Call
+        actual_features, actual_targets = PredictBidAskFeatures.features_targets_since(
+            bid_ask, level2, self.candles_by_interval, self.candles_cnt_by_interval, "10s", "10s",
+            features_since, targets_since)
+
+        self.assertEqual(pd.Timestamp("2023-03-17 15:56:21"), actual_features.index.min())
+        self.assertEqual(pd.Timestamp("2023-03-17 15:56:39"), actual_features.index.max())
+        # Targets of the last rows are not known until predict window elapsed
+        self.assertEqual(pd.Timestamp("2023-03-17 15:56:11"), actual_targets.index.min())
+        self.assertEqual(pd.Timestamp("2023-03-17 15:56:29"), actual_targets.index.max())
@@ -6,10 +6,12 @@ from typing import Dict, List, Optional
 import pandas as pd
 
 from exch.Exchange import Exchange
+from strategy.common.RWLock import RWLock
 
 
 class BidAskFeed:
-    def __init__(self, cfg: Dict[str, str], exchange_provider: Exchange, data_lock: multiprocessing.RLock, new_data_event: multiprocessing.Event):
+    def __init__(self, cfg: Dict[str, str], exchange_provider: Exchange, data_lock: RWLock, new_data_event: multiprocessing.Event,
+                 ticker: Optional[str] = None):
         self.websocket_feed = exchange_provider.websocket_feed(cfg["pytrade2.exchange"])
         self.websocket_feed.consumers.add(self)
         self.bid_ask: pd.DataFrame = pd.DataFrame()
@@ -20,8 +22,12 @@ class BidAskFeed:
                                    + pd.Timedelta(cfg.get("pytrade2.strategy.predict.window", "0s")))
         self.data_lock = data_lock
         self.new_data_event = new_data_event
+        # Take data of this ticker only, all tickers if None
+        self.ticker = ticker.lower() if ticker else None
 
     def on_ticker(self, ticker: dict):
+        if self.ticker and str(ticker.get("symbol")).lower() != self.ticker:
+            return
         # Add new data to df
         new_df = pd.DataFrame([ticker], columns=list(ticker.keys())).set_index("datetime", drop=False)
         with self.data_lock:
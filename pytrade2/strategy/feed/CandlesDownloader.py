@@ -24,12 +24,17 @@ class CandlesDownloader:
         self.period = "1min"
         self.days = config.get("pytrade2.feed.candles.history.days", 2)
 
+    def downloaded_files(self) -> List[str]:
+        """ Sorted file names of the ticker candles. Tickers of multi ticker strategy share the folder. """
+        suffix = f"_{self.ticker}_candles_{self.period}.csv"
+        return sorted(f for f in os.listdir(self.download_dir) if f.endswith(suffix))
+
     def get_start_date(self):
-        """ In candles data folder find last file and parse date from it''s name"""
+        """ In candles data folder find last file of the ticker and parse date from it''s name"""
 
-        files = os.listdir(self.download_dir)
+        files = self.downloaded_files()
         if files:
-            last_file = Path(max(files)).name
+            last_file = Path(files[-1]).name
             last_date = datetime.fromisoformat(last_file[:10])
         else:
             last_date = datetime.now() - timedelta(self.days)
@@ -61,7 +66,7 @@ class CandlesDownloader:
         self._logger.debug(f"Start downloading candles to {self.download_dir}")
 
         for start, end in intervals:
-            file_name = f"{start.date()}_{self.ticker}_candles_{self.period}.csv"
+            file_name = f"{start.date()}_{self.ticker}_candles_{self.period}.csv"  # See downloaded_files()
             file_path = Path(self.download_dir, f"{file_name}")
             if file_path.exists() and skip_existing:
                 continue
@@ -1,6 +1,5 @@
 import logging
 import multiprocessing
-import os
 import re
 
 from datetime import datetime
@@ -9,14 +8,15 @@ from typing import Dict
 import pandas as pd
 
 from exch.Exchange import Exchange
+from strategy.common.RWLock import RWLock
 from strategy.feed.CandlesDownloader import CandlesDownloader
 
 
 class CandlesFeed:
     """ Decorator for strategies. Reads candles from exchange """
 
-    def __init__(self, config, ticker: str, exchange_provider: Exchange, data_lock: multiprocessing.RLock,
-                 new_data_event: multiprocessing.Event, tag):
+    def __init__(self, config, ticker: str, exchange_provider: Exchange, data_lock: RWLock,
+                 new_data_event: multiprocessing.Event, tag, is_ticker_only: bool = False):
         self._logger = logging.getLogger(self.__class__.__name__)
         self.data_lock = data_lock
         self.exchange_candles_feed = exchange_provider.candles_feed(config["pytrade2.exchange"])
@@ -27,6 +27,8 @@ class CandlesFeed:
         self.candles_by_interval: Dict[str, pd.DataFrame] = dict()
         self.candles_by_interval_buf: Dict[str, pd.DataFrame] = dict()
         self.new_data_event = new_data_event
+        # Skip candles of other tickers
+        self.is_ticker_only = is_ticker_only
 
         periods = config["pytrade2.feed.candles.periods"]
         counts = config["pytrade2.feed.candles.counts"]
@@ -49,10 +51,54 @@ class CandlesFeed:
             out[interval] = cnt
         return out
 
+    @staticmethod
+    def periods_of(periods_str: str) -> list[str]:
+        """ Parse periods like "[1min, 5min]" """
+        periods = re.split(r"\W*,\W*", periods_str.lstrip("[").rstrip("]").strip(" ").strip("'"))
+        return [period for period in periods if period]
+
+    def prepare_periods(self, new_periods_str: str, history_days: int):
+        """
+        Download and resample candles for new periods and history days without touching current data,
+        to be called in background. Current data is replaced later in apply_prepared_periods().
+        :return history days, new counts, candles by interval or None if counts are not changed
+        """
+        new_counts = self.candles_counts_in_days(set(self.periods_of(new_periods_str)), history_days)
+        if self.candles_cnt_by_interval == new_counts and self.downloader.days == history_days:
+            return history_days, new_counts, None
+        self.downloader.download_intervals(
+            CandlesDownloader.last_days(datetime.now(), history_days, self.downloader.period), skip_existing=True)
+        candles_1min = self.read_candles_downloaded(history_days)
+        candles_by_interval = {period: self.resample(candles_1min, period) for period in new_counts}
+        return history_days, new_counts, candles_by_interval
+
+    def apply_prepared_periods(self, prepared):
+        """ Swap to candles prepared by prepare_periods() """
+        history_days, new_counts, candles_by_interval = prepared
+        self.downloader.days = history_days
+        if candles_by_interval is None:
+            return
+        with self.data_lock:
+            self._logger.info(f"Applying prepared candles counts {new_counts}")
+            # Candles received while preparing are newer than downloaded ones, keep them
+            for period, candles in candles_by_interval.items():
+                max_time = candles.index.max() if not candles.empty else None
+                newer = [df if max_time is None else df[df.index > max_time]
+                         for df in (self.candles_by_interval.get(period), self.candles_by_interval_buf.get(period))
+                         if df is not None]
+                newer = [df for df in newer if not df.empty]
+                if newer:
+                    merged = pd.concat([df for df in [candles] + newer if not df.empty]) \
+                        .set_index("close_time", drop=False)
+                    candles_by_interval[period] = self.resample(merged, period) \
+                        .set_index("close_time", drop=False).sort_index()
+            self.candles_cnt_by_interval = new_counts
+            self.candles_by_interval = candles_by_interval
+            self.candles_by_interval_buf = dict()
+
     def apply_periods(self, new_periods_str: str, history_days: int):
 
-        new_periods = re.split(r"\W*,\W*", new_periods_str.lstrip("[").rstrip("]").strip(" ").strip("'"))
-        new_periods = [period for period in new_periods if period]
+        new_periods = self.periods_of(new_periods_str)
         new_counts = self.candles_counts_in_days(set(new_periods), history_days)
 
         """Set new periods counts if changed"""
@@ -86,31 +132,38 @@ class CandlesFeed:
         candles_1min = self.read_candles_downloaded()
 
         # Produce initial candles
+        candles_by_interval = {}
         for period, cnt in self.candles_cnt_by_interval.items():
             # Read cnt + 1 extra for diff candles
             # candles_new = pd.DataFrame(self.exchange_candles_feed.read_candles(self.ticker, period, cnt)) \
             #     .set_index("close_time", drop=False)
 
-            candles = candles_1min.resample(period, closed="right").agg({'open_time': 'first',
+            candles = self.resample(candles_1min, period)
+            #candles_history = candles_history[candles_history.index < candles_new.index.min()]
+            #candles = pd.concat([candles_history, candles_new])
+
+            self._logger.debug(f"Got {len(candles.index)} {self.ticker} {period} candles")
+            candles_by_interval[period] = candles
+        # Download and resample above are done without lock, readers are blocked only for the swap
+        with self.data_lock:
+            self.candles_by_interval.update(candles_by_interval)
+
+    @staticmethod
+    def resample(candles_1min: pd.DataFrame, period: str) -> pd.DataFrame:
+        return candles_1min.resample(period, closed="right").agg({'open_time': 'first',
                                                                  'close_time': 'last',
                                                                  'open': 'first',
                                                                  'high': 'max',
                                                                  'low': 'min',
                                                                  'close': 'last',
                                                                  'vol': 'max'
-                                                         })
-            #candles_history = candles_history[candles_history.index < candles_new.index.min()]
-            #candles = pd.concat([candles_history, candles_new])
+                                                                 })
 
-            self._logger.debug(f"Got {len(candles.index)} {self.ticker} {period} candles")
-            self.candles_by_interval[period] = candles
-
-    def read_candles_downloaded(self):
+    def read_candles_downloaded(self, days: int = None):
         """ Read 1min candles from downloaded folder. Do not resample to other periods here. """
         candles_dir = self.downloader.download_dir
-        period = self.downloader.period
-        days = self.downloader.days
-        files = sorted([f for f in os.listdir(candles_dir) if f'_candles_{period}' in f])
+        days = days or self.downloader.days
+        files = self.downloader.downloaded_files()
         # Read last days' files to one dataframe
         df = pd.concat(
             [pd.read_csv(Path(candles_dir, fname), parse_dates=["open_time", "close_time"]) for fname in files[-days:]])
@@ -138,6 +191,8 @@ class CandlesFeed:
         period = str(candle["interval"])
         if period not in self.candles_cnt_by_interval:
             return
+        if self.is_ticker_only and str(candle.get("ticker")).lower() != self.ticker.lower():
+            return
         candle_df = pd.DataFrame([candle]).set_index("close_time", drop=False)
         with (self.data_lock):
             self._logger.debug(f"Got {period} candle: {candle}")
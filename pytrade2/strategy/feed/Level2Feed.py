@@ -1,14 +1,16 @@
 import logging
 import multiprocessing
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 import pandas as pd
 
 from exch.Exchange import Exchange
+from strategy.common.RWLock import RWLock
 
 
 class Level2Feed:
-    def __init__(self, cfg: Dict[str, str], exchange_provider: Exchange, data_lock: multiprocessing.RLock, new_data_event: multiprocessing.Event):
+    def __init__(self, cfg: Dict[str, str], exchange_provider: Exchange, data_lock: RWLock, new_data_event: multiprocessing.Event,
+                 ticker: Optional[str] = None):
         self._logger = logging.getLogger(self.__class__.__name__)
 
         self.websocket_feed = exchange_provider.websocket_feed(cfg["pytrade2.exchange"])
@@ -21,11 +23,15 @@ class Level2Feed:
                                    + pd.Timedelta(cfg.get("pytrade2.strategy.predict.window", "0s")))
         self.data_lock = data_lock
         self.new_data_event = new_data_event
+        # Take data of this ticker only, all tickers if None
+        self.ticker = ticker.lower() if ticker else None
 
     def on_level2(self, level2: List[Dict]):
         """
         Got new order book items event
         """
+        if self.ticker and level2 and str(level2[0].get("symbol")).lower() != self.ticker:
+            return
         bid_ask_columns = ["datetime", "symbol", "bid", "bid_vol", "ask", "ask_vol"]
 
         # Add new data to df
@@ -35,12 +41,15 @@ class Level2Feed:
 
         self.new_data_event.set()
 
-    def apply_buf(self):
-        """ Add level2 buf to level2 and purge old level2 """
+    def apply_buf(self, is_latest_only=False):
+        """ Add level2 buf to level2 and purge old level2
+        :param is_latest_only: drop all but the latest snapshot of the buf """
         if self.level2_buf.empty:
             return
 
         with self.data_lock:
+            if is_latest_only:
+                self.level2_buf = self.level2_buf[self.level2_buf["datetime"] == self.level2_buf["datetime"].max()]
             self.level2 = pd.concat([df for df in [self.level2, self.level2_buf] if not df.empty])
             self.level2_buf = pd.DataFrame()
             # Purge old level2
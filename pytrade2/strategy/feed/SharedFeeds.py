@@ -0,0 +1,59 @@
+import logging
+from threading import Lock
+
+import pandas as pd
+
+from strategy.common.RWLock import RWLock
+
+
+class SharedFeeds:
+    """
+    Bid ask and level2 feeds, shared by strategies of one host process, so market data is kept once.
+    Shared feed data is read only for strategies and guarded by one data lock of the host.
+    New data of a shared feed wakes processing of each strategy using it.
+    History windows of a shared feed are the widest of its strategies.
+    """
+
+    class Sources:
+        """ New data event of a shared feed, sets the events of all its strategies """
+
+        def __init__(self):
+            self.sources = []
+
+        def add(self, source):
+            self.sources.append(source)
+
+        def set(self):
+            for source in self.sources:
+                source.set()
+
+    def __init__(self):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.data_lock = RWLock()
+        self.feeds = {}
+        self._lock = Lock()
+
+    def feed(self, kind: str, ticker: str, config: dict, create, source):
+        """ Get shared feed of the kind and ticker or create it for the first strategy
+        :param create: create the feed with given new data event
+        :param source: new data event of the strategy """
+        with self._lock:
+            key = (kind, str(ticker).lower())
+            if key not in self.feeds:
+                self._logger.info(f"Creating shared {kind} feed of {ticker}")
+                self.feeds[key] = create(SharedFeeds.Sources())
+            feed = self.feeds[key]
+            feed.new_data_event.add(source)
+            self.widen_history(feed, config)
+            return feed
+
+    @staticmethod
+    def widen_history(feed, config: dict):
+        """ Keep history for the strategy with the widest windows """
+        predict_window = pd.Timedelta(config.get("pytrade2.strategy.predict.window", "0s"))
+        feed.history_min_window = max(feed.history_min_window,
+                                      pd.Timedelta(config.get("pytrade2.strategy.history.min.window"))
+                                      + predict_window)
+        feed.history_max_window = max(feed.history_max_window,
+                                      pd.Timedelta(config.get("pytrade2.strategy.history.max.window"))
+                                      + predict_window)
@@ -1,5 +1,8 @@
+import tempfile
 from datetime import datetime
+from pathlib import Path
 from unittest import TestCase
+from unittest.mock import MagicMock
 
 from strategy.feed.CandlesDownloader import CandlesDownloader
 
@@ -44,3 +47,16 @@ class TestCandlesDownloader(TestCase):
         actual = list(CandlesDownloader.last_days(datetime.fromisoformat("2023-12-18"), 0, '1min'))
         self.assertListEqual(
             [], actual)
+
+    def test_get_start_date__of_own_ticker(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            downloader = CandlesDownloader({"pytrade2.data.dir": data_dir, "pytrade2.tickers": "ETH-USDT"}, MagicMock(),
+                                           "Strategy1")
+            # Tickers of multi ticker strategy download to the same folder, other ticker is ahead
+            for file_name in ("2023-12-17_ETH-USDT_candles_1min.csv", "2023-12-18_ETH-USDT_candles_1min.csv",
+                              "2023-12-20_BTC-USDT_candles_1min.csv"):
+                Path(downloader.download_dir, file_name).touch()
+
+            self.assertListEqual(["2023-12-17_ETH-USDT_candles_1min.csv", "2023-12-18_ETH-USDT_candles_1min.csv"],
+                                 downloader.downloaded_files())
+            self.assertEqual(datetime.fromisoformat("2023-12-18"), downloader.get_start_date())
@@ -1,11 +1,14 @@
+import tempfile
 from collections import defaultdict
 from datetime import datetime, timedelta
-from multiprocessing import RLock, Event
+from multiprocessing import Event
+from pathlib import Path
 from unittest import TestCase
 from unittest.mock import MagicMock
 
 import pandas as pd
 
+from strategy.common.RWLock import RWLock
 from strategy.feed.CandlesFeed import CandlesFeed
 
 
@@ -16,7 +19,7 @@ class TestCandlesFeed(TestCase):
         config["pytrade2.feed.candles.periods"] = "1min,5min"
         config["pytrade2.feed.candles.counts"] = "1,1"
         config["pytrade2.feed.candles.history.days"] = "1"
-        feed = CandlesFeed(config, "ticker1", MagicMock(), RLock(), Event(), "test")
+        feed = CandlesFeed(config, "ticker1", MagicMock(), RWLock(), Event(), "test")
         feed.candles_history_cnt_by_interval = {"1min": 10, "5min": 1}
         feed.read_candles = MagicMock()
         return feed
@@ -114,6 +117,44 @@ class TestCandlesFeed(TestCase):
                          [pd.Timestamp(dt) for dt in candles["close_time"].values.tolist()])
         self.assertEqual([1, 3], candles["close"].values.tolist())
 
+    def test_apply_prepared_periods__keeps_live_candles(self):
+        feed = self.new_candles_feed()
+        dt1 = datetime(year=2023, month=6, day=28, hour=9, minute=52)
+        dt2, dt3 = dt1 + timedelta(minutes=1), dt1 + timedelta(minutes=2)
+
+        def candle(dt, close):
+            return {"close_time": dt, "open_time": dt - timedelta(minutes=1), "interval": "1min",
+                    "open": close, "high": close, "low": close, "close": close, "vol": 1}
+
+        # Downloaded until dt1, candle dt2 applied and candle dt3 buffered while preparing
+        prepared = pd.DataFrame([candle(dt1, 1)]).set_index("close_time", drop=False)
+        feed.candles_by_interval["1min"] = pd.DataFrame([candle(dt1, 1), candle(dt2, 2)]) \
+            .set_index("close_time", drop=False)
+        feed.on_candle(candle(dt3, 3))
+
+        feed.apply_prepared_periods((1, {"1min": 1440}, {"1min": prepared}))
+
+        candles = feed.candles_by_interval["1min"]
+        self.assertEqual([pd.Timestamp(dt) for dt in (dt1, dt2, dt3)], candles.index.tolist())
+        self.assertEqual([1, 2, 3], candles["close"].tolist())
+        self.assertEqual({}, feed.candles_by_interval_buf)
+
+    def test_read_candles_downloaded__of_own_ticker(self):
+        feed = self.new_candles_feed()
+        with tempfile.TemporaryDirectory() as candles_dir:
+            feed.downloader.download_dir = Path(candles_dir)
+            feed.downloader.ticker = "ticker1"
+            # Tickers of multi ticker strategy download to the same folder
+            for day, ticker, close in (("2023-06-27", "ticker1", 1), ("2023-06-28", "ticker1", 2),
+                                       ("2023-06-28", "ticker2", 100), ("2023-06-29", "ticker2", 200)):
+                dt = datetime.fromisoformat(f"{day} 00:01")
+                pd.DataFrame([{"open_time": dt - timedelta(minutes=1), "close_time": dt, "close": close}]) \
+                    .to_csv(Path(candles_dir, f"{day}_{ticker}_candles_1min.csv"), index=False)
+
+            candles = feed.read_candles_downloaded(days=2)
+
+        self.assertListEqual([1, 2], candles["close"].tolist())
+
     def test_has_history_empty(self):
         candles_feed = self.new_candles_feed()
         candles_feed.candles_cnt_by_interval = {"1min": 2, "5min": 3}
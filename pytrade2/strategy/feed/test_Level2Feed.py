@@ -5,6 +5,7 @@ from unittest.mock import MagicMock
 
 import pandas as pd
 
+from strategy.common.RWLock import RWLock
 from strategy.feed.Level2Feed import Level2Feed
 
 
@@ -16,8 +17,8 @@ class TestLevel2Feed(TestCase):
     ], columns=["datetime"])
 
     def new_level2_feed(self):
-        level2_feed = Level2Feed({"pytrade2.exchange": "exchange1"}, MagicMock(), multiprocessing.RLock(), multiprocessing.Event())
-        level2_feed.data_lock = multiprocessing.RLock()
+        level2_feed = Level2Feed({"pytrade2.exchange": "exchange1"}, MagicMock(), RWLock(), multiprocessing.Event())
+        level2_feed.data_lock = RWLock()
 
         level2_feed.level2_buf = self.level2_buf
         return level2_feed
@@ -66,3 +67,14 @@ class TestLevel2Feed(TestCase):
         level2_feed.apply_buf()
 
         self.assertTrue(level2_feed.level2_buf.empty)
+
+    def test_on_level2__other_ticker_skipped(self):
+        level2_feed = Level2Feed({"pytrade2.exchange": "exchange1"}, MagicMock(), RWLock(), MagicMock(),
+                                 ticker="BTC-USDT")
+        dt = datetime.fromisoformat("2023-11-26 00:10")
+
+        level2_feed.on_level2([{"datetime": dt, "symbol": "eth-usdt", "bid": 1.0, "bid_vol": 1.0}])
+        level2_feed.on_level2([{"datetime": dt, "symbol": "btc-usdt", "bid": 2.0, "bid_vol": 1.0}])
+
+        self.assertListEqual([2.0], level2_feed.level2_buf["bid"].tolist())
+        level2_feed.new_data_event.set.assert_called_once()
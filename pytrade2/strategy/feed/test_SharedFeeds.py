@@ -0,0 +1,63 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from strategy.feed.Level2Feed import Level2Feed
+from strategy.feed.SharedFeeds import SharedFeeds
+
+
+class TestSharedFeeds(TestCase):
+    config1 = {"pytrade2.exchange": "exchange1",
+               "pytrade2.strategy.history.min.window": "1min",
+               "pytrade2.strategy.history.max.window": "10min"}
+    config2 = {"pytrade2.exchange": "exchange1",
+               "pytrade2.strategy.history.min.window": "5min",
+               "pytrade2.strategy.history.max.window": "5min",
+               "pytrade2.strategy.predict.window": "10min"}
+
+    def new_feed(self, shared_feeds: SharedFeeds, config: dict, source, ticker="BTC-USDT"):
+        return shared_feeds.feed("level2", ticker, config,
+                                 lambda event: Level2Feed(config, MagicMock(), shared_feeds.data_lock, event, ticker),
+                                 source)
+
+    def test_feed_created_once(self):
+        shared_feeds = SharedFeeds()
+        created = []
+
+        def create(event):
+            created.append(Level2Feed(self.config1, MagicMock(), shared_feeds.data_lock, event, "BTC-USDT"))
+            return created[-1]
+
+        feed1 = shared_feeds.feed("level2", "BTC-USDT", self.config1, create, MagicMock())
+        feed2 = shared_feeds.feed("level2", "btc-usdt", self.config1, create, MagicMock())
+
+        self.assertIs(feed1, feed2)
+        self.assertEqual([feed1], created)
+
+    def test_feed_per_kind_and_ticker(self):
+        shared_feeds = SharedFeeds()
+        feed1 = self.new_feed(shared_feeds, self.config1, MagicMock(), "BTC-USDT")
+        feed2 = self.new_feed(shared_feeds, self.config1, MagicMock(), "ETH-USDT")
+        self.assertIsNot(feed1, feed2)
+
+    def test_new_data_sets_all_sources(self):
+        shared_feeds = SharedFeeds()
+        source1, source2 = MagicMock(), MagicMock()
+        feed = self.new_feed(shared_feeds, self.config1, source1)
+        self.new_feed(shared_feeds, self.config2, source2)
+
+        feed.on_level2([{"datetime": pd.Timestamp("2024-01-01 00:00"), "symbol": "btc-usdt",
+                         "bid": 1.0, "bid_vol": 1.0}])
+
+        source1.set.assert_called_once()
+        source2.set.assert_called_once()
+
+    def test_widest_history(self):
+        shared_feeds = SharedFeeds()
+        feed = self.new_feed(shared_feeds, self.config1, MagicMock())
+        self.new_feed(shared_feeds, self.config2, MagicMock())
+
+        # Min window from config2 with predict window, max window from config2 with predict window
+        self.assertEqual(pd.Timedelta("15min"), feed.history_min_window)
+        self.assertEqual(pd.Timedelta("15min"), feed.history_max_window)
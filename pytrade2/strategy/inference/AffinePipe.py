@@ -0,0 +1,142 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, RobustScaler, MaxAbsScaler, MinMaxScaler, FunctionTransformer
+
+
+class AffinePipe:
+    """
+    Fitted pipeline of column selection and linear scalers compiled to x[:, perm] * scale + offset.
+    Transform is one numpy operation without sklearn validations, inverse transform is fused the same way.
+    Trailing FunctionTransformer, like lstm window reshape, is applied after the affine part.
+    """
+    _logger = logging.getLogger("AffinePipe")
+
+    # Rows to verify compiled pipe against sklearn
+    check_rows_count = 128
+
+    def __init__(self, pipe, perm: np.ndarray, scale: np.ndarray, offset: np.ndarray, n_features: int,
+                 feature_names=None, func_transformer: FunctionTransformer = None):
+        self.pipe = pipe
+        self.perm, self.scale, self.offset = perm, scale, offset
+        self.n_features_in_ = n_features
+        self.feature_names_in_ = list(feature_names) if feature_names is not None else None
+        self.func_transformer = func_transformer
+        # Inverse is fused if the pipe supports it and output columns are the permutation of all input columns
+        self.is_invertible = hasattr(pipe, "inverse_transform") and np.array_equal(np.sort(perm), np.arange(n_features)) \
+                             and bool(np.all(scale != 0))
+
+    @staticmethod
+    def compiled_or_pipe(pipe):
+        """ Compile and verify the pipe. If not possible, return the pipe as is. """
+        if pipe is None:
+            return None
+        try:
+            compiled = AffinePipe.compile(pipe)
+            compiled.verify()
+            AffinePipe._logger.info(f"Compiled pipe of {compiled.n_features_in_} features to affine transformation")
+            return compiled
+        except Exception as e:
+            AffinePipe._logger.info(f"Cannot compile the pipe, will use it as is. {e}")
+            return pipe
+
+    @staticmethod
+    def compile(pipe) -> "AffinePipe":
+        """ Compose steps of fitted pipeline or single transformer to one affine transformation """
+        steps = [step for _, step in pipe.steps] if isinstance(pipe, Pipeline) else [pipe]
+        func_transformer = None
+        if isinstance(steps[-1], FunctionTransformer):
+            func_transformer = steps.pop()
+        n_features = getattr(steps[0], "n_features_in_", None) if steps else None
+        if not n_features:
+            raise ValueError("cannot get features count of the pipe")
+
+        perm = np.arange(n_features)
+        scale, offset = np.ones(n_features), np.zeros(n_features)
+        for step in steps:
+            perm, scale, offset = AffinePipe.compose(step, perm, scale, offset)
+        return AffinePipe(pipe, perm, scale, offset, n_features, getattr(steps[0], "feature_names_in_", None),
+                          func_transformer)
+
+    @staticmethod
+    def compose(step, perm: np.ndarray, scale: np.ndarray, offset: np.ndarray):
+        """ Apply step to current affine transformation of output columns """
+        if isinstance(step, ColumnTransformer):
+            return AffinePipe.compose_columns(step, perm, scale, offset)
+        if isinstance(step, Pipeline):
+            for _, sub_step in step.steps:
+                perm, scale, offset = AffinePipe.compose(sub_step, perm, scale, offset)
+            return perm, scale, offset
+        if step is None or step == "passthrough":
+            return perm, scale, offset
+
+        if isinstance(step, (StandardScaler, RobustScaler)):
+            # (x - center) / scale, both are optional
+            center = step.mean_ if isinstance(step, StandardScaler) else step.center_
+            divisor = step.scale_
+        elif isinstance(step, MaxAbsScaler):
+            center, divisor = None, step.scale_
+        elif isinstance(step, MinMaxScaler) and not step.clip:
+            # x * scale + min is (x - (-min / scale)) / (1 / scale), but compose directly to keep precision
+            return perm, scale * step.scale_, offset * step.scale_ + step.min_
+        else:
+            raise ValueError(f"{step.__class__.__name__} is not an affine transformer")
+
+        if center is not None:
+            offset = offset - center
+        if divisor is not None:
+            scale, offset = scale / divisor, offset / divisor
+        return perm, scale, offset
+
+    @staticmethod
+    def compose_columns(ct: ColumnTransformer, perm: np.ndarray, scale: np.ndarray, offset: np.ndarray):
+        """ Output columns of ColumnTransformer are outputs of its transformers in order, then remainder """
+        names = list(ct.feature_names_in_) if hasattr(ct, "feature_names_in_") else None
+        out_perm, out_scale, out_offset = [], [], []
+        for name, transformer, columns in ct.transformers_:
+            if transformer == "drop" or not len(columns):
+                continue
+            indices = np.array([names.index(col) if isinstance(col, str) else int(col) for col in columns])
+            if transformer != "passthrough" and getattr(transformer, "n_features_in_", len(indices)) != len(indices):
+                raise ValueError(f"{name} output columns differ from its input")
+            sub_perm, sub_scale, sub_offset = AffinePipe.compose(transformer, perm[indices], scale[indices],
+                                                                 offset[indices])
+            out_perm.append(sub_perm)
+            out_scale.append(sub_scale)
+            out_offset.append(sub_offset)
+        return np.concatenate(out_perm), np.concatenate(out_scale), np.concatenate(out_offset)
+
+    def input_array(self, x) -> np.ndarray:
+        """ Features as float array in fit columns order """
+        if isinstance(x, pd.DataFrame):
+            if self.feature_names_in_ is not None and list(x.columns) != self.feature_names_in_:
+                x = x[self.feature_names_in_]
+            return x.to_numpy(dtype=np.float64)
+        return np.asarray(x, dtype=np.float64)
+
+    def transform(self, x) -> np.ndarray:
+        out = self.input_array(x)[:, self.perm] * self.scale + self.offset
+        return self.func_transformer.transform(out) if self.func_transformer else out
+
+    def inverse_transform(self, y) -> np.ndarray:
+        if not self.is_invertible or self.func_transformer:
+            return self.pipe.inverse_transform(y)
+        out = np.empty((len(y), self.n_features_in_))
+        out[:, self.perm] = (np.asarray(y, dtype=np.float64) - self.offset) / self.scale
+        return out
+
+    def verify(self):
+        """ Compare with sklearn pipe on random rows, raise ValueError if different """
+        rnd = np.random.default_rng(1)
+        x = rnd.normal(size=(self.check_rows_count, self.n_features_in_))
+        if self.feature_names_in_ is not None:
+            x = pd.DataFrame(x, columns=self.feature_names_in_)
+        if not np.allclose(self.pipe.transform(x), self.transform(x), rtol=1e-12, atol=1e-12):
+            raise ValueError("compiled transform differs from the pipe")
+        if self.is_invertible and not self.func_transformer:
+            y = rnd.normal(size=(self.check_rows_count, len(self.perm)))
+            if not np.allclose(self.pipe.inverse_transform(y), self.inverse_transform(y), rtol=1e-12, atol=1e-12):
+                raise ValueError("compiled inverse transform differs from the pipe")
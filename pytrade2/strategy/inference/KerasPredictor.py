@@ -0,0 +1,106 @@
+import logging
+import time
+from typing import Optional
+
+import numpy as np
+import tensorflow as tf
+
+
+class KerasPredictor:
+    """
+    Low latency keras prediction of a few rows without model.predict() data adapter overhead.
+    Pure dense networks are exported to numpy forward pass, others are called via cached tf.function.
+    """
+    _logger = logging.getLogger("KerasPredictor")
+
+    numpy_activations = {
+        "linear": lambda x: x,
+        "relu": lambda x: np.maximum(x, 0),
+        "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+        "tanh": np.tanh,
+        "softmax": lambda x: KerasPredictor.softmax(x)}
+
+    def __init__(self, model, is_numpy=True):
+        self.model = model
+        self.input_shape = tuple(model.inputs[0].shape)
+        # Weights and activations of each dense layer if the model is pure dense network
+        self.dense_layers = KerasPredictor.dense_layers_of(model) if is_numpy else None
+        self.predict_func = None
+        if not self.dense_layers:
+            # Input signature is fixed at model load, so no retracing on each call
+            self.predict_func = tf.function(lambda x: model(x, training=False),
+                                            input_signature=[tf.TensorSpec(shape=self.input_shape, dtype=tf.float32)])
+
+    @staticmethod
+    def of(model) -> Optional["KerasPredictor"]:
+        """ Build and warm up predictor for the model. None if the model is not supported. """
+        try:
+            predictor = KerasPredictor(model)
+            predictor.predict(np.zeros((1,) + predictor.input_shape[1:], dtype=np.float32))
+            KerasPredictor._logger.info(f"Created {'numpy' if predictor.dense_layers else 'tf.function'} predictor")
+            return predictor
+        except Exception as e:
+            KerasPredictor._logger.info(f"Cannot create fast predictor, model.predict() will be used. {e}")
+            return None
+
+    @staticmethod
+    def dense_layers_of(model) -> Optional[list]:
+        """ [(kernel, bias, activation)] of dense network, None if the model has other layers """
+        dense_layers = []
+        for layer in model.layers:
+            layer_type = layer.__class__.__name__
+            if layer_type == "Dropout":
+                # Dropout is not active at inference
+                continue
+            activation = getattr(layer, "activation", None)
+            activation_name = getattr(activation, "__name__", None)
+            if layer_type != "Dense" or activation_name not in KerasPredictor.numpy_activations:
+                return None
+            kernel, bias = layer.get_weights() if layer.use_bias else (layer.get_weights()[0], 0)
+            dense_layers.append((np.array(kernel, dtype=np.float32), np.array(bias, dtype=np.float32),
+                                 KerasPredictor.numpy_activations[activation_name]))
+        return dense_layers
+
+    @staticmethod
+    def softmax(x):
+        e = np.exp(x - x.max(axis=-1, keepdims=True))
+        return e / e.sum(axis=-1, keepdims=True)
+
+    def predict(self, x) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if self.dense_layers:
+            for kernel, bias, activation in self.dense_layers:
+                x = activation(x @ kernel + bias)
+            return x
+        return self.predict_func(x).numpy()
+
+    @staticmethod
+    def benchmark(model, x, n=200) -> dict:
+        """ Average seconds per call of model.predict(), direct model call, tf.function and numpy predictors """
+        tf_predictor = KerasPredictor(model, is_numpy=False)
+        predictors = {"model.predict": lambda: model.predict(x, verbose=0),
+                      "model()": lambda: model(x, training=False),
+                      "tf.function": lambda: tf_predictor.predict(x)}
+        if KerasPredictor.dense_layers_of(model):
+            numpy_predictor = KerasPredictor(model)
+            predictors["numpy"] = lambda: numpy_predictor.predict(x)
+        out = {}
+        for name, predict in predictors.items():
+            # Warm up
+            predict()
+            start = time.perf_counter()
+            for _ in range(n):
+                predict()
+            out[name] = (time.perf_counter() - start) / n
+        return out
+
+
+if __name__ == "__main__":
+    # Per call latency of single row prediction of KerasBidAskRegressionStrategy network
+    from unittest.mock import MagicMock
+    from strategy.KerasBidAskRegressionStrategy import KerasBidAskRegressionStrategy
+
+    strategy = MagicMock()
+    bench_model = KerasBidAskRegressionStrategy.create_model(strategy, 40, 4)
+    for predictor_name, sec in KerasPredictor.benchmark(bench_model, np.random.rand(1, 40)).items():
+        print(f"{predictor_name}: {sec * 1e6:.0f} us per call")
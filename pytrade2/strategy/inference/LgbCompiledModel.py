@@ -0,0 +1,166 @@
+import logging
+
+import numpy as np
+
+
+class LgbCompiledModel:
+    """
+    Trained lightgbm boosters of MultiOutputRegressor flattened to numpy arrays.
+    All trees of all outputs are evaluated in one vectorized traversal, results are the same as lightgbm predict.
+    """
+    _logger = logging.getLogger("LgbCompiledModel")
+
+    # Missing value types of lightgbm numerical splits
+    missing_none, missing_zero, missing_nan = 0, 1, 2
+    missing_types = {"None": missing_none, "Zero": missing_zero, "NaN": missing_nan}
+    # lightgbm kZeroThreshold, float 1e-35f
+    zero_threshold = float(np.float32(1e-35))
+    # Objectives with identity output transformation
+    raw_objectives = ("regression", "regression_l1", "huber", "fair", "quantile", "mape")
+    # Rows per one vectorized traversal
+    chunk_size = 256
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, is_leaf: np.ndarray, default_left: np.ndarray, missing_type: np.ndarray,
+                 roots: np.ndarray, max_depth: int, n_outputs: int, n_features: int, is_multi_output=True):
+        # Nodes of all trees. Leaves have infinite threshold and point to themselves.
+        self.feature = feature
+        self.threshold = np.where(is_leaf, np.inf, threshold)
+        self.value, self.is_leaf = value, is_leaf
+        # Left child at 2*node, right at 2*node+1
+        self.children = np.stack([left, right], axis=1).reshape(-1)
+        # Decisions for missing values are constant per node
+        self.nan_left = np.where(missing_type == self.missing_none, 0.0 <= self.threshold, default_left)
+        self.zero_missing = (missing_type == self.missing_zero) & ~is_leaf
+        self.default_left = default_left
+        self.has_zero_missing = bool(self.zero_missing.any())
+        # Root node of each tree, shape (n_outputs, n_trees_per_output)
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_outputs = n_outputs
+        self.n_features_in_ = n_features
+        # MultiOutputRegressor predicts 2d, single LGBMRegressor 1d array
+        self.is_multi_output = is_multi_output
+
+    @staticmethod
+    def compiled_or_model(model):
+        """ Compile and verify the model. If not possible, return the model as is. """
+        try:
+            compiled = LgbCompiledModel.compile(model)
+            check_x = compiled.check_rows()
+            if not np.array_equal(compiled.predict(check_x), model.predict(check_x)):
+                raise ValueError("compiled predictions differ from lightgbm")
+            LgbCompiledModel._logger.info(f"Compiled {compiled.roots.size} trees of {compiled.n_outputs} outputs, "
+                                          f"max depth {compiled.max_depth}")
+            return compiled
+        except Exception as e:
+            LgbCompiledModel._logger.info(f"Cannot compile the model, will use it as is. {e}")
+            return model
+
+    @staticmethod
+    def compile(model) -> "LgbCompiledModel":
+        """ Flatten MultiOutputRegressor of LGBMRegressors or single LGBMRegressor to numpy arrays """
+        estimators = model.estimators_ if hasattr(model, "estimators_") else [model]
+        dumps = [estimator.booster_.dump_model() for estimator in estimators]
+        for dump in dumps:
+            if dump["objective"].split(" ")[0] not in LgbCompiledModel.raw_objectives:
+                raise ValueError(f"objective {dump['objective']} is not supported")
+            if dump["num_tree_per_iteration"] != 1 or dump["average_output"]:
+                raise ValueError("multiclass and random forest models are not supported")
+
+        nodes = {"feature": [], "threshold": [], "left": [], "right": [], "value": [], "is_leaf": [],
+                 "default_left": [], "missing_type": []}
+
+        def add_node(feature=0, threshold=0.0, value=0.0, is_leaf=True, default_left=False, missing_type=0):
+            idx = len(nodes["feature"])
+            for name, val in (("feature", feature), ("threshold", threshold), ("left", idx), ("right", idx),
+                              ("value", value), ("is_leaf", is_leaf), ("default_left", default_left),
+                              ("missing_type", missing_type)):
+                nodes[name].append(val)
+            return idx
+
+        def add_tree(tree: dict) -> (int, int):
+            """ Add tree nodes, return root index and depth """
+            if "leaf_value" in tree:
+                if "leaf_coeff" in tree:
+                    raise ValueError("linear trees are not supported")
+                return add_node(value=tree["leaf_value"]), 0
+            if tree["decision_type"] != "<=":
+                raise ValueError("categorical splits are not supported")
+            idx = add_node(feature=tree["split_feature"], threshold=tree["threshold"], is_leaf=False,
+                           default_left=tree["default_left"],
+                           missing_type=LgbCompiledModel.missing_types[tree["missing_type"]])
+            nodes["left"][idx], left_depth = add_tree(tree["left_child"])
+            nodes["right"][idx], right_depth = add_tree(tree["right_child"])
+            return idx, max(left_depth, right_depth) + 1
+
+        roots_by_output, max_depth = [], 0
+        for dump in dumps:
+            roots = []
+            for tree_info in dump["tree_info"]:
+                root, depth = add_tree(tree_info["tree_structure"])
+                roots.append(root)
+                max_depth = max(max_depth, depth)
+            roots_by_output.append(roots)
+
+        # Outputs with less trees are padded by zero leaves in the end, it does not change the sum
+        n_trees = max(len(roots) for roots in roots_by_output)
+        zero_leaf = add_node() if any(len(roots) < n_trees for roots in roots_by_output) else None
+        roots = np.array([roots + [zero_leaf] * (n_trees - len(roots)) for roots in roots_by_output], dtype=np.intp)
+
+        return LgbCompiledModel(feature=np.array(nodes["feature"], dtype=np.intp),
+                                threshold=np.array(nodes["threshold"], dtype=np.float64),
+                                left=np.array(nodes["left"], dtype=np.intp),
+                                right=np.array(nodes["right"], dtype=np.intp),
+                                value=np.array(nodes["value"], dtype=np.float64),
+                                is_leaf=np.array(nodes["is_leaf"], dtype=bool),
+                                default_left=np.array(nodes["default_left"], dtype=bool),
+                                missing_type=np.array(nodes["missing_type"], dtype=np.int8),
+                                roots=roots,
+                                max_depth=max_depth,
+                                n_outputs=len(dumps),
+                                n_features=dumps[0]["max_feature_idx"] + 1,
+                                is_multi_output=hasattr(model, "estimators_"))
+
+    def predict(self, X) -> np.ndarray:
+        """ Predict all outputs, shape (n_rows, n_outputs) like MultiOutputRegressor or (n_rows,) like LGBMRegressor """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        # Big batches are processed by chunks fitting cpu cache
+        y = np.concatenate([self._predict_chunk(X[start:start + self.chunk_size])
+                            for start in range(0, X.shape[0], self.chunk_size)]) \
+            if X.shape[0] > self.chunk_size else self._predict_chunk(X)
+        return y if self.is_multi_output else y[:, 0]
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        has_nan = np.isnan(X).any()
+        # Flat index of feature value of each row: row * n_features + feature
+        X_flat = X.reshape(-1)
+        row_offsets = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, None]
+        # Current node of each tree for each row, shape (n_rows, n_trees)
+        node = np.broadcast_to(self.roots.reshape(-1), (X.shape[0], self.roots.size))
+        for _ in range(self.max_depth):
+            fval = X_flat[row_offsets + self.feature[node]]
+            go_left = fval <= self.threshold[node]
+            if has_nan:
+                go_left = np.where(np.isnan(fval), self.nan_left[node], go_left)
+            if self.has_zero_missing:
+                is_zero = (fval >= -self.zero_threshold) & (fval <= self.zero_threshold) & self.zero_missing[node]
+                go_left = np.where(is_zero, self.default_left[node], go_left)
+            node = self.children[2 * node + ~go_left]
+
+        # Sequential sum of trees like lightgbm does: cumsum is not pairwise
+        values = self.value[node].reshape(X.shape[0], self.n_outputs, -1)
+        return np.cumsum(values, axis=-1)[:, :, -1]
+
+    def check_rows(self, n=64) -> np.ndarray:
+        """ Random rows around split thresholds to check compiled model against the original """
+        rng = np.random.default_rng(0)
+        X = np.zeros((n, self.n_features_in_))
+        splits = ~self.is_leaf
+        for feature in range(self.n_features_in_):
+            thresholds = self.threshold[splits & (self.feature == feature)]
+            if thresholds.size:
+                X[:, feature] = rng.choice(thresholds, n) + rng.normal(0, thresholds.std() + 1e-9, n)
+        return X
@@ -0,0 +1,144 @@
+import copy
+import logging
+from typing import Optional
+
+import numpy as np
+
+from strategy.inference.KerasPredictor import KerasPredictor
+
+
+class StatefulLstmPredictor:
+    """
+    Keras LSTM network exported to numpy, which keeps recurrent state between predictions.
+    Each prediction gets the last window of features. If the window is shifted by one new timestep,
+    only this timestep is fed through the network. Otherwise the state is primed from the whole window again.
+    The model is trained on windows from zero state, so the state is reprimed every window size steps by default:
+    stepped predictions see at most twice the window of history and deviate from the model within this bound.
+    Supported layers: LSTM, Dropout, Dense.
+    """
+    _logger = logging.getLogger("StatefulLstmPredictor")
+
+    def __init__(self, model, reprime_steps: Optional[int] = None):
+        # [("lstm", (kernel, recurrent_kernel, bias)) or ("dense", (kernel, bias, activation))]
+        self.layers = self.layers_of(model)
+        self.input_shape = tuple(model.inputs[0].shape[1:])
+        # Prime state from the full window after this number of single steps, window size if not set.
+        # 0 never reprimes: the state carries all history since the first window, unlike trained windows.
+        self.reprime_steps = self.input_shape[0] if reprime_steps is None else reprime_steps
+        self.reset()
+
+    @staticmethod
+    def of(model, reprime_steps: Optional[int] = None) -> Optional["StatefulLstmPredictor"]:
+        """ Export and check the model. None if the model is not supported. """
+        try:
+            predictor = StatefulLstmPredictor(model, reprime_steps)
+            check_x = np.random.default_rng(1).uniform(-1, 1, size=(8,) + predictor.input_shape).astype(np.float32)
+            if not np.allclose(model(check_x, training=False).numpy(), predictor.predict_stateless(check_x),
+                               rtol=1e-4, atol=1e-5):
+                raise ValueError("numpy lstm predictions differ from keras")
+            StatefulLstmPredictor._logger.info("Created stateful lstm predictor")
+            return predictor
+        except Exception as e:
+            StatefulLstmPredictor._logger.info(f"Cannot create stateful lstm predictor. {e}")
+            return None
+
+    @staticmethod
+    def layers_of(model) -> list:
+        layers = []
+        for layer in model.layers:
+            layer_type = layer.__class__.__name__
+            if layer_type == "Dropout":
+                continue
+            if layer_type == "LSTM":
+                if (layer.activation.__name__, layer.recurrent_activation.__name__) != ("tanh", "sigmoid") \
+                        or layer.go_backwards or not layer.use_bias:
+                    raise ValueError(f"LSTM layer {layer.name} configuration is not supported")
+                kernel, recurrent_kernel, bias = (np.array(w, dtype=np.float32) for w in layer.get_weights())
+                layers.append(("lstm", (kernel, recurrent_kernel, bias)))
+            elif layer_type == "Dense" and layer.activation.__name__ in KerasPredictor.numpy_activations:
+                kernel, bias = layer.get_weights() if layer.use_bias else (layer.get_weights()[0], 0)
+                layers.append(("dense", (np.array(kernel, dtype=np.float32), np.array(bias, dtype=np.float32),
+                                         KerasPredictor.numpy_activations[layer.activation.__name__])))
+            else:
+                raise ValueError(f"{layer_type} layer is not supported")
+        if not any(layer_type == "lstm" for layer_type, _ in layers):
+            raise ValueError("no LSTM layers in the model")
+        return layers
+
+    def with_own_state(self) -> "StatefulLstmPredictor":
+        """ Predictor of the same network with own recurrent state, to predict another sequence """
+        predictor = copy.copy(self)
+        predictor.reset()
+        return predictor
+
+    def is_of(self, predictor: "StatefulLstmPredictor") -> bool:
+        """ Is the same network as the predictor """
+        return self.layers is predictor.layers
+
+    def reset(self):
+        """ Forget recurrent state, next prediction primes it from the window """
+        self.states = None
+        self.last_window = None
+        self.last_y = None
+        self.steps_since_prime = 0
+
+    @staticmethod
+    def sigmoid(x):
+        return 1 / (1 + np.exp(-x))
+
+    def zero_states(self, batch_size: int) -> list:
+        return [(np.zeros((batch_size, weights[1].shape[0]), dtype=np.float32),
+                 np.zeros((batch_size, weights[1].shape[0]), dtype=np.float32))
+                for layer_type, weights in self.layers if layer_type == "lstm"]
+
+    def step(self, x_t: np.ndarray, states: list) -> (np.ndarray, list):
+        """ Feed one timestep of shape (batch, features) through all layers
+        :return output and new states """
+        new_states = []
+        lstm_idx = 0
+        for layer_type, weights in self.layers:
+            if layer_type == "lstm":
+                kernel, recurrent_kernel, bias = weights
+                h, c = states[lstm_idx]
+                z = x_t @ kernel + h @ recurrent_kernel + bias
+                i, f, g, o = np.split(z, 4, axis=-1)
+                c = self.sigmoid(f) * c + self.sigmoid(i) * np.tanh(g)
+                h = self.sigmoid(o) * np.tanh(c)
+                new_states.append((h, c))
+                lstm_idx += 1
+                x_t = h
+            else:
+                kernel, bias, activation = weights
+                x_t = activation(x_t @ kernel + bias)
+        return x_t, new_states
+
+    def run(self, windows: np.ndarray) -> (np.ndarray, list):
+        """ Feed windows of shape (batch, timesteps, features) from zero state
+        :return output after the last timestep and states """
+        states = self.zero_states(windows.shape[0])
+        y = None
+        for t in range(windows.shape[1]):
+            y, states = self.step(windows[:, t, :], states)
+        return y, states
+
+    def predict_stateless(self, x) -> np.ndarray:
+        """ Same as keras model prediction, the whole window of each row is fed from zero state """
+        return self.run(np.asarray(x, dtype=np.float32))[0]
+
+    def predict(self, x) -> np.ndarray:
+        """ Predict the last window of x (batch, timesteps, features), feeding only new timestep if possible """
+        x = np.asarray(x, dtype=np.float32)
+        if len(x) != 1:
+            return self.predict_stateless(x)
+        window = x[0]
+        if self.last_window is not None and np.array_equal(window, self.last_window):
+            return self.last_y
+        is_shifted = self.states is not None and np.array_equal(window[:-1], self.last_window[1:])
+        if is_shifted and not (self.reprime_steps and self.steps_since_prime >= self.reprime_steps):
+            self.last_y, self.states = self.step(window[-1:], self.states)
+            self.steps_since_prime += 1
+        else:
+            self.last_y, self.states = self.run(x)
+            self.steps_since_prime = 0
+        self.last_window = window.copy()
+        return self.last_y
@@ -0,0 +1,80 @@
+import logging
+import tempfile
+from typing import Optional
+
+import numpy as np
+import tensorflow as tf
+
+
+class TfLitePredictor:
+    """
+    Keras model converted to TFLite with post-training quantization, predicted by TFLite interpreter.
+    Dynamic range quantization stores weights as int8, int8 quantization also quantizes activations
+    calibrated on representative features. Inputs and outputs stay float.
+    """
+    _logger = logging.getLogger("TfLitePredictor")
+
+    quantizations = ("dynamic", "int8")
+    # Representative rows for int8 calibration and accuracy check
+    check_rows_count = 256
+
+    def __init__(self, tflite_model: bytes, num_threads: int = 1):
+        self.tflite_model = tflite_model
+        self.interpreter = tf.lite.Interpreter(model_content=tflite_model, num_threads=num_threads)
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.input_shape = tuple(self.interpreter.get_input_details()[0]["shape"])
+        # Batch size the interpreter is allocated for, reallocated only when it changes
+        self.batch_size = None
+
+    @staticmethod
+    def of(model, quantization: str, check_x: np.ndarray = None, tolerance: float = 0.05) \
+            -> Optional["TfLitePredictor"]:
+        """ Convert and check the model. None if conversion failed or quantized predictions are too far from float.
+        :param check_x: recent transformed features for int8 calibration and accuracy check
+        :param tolerance: max abs error relative to max abs float prediction """
+        try:
+            input_shape = tuple(model.inputs[0].shape[1:])
+            if check_x is None or not len(check_x):
+                # Features are scaled by pipes to about -1..1
+                check_x = np.random.default_rng(1).uniform(-1, 1, size=(TfLitePredictor.check_rows_count,)
+                                                                         + input_shape)
+            check_x = np.asarray(check_x[-TfLitePredictor.check_rows_count:], dtype=np.float32)
+
+            predictor = TfLitePredictor(TfLitePredictor.convert(model, quantization, check_x))
+            y_float = model(check_x, training=False).numpy()
+            max_error = np.max(np.abs(predictor.predict(check_x) - y_float))
+            allowed_error = tolerance * max(np.max(np.abs(y_float)), 1e-6)
+            if max_error > allowed_error:
+                raise ValueError(f"quantized prediction error {max_error} is more than allowed {allowed_error}")
+
+            TfLitePredictor._logger.info(f"Created {quantization} quantized tflite predictor, "
+                                         f"{len(predictor.tflite_model)} bytes, max error {max_error}")
+            return predictor
+        except Exception as e:
+            TfLitePredictor._logger.info(f"Cannot create {quantization} tflite predictor. {e}")
+            return None
+
+    @staticmethod
+    def convert(model, quantization: str, representative_x: np.ndarray) -> bytes:
+        """ Quantized tflite model. Keras 3 models are converted through exported SavedModel. """
+        if quantization not in TfLitePredictor.quantizations:
+            raise ValueError(f"Unknown quantization {quantization}, should be one of {TfLitePredictor.quantizations}")
+        with tempfile.TemporaryDirectory() as saved_model_dir:
+            model.export(saved_model_dir, verbose=False)
+            converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            if quantization == "int8":
+                converter.representative_dataset = lambda: ([representative_x[i:i + 1]]
+                                                            for i in range(len(representative_x)))
+            return converter.convert()
+
+    def predict(self, x) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if x.shape[0] != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, (x.shape[0],) + self.input_shape[1:])
+            self.interpreter.allocate_tensors()
+            self.batch_size = x.shape[0]
+        self.interpreter.set_tensor(self.input_index, x)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
@@ -0,0 +1,63 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, MaxAbsScaler, RobustScaler, MinMaxScaler, FunctionTransformer, \
+    OneHotEncoder
+
+from strategy.common.LSTMBidAskRegressionStrategyBase import LSTMBidAskRegressionStrategyBase
+from strategy.inference.AffinePipe import AffinePipe
+
+
+class TestAffinePipe(TestCase):
+
+    @staticmethod
+    def new_x():
+        rnd = np.random.default_rng(0)
+        return pd.DataFrame(rnd.normal(10, 5, size=(50, 4)), columns=["time_hour", "f1", "f2", "f3"])
+
+    def test_transform__column_transformer(self):
+        x = self.new_x()
+        pipe = Pipeline([("xscaler", ColumnTransformer([("xrs", StandardScaler(), ["f3", "f1"])],
+                                                       remainder="passthrough")),
+                         ("xmms", MaxAbsScaler())]).fit(x)
+
+        compiled = AffinePipe.compiled_or_pipe(pipe)
+
+        self.assertIsInstance(compiled, AffinePipe)
+        # Column transformer output is not invertible in sklearn, so inverse is not fused
+        self.assertFalse(compiled.is_invertible)
+        np.testing.assert_allclose(pipe.transform(x), compiled.transform(x), rtol=1e-12, atol=1e-12)
+        # Columns are selected by name
+        np.testing.assert_allclose(pipe.transform(x), compiled.transform(x[["f3", "f2", "f1", "time_hour"]]),
+                                   rtol=1e-12, atol=1e-12)
+
+    def test_inverse_transform(self):
+        y = self.new_x()[["f1", "f2"]]
+        pipe = Pipeline([("yrs", RobustScaler()), ("ymms", MinMaxScaler())]).fit(y)
+
+        compiled = AffinePipe.compiled_or_pipe(pipe)
+
+        self.assertTrue(compiled.is_invertible)
+        y_trans = pipe.transform(y)
+        np.testing.assert_allclose(y_trans, compiled.transform(y), rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(pipe.inverse_transform(y_trans), compiled.inverse_transform(y_trans), rtol=1e-12, atol=1e-12)
+
+    def test_transform__trailing_function_transformer(self):
+        x = self.new_x()
+        pipe = Pipeline([("xmms", MinMaxScaler()),
+                         ("reshape", FunctionTransformer(LSTMBidAskRegressionStrategyBase.reshape_x,
+                                                         kw_args={"window_shape": (3, 4)}))]).fit(x)
+
+        compiled = AffinePipe.compiled_or_pipe(pipe)
+
+        self.assertIsInstance(compiled, AffinePipe)
+        np.testing.assert_allclose(pipe.transform(x), compiled.transform(x), rtol=1e-12, atol=1e-12)
+
+    def test_compiled_or_pipe__not_affine(self):
+        y = pd.DataFrame({"signal": [-1, 0, 1]})
+        pipe = Pipeline([("adjust_labels", OneHotEncoder(categories=[[-1, 0, 1]], sparse_output=False))]).fit(y)
+        self.assertIs(pipe, AffinePipe.compiled_or_pipe(pipe))
+        self.assertIsNone(AffinePipe.compiled_or_pipe(None))
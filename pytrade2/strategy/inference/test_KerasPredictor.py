@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+import numpy as np
+from keras import Sequential, Input
+from keras.layers import Dense, Dropout, LSTM
+
+from strategy.inference.KerasPredictor import KerasPredictor
+
+
+class TestKerasPredictor(TestCase):
+
+    @staticmethod
+    def new_dense_model(activation="linear"):
+        model = Sequential()
+        model.add(Input(shape=(3,)))
+        model.add(Dense(8, activation='relu'))
+        model.add(Dropout(0.1))
+        model.add(Dense(2, activation=activation))
+        return model
+
+    def test_predict__numpy_dense(self):
+        model = self.new_dense_model()
+        x = np.random.rand(5, 3)
+
+        predictor = KerasPredictor.of(model)
+
+        self.assertTrue(predictor.dense_layers)
+        np.testing.assert_allclose(model(x, training=False).numpy(), predictor.predict(x), rtol=1e-5, atol=1e-6)
+
+    def test_predict__numpy_softmax(self):
+        model = self.new_dense_model("softmax")
+        x = np.random.rand(5, 3)
+        predictor = KerasPredictor.of(model)
+        np.testing.assert_allclose(model(x, training=False).numpy(), predictor.predict(x), rtol=1e-5, atol=1e-6)
+
+    def test_predict__tf_function(self):
+        model = Sequential()
+        model.add(Input(shape=(2, 3)))
+        model.add(LSTM(4))
+        model.add(Dense(1))
+        x = np.random.rand(5, 2, 3)
+
+        predictor = KerasPredictor.of(model)
+
+        # LSTM is not exported to numpy
+        self.assertIsNone(predictor.dense_layers)
+        np.testing.assert_allclose(model(x, training=False).numpy(), predictor.predict(x), rtol=1e-5, atol=1e-6)
+
+    def test_of__not_keras(self):
+        self.assertIsNone(KerasPredictor.of(object()))
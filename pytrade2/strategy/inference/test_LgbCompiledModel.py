@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+import lightgbm as lgb
+import numpy as np
+from sklearn.multioutput import MultiOutputRegressor
+
+from strategy.inference.LgbCompiledModel import LgbCompiledModel
+
+
+class TestLgbCompiledModel(TestCase):
+
+    @staticmethod
+    def new_xy(n=500):
+        rng = np.random.default_rng(1)
+        X = rng.random((n, 5))
+        y = np.c_[X[:, 0] * 3 + X[:, 1], X[:, 2] - X[:, 3]] + rng.random((n, 2))
+        # Missing values
+        X[::7, 1] = np.nan
+        X[::5, 2] = 0
+        return X, y
+
+    def test_predict__same_as_lgb(self):
+        X, y = self.new_xy()
+        model = MultiOutputRegressor(lgb.LGBMRegressor(verbose=-1, n_estimators=20)).fit(X, y)
+
+        compiled = LgbCompiledModel.compiled_or_model(model)
+
+        self.assertIsInstance(compiled, LgbCompiledModel)
+        self.assertTrue(np.array_equal(model.predict(X), compiled.predict(X)))
+        # Single row
+        self.assertTrue(np.array_equal(model.predict(X[-1:]), compiled.predict(X[-1:])))
+
+    def test_predict__zero_as_missing(self):
+        X, y = self.new_xy()
+        model = MultiOutputRegressor(lgb.LGBMRegressor(verbose=-1, n_estimators=20, zero_as_missing=True)).fit(X, y)
+        compiled = LgbCompiledModel.compiled_or_model(model)
+        self.assertTrue(np.array_equal(model.predict(X), compiled.predict(X)))
+
+    def test_predict__big_batch(self):
+        X, y = self.new_xy(LgbCompiledModel.chunk_size * 2 + 10)
+        model = MultiOutputRegressor(lgb.LGBMRegressor(verbose=-1, n_estimators=5)).fit(X, y)
+        compiled = LgbCompiledModel.compile(model)
+        self.assertTrue(np.array_equal(model.predict(X), compiled.predict(X)))
+
+    def test_predict__single_output(self):
+        X, y = self.new_xy()
+        model = lgb.LGBMRegressor(verbose=-1, n_estimators=10).fit(X, y[:, 0])
+        compiled = LgbCompiledModel.compiled_or_model(model)
+        self.assertEqual((len(X),), compiled.predict(X).shape)
+        self.assertTrue(np.array_equal(model.predict(X), compiled.predict(X)))
+
+    def test_compiled_or_model__unsupported(self):
+        X, y = self.new_xy()
+        model = lgb.LGBMRegressor(verbose=-1, n_estimators=5, objective="poisson").fit(X, np.abs(y[:, 0]))
+        # Poisson output is transformed, model should be used as is
+        self.assertIs(model, LgbCompiledModel.compiled_or_model(model))
+
+    def test_compiled_or_model__not_lgb(self):
+        model = object()
+        self.assertIs(model, LgbCompiledModel.compiled_or_model(model))
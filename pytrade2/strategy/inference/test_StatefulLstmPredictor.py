@@ -0,0 +1,110 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import numpy as np
+from keras import Sequential, Input
+from keras.layers import Dense, Dropout, LSTM
+
+from strategy.inference.StatefulLstmPredictor import StatefulLstmPredictor
+
+
+class TestStatefulLstmPredictor(TestCase):
+
+    @staticmethod
+    def new_model(window=3, features=2):
+        model = Sequential()
+        model.add(Input(shape=(window, features)))
+        model.add(LSTM(8, return_sequences=True))
+        model.add(Dropout(0.2))
+        model.add(LSTM(4))
+        model.add(Dense(2))
+        return model
+
+    @staticmethod
+    def windows_of(x, window):
+        return np.stack([x[i:i + window] for i in range(len(x) - window + 1)])
+
+    def test_predict__stateless_same_as_keras(self):
+        model = self.new_model()
+        x = np.random.default_rng(0).uniform(-1, 1, size=(5, 3, 2))
+        predictor = StatefulLstmPredictor.of(model)
+        np.testing.assert_allclose(model(x, training=False).numpy(), predictor.predict(x), rtol=1e-4, atol=1e-5)
+
+    def test_predict__new_step_fed_with_state(self):
+        model = self.new_model()
+        x = np.random.default_rng(0).uniform(-1, 1, size=(6, 2)).astype(np.float32)
+        windows = self.windows_of(x, 3)
+        predictor = StatefulLstmPredictor.of(model)
+        predictor.run = MagicMock(wraps=predictor.run)
+
+        # First window primes the state, next windows feed the last step only
+        ys = [predictor.predict(windows[i:i + 1]) for i in range(len(windows))]
+
+        predictor.run.assert_called_once()
+        # Stepped prediction sees window and steps since priming, less than twice the window
+        expected = predictor.predict_stateless(x[np.newaxis])
+        np.testing.assert_allclose(expected, ys[-1], rtol=1e-5, atol=1e-6)
+        # Same window again is not fed
+        self.assertIs(ys[-1], predictor.predict(windows[-1:]))
+
+    def test_with_own_state__sequences_stepped_independently(self):
+        model = self.new_model()
+        rng = np.random.default_rng(0)
+        x1, x2 = (rng.uniform(-1, 1, size=(6, 2)).astype(np.float32) for _ in range(2))
+        windows1, windows2 = self.windows_of(x1, 3), self.windows_of(x2, 3)
+        predictor = StatefulLstmPredictor.of(model)
+        predictor1, predictor2 = predictor.with_own_state(), predictor.with_own_state()
+        predictor1.run, predictor2.run = MagicMock(wraps=predictor1.run), MagicMock(wraps=predictor2.run)
+
+        # Interleaved sequences don't break each other state
+        for i in range(len(windows1)):
+            y1, y2 = predictor1.predict(windows1[i:i + 1]), predictor2.predict(windows2[i:i + 1])
+
+        predictor1.run.assert_called_once()
+        predictor2.run.assert_called_once()
+        self.assertTrue(predictor1.is_of(predictor) and predictor2.is_of(predictor))
+        self.assertFalse(predictor1.is_of(StatefulLstmPredictor.of(model)))
+        np.testing.assert_allclose(predictor.predict_stateless(x1[np.newaxis]), y1, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(predictor.predict_stateless(x2[np.newaxis]), y2, rtol=1e-5, atol=1e-6)
+
+    def test_predict__reprime_every_window_by_default(self):
+        model = self.new_model()
+        x = np.random.default_rng(0).uniform(-1, 1, size=(8, 2)).astype(np.float32)
+        windows = self.windows_of(x, 3)
+        predictor = StatefulLstmPredictor.of(model)
+
+        ys = [predictor.predict(windows[i:i + 1]) for i in range(len(windows))]
+
+        self.assertEqual(3, predictor.reprime_steps)
+        # Primed on window 0, stepped on windows 1-3, primed again on window 4 like the model was trained
+        np.testing.assert_allclose(model(windows[4:5], training=False).numpy(), ys[4], rtol=1e-4, atol=1e-5)
+        # Stepped prediction is fed from the state of window 4 only
+        np.testing.assert_allclose(predictor.predict_stateless(x[np.newaxis, 4:]), ys[5], rtol=1e-5, atol=1e-6)
+
+    def test_predict__never_reprime(self):
+        model = self.new_model()
+        x = np.random.default_rng(0).uniform(-1, 1, size=(8, 2)).astype(np.float32)
+        windows = self.windows_of(x, 3)
+        predictor = StatefulLstmPredictor.of(model, reprime_steps=0)
+
+        ys = [predictor.predict(windows[i:i + 1]) for i in range(len(windows))]
+
+        # State carries all the history
+        np.testing.assert_allclose(predictor.predict_stateless(x[np.newaxis]), ys[-1], rtol=1e-5, atol=1e-6)
+
+    def test_predict__reprime(self):
+        model = self.new_model()
+        x = np.random.default_rng(0).uniform(-1, 1, size=(6, 2)).astype(np.float32)
+        windows = self.windows_of(x, 3)
+        predictor = StatefulLstmPredictor.of(model, reprime_steps=2)
+
+        ys = [predictor.predict(windows[i:i + 1]) for i in range(len(windows))]
+
+        # Primed on window 0, stepped on windows 1, 2, primed again on window 3
+        np.testing.assert_allclose(predictor.predict_stateless(windows[3:4]), ys[3], rtol=1e-5, atol=1e-6)
+
+    def test_of__not_lstm(self):
+        model = Sequential()
+        model.add(Input(shape=(2,)))
+        model.add(Dense(1))
+        self.assertIsNone(StatefulLstmPredictor.of(model))
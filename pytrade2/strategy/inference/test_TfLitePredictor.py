@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+import numpy as np
+from keras import Sequential, Input
+from keras.layers import Dense
+
+from strategy.inference.TfLitePredictor import TfLitePredictor
+
+
+class TestTfLitePredictor(TestCase):
+
+    @staticmethod
+    def new_model():
+        model = Sequential()
+        model.add(Input(shape=(4,)))
+        model.add(Dense(8, activation='relu'))
+        model.add(Dense(2))
+        return model
+
+    def test_of__dynamic(self):
+        model = self.new_model()
+        x = np.random.default_rng(0).uniform(-1, 1, size=(50, 4))
+
+        predictor = TfLitePredictor.of(model, "dynamic", x)
+
+        self.assertIsNotNone(predictor)
+        y_float = model(x, training=False).numpy()
+        np.testing.assert_allclose(y_float, predictor.predict(x), atol=0.05 * np.abs(y_float).max())
+        # Batch size changes
+        self.assertEqual((1, 2), predictor.predict(x[:1]).shape)
+
+    def test_of__int8(self):
+        predictor = TfLitePredictor.of(self.new_model(), "int8", None, tolerance=0.2)
+        self.assertIsNotNone(predictor)
+
+    def test_of__error_above_tolerance(self):
+        self.assertIsNone(TfLitePredictor.of(self.new_model(), "int8", None, tolerance=0))
+
+    def test_of__unknown_quantization(self):
+        self.assertIsNone(TfLitePredictor.of(self.new_model(), "float16"))
@@ -9,7 +9,6 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict
 
-import boto3
 import pandas as pd
 
 from strategy.persist.Boto3Hack import Boto3Hack
@@ -20,13 +19,13 @@ class DataPersister:
 
     def __init__(self, config: Dict, tag: str):
         self._logger = logging.getLogger(self.__class__.__name__)
-        # Hack to fix boto3 issue https://bugs.python.org/issue42647
-        threading._register_atexit = Boto3Hack._register_atexit
-        concurrent.futures.thread.ThreadPoolExecutor.submit = Boto3Hack.submit
 
         # Init boto3
         self.s3_enabled = config.get('pytrade2.s3.enabled', False)
         if self.s3_enabled:
+            # Hack to fix boto3 issue https://bugs.python.org/issue42647
+            threading._register_atexit = Boto3Hack._register_atexit
+            concurrent.futures.thread.ThreadPoolExecutor.submit = Boto3Hack.submit
             self.s3_access_key = config['pytrade2.s3.access_key']
             self.s3_secret_key = config['pytrade2.s3.secret_key']
             self.s3_bucket = config['pytrade2.s3.bucket']
@@ -125,6 +124,8 @@ class DataPersister:
         s3datapath = str(datapath).lstrip("../")
         self._logger.debug(f"Uploading {datapath} to s3://{self.s3_bucket}/{s3datapath}")
 
+        # Import boto3 only if s3 is enabled
+        import boto3
         s3 = boto3.client(service_name='s3', endpoint_url=self.s3_endpoint_url, aws_access_key_id=self.s3_access_key,
                           aws_secret_access_key=self.s3_secret_key)
         s3.upload_file(datapath, self.s3_bucket, s3datapath)
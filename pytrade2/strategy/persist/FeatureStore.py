@@ -0,0 +1,134 @@
+import atexit
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureStore:
+    """
+    Append only store of features X and targets y on disk. Each table is a file of int64 timestamps,
+    a file of float32 rows and a json of column names. Reading maps the files to memory,
+    so the latest rows are read without copy and without recalculation.
+    """
+
+    def __init__(self, store_dir: Optional[str], max_rows: int = 1_000_000):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        # Temp dir without store dir, removed on exit
+        self.temp_dir = None
+        if not store_dir:
+            store_dir = self.temp_dir = tempfile.mkdtemp(prefix="pytrade2_features_")
+            atexit.register(self.cleanup)
+        self.store_dir = store_dir
+        Path(self.store_dir).mkdir(parents=True, exist_ok=True)
+        # When a table grows twice of this, it is compacted to the last max_rows
+        self.max_rows = max_rows
+
+    def cleanup(self):
+        """ Remove temp store dir, given store dir is kept """
+        if self.temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def paths(self, table: str) -> (str, str, str):
+        """ Timestamps, values and columns files of the table """
+        return tuple(str(Path(self.store_dir, f"{table}.{ext}")) for ext in ("ts", "values", "columns.json"))
+
+    def columns(self, table: str) -> Optional[list]:
+        columns_path = self.paths(table)[2]
+        if not os.path.exists(columns_path):
+            return None
+        with open(columns_path) as f:
+            return json.load(f)
+
+    def size(self, table: str) -> int:
+        """ Rows count. Values are appended before timestamps, so timestamps count complete rows. """
+        ts_path, values_path, _ = self.paths(table)
+        columns = self.columns(table)
+        if not columns or not os.path.exists(ts_path):
+            return 0
+        return min(os.path.getsize(ts_path) // 8, os.path.getsize(values_path) // (4 * len(columns)))
+
+    def last_time(self, table: str) -> Optional[pd.Timestamp]:
+        n = self.size(table)
+        if not n:
+            return None
+        ts = np.memmap(self.paths(table)[0], dtype=np.int64, mode="r", shape=(n,))
+        return pd.Timestamp(int(ts[-1]))
+
+    def reset(self, table: str = None):
+        """ Delete the table or all tables """
+        tables = [table] if table else {Path(f).name.split(".")[0] for f in os.listdir(self.store_dir)}
+        for t in tables:
+            for path in self.paths(t):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def append(self, table: str, df: pd.DataFrame) -> bool:
+        """ Append rows newer than the last stored one.
+        :return False if columns changed and the table was reset before append """
+        if df.empty:
+            return True
+        is_same_columns = True
+        columns = self.columns(table)
+        if columns is not None and columns != list(df.columns):
+            self._logger.info(f"{table} columns changed, resetting stored {table}")
+            self.reset(table)
+            columns, is_same_columns = None, False
+
+        last_time = self.last_time(table)
+        if last_time is not None:
+            df = df[df.index > last_time]
+
+        ts_path, values_path, columns_path = self.paths(table)
+        if columns is None:
+            with open(columns_path, "w") as f:
+                json.dump(list(df.columns), f)
+        with open(values_path, "ab") as f:
+            f.write(np.ascontiguousarray(df.to_numpy(dtype=np.float32)).tobytes())
+        with open(ts_path, "ab") as f:
+            f.write(df.index.to_numpy(dtype="datetime64[ns]").astype(np.int64).tobytes())
+
+        if self.size(table) > 2 * self.max_rows:
+            self.compact(table)
+        return is_same_columns
+
+    def compact(self, table: str):
+        """ Keep last max_rows rows """
+        ts, values = self.read_arrays(table)
+        ts_path, values_path, _ = self.paths(table)
+        for path, arr in ((values_path, values), (ts_path, ts)):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(np.ascontiguousarray(arr[-self.max_rows:]).tobytes())
+            os.replace(tmp_path, path)
+        self._logger.debug(f"Compacted {table} to {self.max_rows} rows")
+
+    def read_arrays(self, table: str) -> (np.ndarray, np.ndarray):
+        """ Memory mapped timestamps and values """
+        n, columns = self.size(table), self.columns(table)
+        if not n:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(columns or [])), dtype=np.float32)
+        ts_path, values_path, _ = self.paths(table)
+        return (np.memmap(ts_path, dtype=np.int64, mode="r", shape=(n,)),
+                np.memmap(values_path, dtype=np.float32, mode="r", shape=(n, len(columns))))
+
+    def read(self, table: str, since: pd.Timestamp = None) -> pd.DataFrame:
+        """ Rows after since time, dataframe over memory mapped values """
+        ts, values = self.read_arrays(table)
+        start = int(np.searchsorted(ts, since.value, side="right")) if since is not None else 0
+        return pd.DataFrame(values[start:], index=pd.DatetimeIndex(ts[start:], name="datetime"),
+                            columns=self.columns(table), copy=False)
+
+    def read_xy(self, since: pd.Timestamp = None) -> (pd.DataFrame, pd.DataFrame):
+        """ Features and targets of the same times after since """
+        X, y = self.read("X", since), self.read("y", since)
+        if X.index.equals(y.index):
+            return X, y
+        common = X.index.intersection(y.index)
+        return X.loc[common], y.loc[common]
@@ -0,0 +1,135 @@
+import gzip
+import importlib
+import io
+import logging
+import pickle
+import sys
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class ModelBackend:
+    """
+    Framework specific model operations. The framework is imported on first use only,
+    so strategies don't pay import cost of frameworks they don't use.
+    """
+    # Module of the framework, imported lazily
+    module_name: str = None
+    # Saved model file suffix
+    suffix: str = None
+
+    def __init__(self):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def module(self):
+        return importlib.import_module(self.module_name)
+
+    def is_model(self, model) -> bool:
+        """ If the framework is not imported yet, the model cannot be of this framework """
+        return self.module_name in sys.modules and self._is_model(model)
+
+    def _is_model(self, model) -> bool:
+        raise NotImplementedError()
+
+    def dumps(self, model) -> bytes:
+        """ Serialize the model in memory, so it can be written to disk later by another thread """
+        raise NotImplementedError()
+
+    def loads(self, model, data: bytes):
+        """ Deserialize the model, return loaded model """
+        raise NotImplementedError()
+
+    def save(self, model, path: str) -> str:
+        """ Save the model, return saved file path """
+        path += self.suffix
+        with open(path, 'wb') as f:
+            f.write(self.dumps(model))
+        return path
+
+    def load(self, model, path: str):
+        """ Load saved model from path, gzipped if path ends with .gz. Return loaded model """
+        with open(path, 'rb') as f:
+            data = f.read()
+        if path.endswith(".gz"):
+            data = gzip.decompress(data)
+        return self.loads(model, data)
+
+    def clear_session(self):
+        """ Free framework resources after learning """
+        ...
+
+    def input_shape(self, model) -> Optional[tuple]:
+        """ Shape of one input sample, None if unknown """
+        n_features = getattr(model, "n_features_in_", None)
+        return (n_features,) if n_features else None
+
+    def predict(self, model, x):
+        return model.predict(x)
+
+
+class KerasBackend(ModelBackend):
+    """ Keras model weights, numpy npz """
+    module_name = "keras"
+    suffix = ".weights.npz"
+
+    def _is_model(self, model) -> bool:
+        return isinstance(model, self.module().Model)
+
+    def dumps(self, model) -> bytes:
+        buf = io.BytesIO()
+        np.savez(buf, *model.get_weights())
+        return buf.getvalue()
+
+    def loads(self, model, data: bytes):
+        with np.load(io.BytesIO(data)) as weights:
+            model.set_weights([weights[f"arr_{i}"] for i in range(len(weights.files))])
+        return model
+
+    def input_shape(self, model) -> Optional[tuple]:
+        return tuple(model.inputs[0].shape[1:])
+
+    def predict(self, model, x):
+        return model.predict(x, verbose=0)
+
+    def clear_session(self):
+        # to avoid OOM. Legacy tf keras session only: keras 3 clear_session() resets global keras state
+        # while processing thread predicts by the live model.
+        from tensorflow.python.keras import backend
+        backend.clear_session()
+
+
+class LgbBackend(ModelBackend):
+    """ Lightgbm model or MultiOutputRegressor of lightgbm models, pickled """
+    module_name = "lightgbm"
+    suffix = "_lgb.pkl"
+
+    def _is_model(self, model) -> bool:
+        lgb_model = self.module().LGBMModel
+        return isinstance(model, lgb_model) or isinstance(getattr(model, "estimator", None), lgb_model)
+
+    def dumps(self, model) -> bytes:
+        return pickle.dumps(model)
+
+    def loads(self, model, data: bytes):
+        return pickle.loads(data)
+
+
+class ModelBackends:
+    """ Registry of model backends """
+
+    backends: Dict[str, ModelBackend] = {"keras": KerasBackend(), "lgb": LgbBackend()}
+
+    @staticmethod
+    def register(name: str, backend: ModelBackend):
+        ModelBackends.backends[name] = backend
+
+    @staticmethod
+    def of(model) -> Optional[ModelBackend]:
+        """ Backend of given model or None if model framework is unknown """
+        return next((backend for backend in ModelBackends.backends.values() if backend.is_model(model)), None)
+
+    @staticmethod
+    def of_file(path: str) -> Optional[ModelBackend]:
+        """ Backend which saved given file """
+        return next((backend for backend in ModelBackends.backends.values() if path.endswith(backend.suffix)), None)
@@ -0,0 +1,91 @@
+import logging
+import os
+import shutil
+from datetime import timedelta
+from pathlib import Path
+from threading import Thread, Event
+from typing import Optional
+
+from strategy.persist.ModelPersister import ModelPersister
+
+
+class ModelCache:
+    """
+    Local cache of mlflow trade ready models. Background thread polls version metadata only,
+    new versions are downloaded to <cache dir>/<model name>/<version> and deserialized there with their X, y pipes.
+    The processing loop reads the latest loaded model without waiting for mlflow.
+    """
+
+    def __init__(self, model_persister: ModelPersister, model_name: str, cache_dir: Optional[str],
+                 keep_count: int = 3, poll_interval: timedelta = timedelta(seconds=30), on_new_version=None):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.model_persister = model_persister
+        self.model_name = model_name
+        # Local directory of cached versions. If not set, model is loaded from mlflow source directly
+        self.cache_dir = str(Path(cache_dir, model_name)) if cache_dir else None
+        self.keep_count = keep_count
+        self.poll_interval = poll_interval
+        # Callback(model, model_version, params, pipes) called in background thread when new version is loaded
+        self.on_new_version = on_new_version
+
+        # Latest loaded model, version, params, (X_pipe, y_pipe). Set at once to be read from other threads.
+        self.latest = (None, None, None, (None, None))
+        self.stop_event = Event()
+
+    def start(self):
+        """ Load current version synchronously, then poll new versions in background """
+        if not self.model_persister.is_mlflow_enabled:
+            self._logger.info("Mlflow is disabled, model cache is not started")
+            return
+        self.refresh()
+        Thread(target=self.poll_loop, daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def poll_loop(self):
+        while not self.stop_event.wait(self.poll_interval.total_seconds()):
+            self.refresh()
+
+    def refresh(self):
+        """ Load the latest trade ready version if it is new """
+        try:
+            model_version = self.model_persister.get_last_trade_ready_version(self.model_name)
+            cur_version = self.latest[1]
+            if not model_version or (cur_version and cur_version.version == model_version.version):
+                return
+            self._logger.info(f"Prefetching {self.model_name} v{model_version.version}")
+            local_path = self.local_path_of(model_version)
+            model = self.model_persister.load_model_version(local_path)
+            params = self.model_persister.get_model_params(model_version)
+            pipes = self.model_persister.load_version_pipes(model_version, local_path if self.cache_dir else None)
+            self.latest = (model, model_version, params, pipes)
+            self.purge_old_versions()
+            if self.on_new_version:
+                self.on_new_version(model, model_version, params, pipes)
+        except Exception as e:
+            self._logger.error(f"Cannot refresh model {self.model_name}. {e}")
+
+    def local_path_of(self, model_version) -> str:
+        """ Local dir of the version, download if not cached yet """
+        if not self.cache_dir:
+            return model_version.source
+        version_dir = Path(self.cache_dir, str(model_version.version))
+        if not version_dir.exists():
+            # Download to temp dir and rename, so partially downloaded version is never used
+            tmp_dir = Path(self.cache_dir, f".{model_version.version}.tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+            downloaded = Path(self.model_persister.download_model_version(model_version, str(tmp_dir)))
+            os.rename(downloaded if downloaded != tmp_dir else tmp_dir, version_dir)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return str(version_dir)
+
+    def purge_old_versions(self):
+        """ Keep only last versions in the cache """
+        if not self.cache_dir or not os.path.exists(self.cache_dir):
+            return
+        versions = sorted([int(d) for d in os.listdir(self.cache_dir) if d.isdigit()], reverse=True)
+        for version in versions[self.keep_count:]:
+            self._logger.debug(f"Purging cached {self.model_name} v{version}")
+            shutil.rmtree(Path(self.cache_dir, str(version)), ignore_errors=True)
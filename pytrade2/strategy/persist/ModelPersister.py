@@ -1,78 +1,183 @@
 import glob
+import gzip
+import hashlib
 import logging
 import os
 import pickle
+import tempfile
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from threading import Thread, Condition
+from typing import Dict, Optional
 
-import mlflow.sklearn
-from keras.models import Model
-from lightgbm import LGBMRegressor
-from sklearn.multioutput import MultiOutputRegressor
-
-from mlflow import MlflowClient
+from metrics.MetricServer import MetricServer
+from strategy.persist.ModelBackends import ModelBackends, ModelBackend
 
 
 class ModelPersister:
-    """ Read/write model weights"""
+    """ Read/write model weights and fitted X, y pipelines of the model.
+    Saving serializes the model in memory only, background writer writes the latest pending model to disk. """
 
     def __init__(self, config: Dict, tag: str):
         self._logger = logging.getLogger(self.__class__.__name__)
+        self.tag = tag
 
         # Directory for model weights and price data
         self.data_dir = config["pytrade2.data.dir"]
+        self.mlflow_cache_dir = None
         if self.data_dir:
             # weights dir
             self.model_dir = str(Path(self.data_dir, tag, "model"))
             Path(self.model_dir).mkdir(parents=True, exist_ok=True)
-        self.mlflow_client = MlflowClient()
+            # Local copies of mlflow model versions
+            self.mlflow_cache_dir = str(Path(self.data_dir, tag, "mlflow"))
+        # Mlflow is imported and connected on first use only
+        self.is_mlflow_enabled = config.get("pytrade2.mlflow.enabled", True)
+        self._mlflow_client = None
+
+        # Write saved models in background thread. Pending model is overwritten by newer one, so only latest is written
+        self.is_async_save = config.get("pytrade2.model.save.async", True)
+        self.is_compressed_save = config.get("pytrade2.model.save.compress", False)
+        self._save_cond = Condition()
+        self._pending_save: (ModelBackend, bytes, Optional[bytes]) = None
+        self._is_writing = False
+        self._writer = None
+        # Hash of last written model to skip writing unchanged weights
+        self.last_saved_hash = None
+
+    # Pickled (X_pipe, y_pipe) file suffix in model dir and artifact name in mlflow run
+    pipes_suffix = "_pipes.pkl"
+    pipes_artifact = "pipes.pkl"
+    # Model artifact path in mlflow run
+    model_artifact = "model"
+
+    @property
+    def mlflow_client(self):
+        if not self._mlflow_client:
+            from mlflow import MlflowClient
+            self._mlflow_client = MlflowClient()
+        return self._mlflow_client
 
-    def load_last_model(self, model: Model):
+    def has_last_model(self) -> bool:
+        """ Is there a locally saved model of any backend """
+        if not self.data_dir:
+            return False
+        suffixes = [suffix for backend in ModelBackends.backends.values() for suffix in (backend.suffix,
+                                                                                         f"{backend.suffix}.gz")]
+        return any(glob.glob(str(Path(self.model_dir, f"*{suffix}"))) for suffix in suffixes)
+
+    def load_last_model(self, model):
         try:
-            saved_models = glob.glob(str(Path(self.model_dir, "*.*")))
+            backend = ModelBackends.of(model)
+            saved_models = [path for suffix in (backend.suffix, f"{backend.suffix}.gz")
+                            for path in glob.glob(str(Path(self.model_dir, f"*{suffix}")))] if backend else []
             if not saved_models:
                 self._logger.info(f"No saved models in {self.model_dir}")
                 return model
 
-            if isinstance(model, Model):
-                saved_models = glob.glob(str(Path(self.model_dir, "*.index")))
-                # Load keras
-                last_model_path = str(sorted(saved_models)[-1])[:-len(".index")]
-                self._logger.info(f"Load keras model from {last_model_path}")
-                model.load_weights(last_model_path)
-            else:
-                last_model_path = str(sorted(saved_models)[-1])
-                self._logger.info(f"Load lgb model from {last_model_path}")
-                with open(last_model_path, 'rb') as f:
-                    model = pickle.load(f)
+            last_model_path = str(sorted(saved_models)[-1])
+            self._logger.info(f"Load {backend.module_name} model from {last_model_path}")
+            model = backend.load(model, last_model_path)
 
         except Exception as e:
             self._logger.warning(f'Error loading last model. It\'s ok if the model architecture is changed. Error: {e}')
 
         return model
 
-    def save_model(self, model):
-        model_path = str(Path(self.model_dir, datetime.utcnow().isoformat()))
-        if isinstance(model, Model):
-            # Save keras
-            self._logger.debug(f"Save keras model to {model_path}")
-            model.save_weights(model_path)
+    def load_last_pipes(self) -> (any, any):
+        """ Fitted X_pipe, y_pipe saved with last model. (None, None) if not found"""
+        try:
+            saved_pipes = glob.glob(str(Path(self.model_dir, f"*{self.pipes_suffix}")))
+            if saved_pipes:
+                last_pipes_path = sorted(saved_pipes)[-1]
+                self._logger.info(f"Load pipes from {last_pipes_path}")
+                with open(last_pipes_path, "rb") as f:
+                    return pickle.load(f)
+        except Exception as e:
+            self._logger.warning(f"Error loading last pipes. {e}")
+        return None, None
 
-        elif isinstance(model, MultiOutputRegressor) and isinstance(model.estimator, LGBMRegressor):
-            # Save lgb
-            model_path += "_lgb.pkl"
-            with open(model_path, 'wb') as f:
-                pickle.dump(model, f)
-                self._logger.debug(f"Saved lgb  model to {model_path}")
+    def save_model(self, model, pipes: (any, any) = None):
+        """ Serialize the model and X_pipe, y_pipe fitted for it.
+        Write them to disk, in background if async save is on """
+        backend = ModelBackends.of(model)
+        if not backend:
+            return
+        data = backend.dumps(model)
+        pipes_data = pickle.dumps(pipes) if pipes else None
+        if not self.is_async_save:
+            self.write_model(backend, data, pipes_data)
+            return
 
+        with self._save_cond:
+            if self._pending_save:
+                self._logger.debug("Previous model is not written yet, replacing it with the new one")
+            self._pending_save = (backend, data, pipes_data)
+            if not self._writer:
+                self._writer = Thread(target=self.write_loop, daemon=True)
+                self._writer.start()
+            self._save_cond.notify_all()
+
+    def write_loop(self):
+        MetricServer.bind_strategy(self.tag)
+        while True:
+            with self._save_cond:
+                self._save_cond.wait_for(lambda: self._pending_save)
+                (backend, data, pipes_data), self._pending_save = self._pending_save, None
+                self._is_writing = True
+            try:
+                self.write_model(backend, data, pipes_data)
+            except Exception as e:
+                self._logger.error(f"Cannot write model. {e}")
+            finally:
+                with self._save_cond:
+                    self._is_writing = False
+                    self._save_cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """ Wait until pending model is written
+        :return False if timed out"""
+        with self._save_cond:
+            return self._save_cond.wait_for(lambda: not self._pending_save and not self._is_writing, timeout)
+
+    def write_model(self, backend: ModelBackend, data: bytes, pipes_data: bytes = None):
+        """ Write serialized model and pipes. Pipes are written first, so the model is never loaded without them """
+        data_hash = hashlib.sha1(data + (pipes_data or b"")).hexdigest()
+        if data_hash == self.last_saved_hash:
+            self._logger.debug("Model is not changed, skip saving")
+            return
+
+        start_time = time.perf_counter()
+        path_prefix = str(Path(self.model_dir, datetime.utcnow().isoformat()))
+        if pipes_data:
+            self.write_atomic(path_prefix + self.pipes_suffix, pipes_data)
+        model_path = path_prefix + backend.suffix
+        if self.is_compressed_save:
+            data = gzip.compress(data, compresslevel=1)
+            model_path += ".gz"
+        self.write_atomic(model_path, data)
+        self.last_saved_hash = data_hash
         self.purge_old_models()
 
+        duration = time.perf_counter() - start_time
+        self._logger.debug(f"Saved {backend.module_name} model to {model_path}, {len(data)} bytes in {duration:.3f}s")
+        MetricServer.metrics.strategy.learn.model_save_duration_sec.set(duration)
+        MetricServer.metrics.strategy.learn.model_save_bytes.set(len(data))
+
+    @staticmethod
+    def write_atomic(path: str, data: bytes):
+        """ Write to temp file and rename it, so partially written file is never read """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
     def purge_old_models(self, keep_count=1):
         """
         Purge old weights
         """
-        keep_files_count = keep_count * 2 + 1  # .data, .index for each weight and one checkpoint file
+        keep_files_count = keep_count * 2 + 1  # model and pipes for each save, one extra file in case pipes absent
         files = os.listdir(self.model_dir)
         if files:
             purge_files = sorted(files, reverse=True)[keep_files_count:]
@@ -80,28 +185,109 @@ class ModelPersister:
                 os.remove(os.path.join(self.model_dir, file))
             self._logger.debug(f"Purged {len(purge_files)} files in {self.model_dir}")
 
-    def get_last_trade_ready_model(self, model_name, load_func=mlflow.sklearn.load_model) -> (any, any, dict):
+    def get_last_trade_ready_model(self, model_name, load_func=None) -> (any, any, dict):
         """ Load latest model and it's params from mlflow. The model should be tagged trade_ready.
         :return model, mlflow ModelVersion, params"""
         model, model_version, params = None, None, None
         try:
-            trade_ready_tag = "is_trade_ready"
-            self._logger.debug(f"Getting latest trade ready model: {model_name} from {self.mlflow_client.tracking_uri}")
-            # Get last trade ready model version, tagged as trade ready
-            model_versions = self.mlflow_client.search_model_versions(
-                f"name = '{model_name}' and tag.{trade_ready_tag} = 'True'",
-                order_by=["version_number desc"], max_results=1)
-            if model_versions:
-                model_version = model_versions.pop()
-                self._logger.debug(f"Got model: {model_version.source}")
-                model = load_func(model_version.source)
-
-                # Get run parameters
-                params = self.mlflow_client.get_run(model_version.run_id).data.params
-                self._logger.debug(f"Got strategy parameters: {params}")
-            else:
-                self._logger.debug(f"Model: {model_name} not found")
+            model_version = self.get_last_trade_ready_version(model_name)
+            if model_version:
+                model = self.load_model_version(model_version.source, load_func)
+                params = self.get_model_params(model_version)
         except Exception as e:
             self._logger.error(e)
 
         return model, model_version, params
+
+    def get_last_trade_ready_version(self, model_name):
+        """ Metadata of latest model version tagged trade ready, model itself is not loaded.
+        :return mlflow ModelVersion or None"""
+        if not self.is_mlflow_enabled:
+            return None
+        trade_ready_tag = "is_trade_ready"
+        self._logger.debug(f"Getting latest trade ready model: {model_name} from {self.mlflow_client.tracking_uri}")
+        # Get last trade ready model version, tagged as trade ready
+        model_versions = self.mlflow_client.search_model_versions(
+            f"name = '{model_name}' and tag.{trade_ready_tag} = 'True'",
+            order_by=["version_number desc"], max_results=1)
+        if not model_versions:
+            self._logger.debug(f"Model: {model_name} not found")
+            return None
+        return model_versions.pop()
+
+    def get_model_version(self, model_name, version):
+        """ Metadata of given model version, trade ready or not
+        :return mlflow ModelVersion"""
+        return self.mlflow_client.get_model_version(model_name, str(version))
+
+    def load_model_version(self, path: str, load_func=None):
+        """ Deserialize mlflow model from artifacts uri or local path """
+        if not load_func:
+            import mlflow.sklearn
+            load_func = mlflow.sklearn.load_model
+        self._logger.debug(f"Loading model: {path}")
+        return load_func(path)
+
+    def download_model_version(self, model_version, dst_dir: str) -> str:
+        """ Download model version artifacts to local dir
+        :return local path of the model"""
+        import mlflow.artifacts
+        self._logger.debug(f"Downloading model {model_version.source} to {dst_dir}")
+        return mlflow.artifacts.download_artifacts(artifact_uri=model_version.source, dst_path=dst_dir)
+
+    def get_model_params(self, model_version) -> dict:
+        """ Strategy parameters of the run which produced the model version """
+        params = self.mlflow_client.get_run(model_version.run_id).data.params
+        self._logger.debug(f"Got strategy parameters: {params}")
+        return params
+
+    def log_model_version(self, model_name: str, model, pipes: (any, any), params: dict = None):
+        """ Log the model with its X, y pipes and strategy params to a new mlflow run, register it as a new version.
+        The version is not tagged trade ready, it is tagged after evaluation.
+        :return mlflow ModelVersion"""
+        import mlflow.sklearn
+        from mlflow.entities import Param
+        from mlflow.exceptions import MlflowException
+        client = self.mlflow_client
+        experiment = client.get_experiment_by_name(model_name)
+        experiment_id = experiment.experiment_id if experiment else client.create_experiment(model_name)
+        run_id = client.create_run(experiment_id).info.run_id
+        try:
+            if params:
+                client.log_batch(run_id, params=[Param(name, str(value)) for name, value in params.items()])
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                model_dir = str(Path(tmp_dir, self.model_artifact))
+                mlflow.sklearn.save_model(model, model_dir)
+                client.log_artifacts(run_id, model_dir, self.model_artifact)
+            self.log_pipes(run_id, pipes)
+        finally:
+            client.set_terminated(run_id)
+        try:
+            client.create_registered_model(model_name)
+        except MlflowException:
+            # Already registered
+            pass
+        source = f"{client.get_run(run_id).info.artifact_uri}/{self.model_artifact}"
+        model_version = client.create_model_version(model_name, source, run_id)
+        self._logger.info(f"Logged model {model_name} v{model_version.version}")
+        return model_version
+
+    def log_pipes(self, run_id: str, pipes: (any, any)):
+        """ Store fitted X_pipe, y_pipe in mlflow run of the model, to be versioned together with the model """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir, self.pipes_artifact)
+            path.write_bytes(pickle.dumps(pipes))
+            self.mlflow_client.log_artifact(run_id, str(path))
+
+    def load_version_pipes(self, model_version, dst_dir: str = None) -> (any, any):
+        """ X_pipe, y_pipe logged in the run of model version, (None, None) if the run has no pipes.
+        Cached in dst_dir if given."""
+        path = Path(dst_dir, self.pipes_artifact) if dst_dir else None
+        try:
+            if not (path and path.exists()):
+                path = self.mlflow_client.download_artifacts(model_version.run_id, self.pipes_artifact, dst_dir)
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            self._logger.info(f"No pipes for model {model_version.name} v{model_version.version}. {e}")
+        return None, None
@@ -0,0 +1,83 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from strategy.persist.FeatureStore import FeatureStore
+
+
+class TestFeatureStore(TestCase):
+
+    @staticmethod
+    def new_df(start: str, n: int, columns=("a", "b")) -> pd.DataFrame:
+        index = pd.date_range(start, periods=n, freq="1s", name="datetime")
+        return pd.DataFrame(np.arange(n * len(columns)).reshape(n, len(columns)), index=index, columns=list(columns))
+
+    def test_append__only_new_rows(self):
+        with tempfile.TemporaryDirectory() as store_dir:
+            store = FeatureStore(store_dir)
+            self.assertIsNone(store.last_time("X"))
+            store.append("X", self.new_df("2023-01-01 00:00:00", 3))
+            # Rows 00:00:01, 00:00:02 are already stored
+            self.assertTrue(store.append("X", self.new_df("2023-01-01 00:00:01", 4)))
+
+            actual = store.read("X")
+            self.assertEqual(5, store.size("X"))
+            self.assertEqual(pd.Timestamp("2023-01-01 00:00:04"), store.last_time("X"))
+            self.assertListEqual(pd.date_range("2023-01-01", periods=5, freq="1s").tolist(), actual.index.tolist())
+            self.assertListEqual([0, 1, 2, 3, 4, 5, 4, 5, 6, 7], actual.to_numpy().ravel().tolist())
+
+    def test_append__columns_changed_should_reset(self):
+        with tempfile.TemporaryDirectory() as store_dir:
+            store = FeatureStore(store_dir)
+            store.append("X", self.new_df("2023-01-01 00:00:00", 3))
+            self.assertFalse(store.append("X", self.new_df("2023-01-01 00:00:05", 2, ("a", "c"))))
+            self.assertListEqual(["a", "c"], store.columns("X"))
+            self.assertEqual(2, store.size("X"))
+
+    def test_read__since_is_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as store_dir:
+            store = FeatureStore(store_dir)
+            store.append("X", self.new_df("2023-01-01 00:00:00", 10))
+            actual = store.read("X", pd.Timestamp("2023-01-01 00:00:06"))
+
+            self.assertEqual(3, len(actual))
+            # Values are a view of memory mapped file, not a copy
+            values = actual.to_numpy(copy=False)
+            while values.base is not None and not isinstance(values, np.memmap):
+                values = values.base
+            self.assertIsInstance(values, np.memmap)
+
+    def test_read_xy__aligned_by_time(self):
+        with tempfile.TemporaryDirectory() as store_dir:
+            store = FeatureStore(store_dir)
+            store.append("X", self.new_df("2023-01-01 00:00:00", 10))
+            # Targets are known for first rows only
+            store.append("y", self.new_df("2023-01-01 00:00:00", 6, ("y1",)))
+
+            X, y = store.read_xy(pd.Timestamp("2023-01-01 00:00:01"))
+            self.assertListEqual(X.index.tolist(), y.index.tolist())
+            self.assertEqual(4, len(X))
+
+    def test_compact(self):
+        with tempfile.TemporaryDirectory() as store_dir:
+            store = FeatureStore(store_dir, max_rows=3)
+            store.append("X", self.new_df("2023-01-01 00:00:00", 7))
+            self.assertEqual(3, store.size("X"))
+            self.assertEqual(pd.Timestamp("2023-01-01 00:00:06"), store.last_time("X"))
+            self.assertListEqual([8, 9, 10, 11, 12, 13], store.read("X").to_numpy().ravel().tolist())
+
+    def test_cleanup__temp_dir_removed(self):
+        store = FeatureStore(None)
+        store.append("X", self.new_df("2023-01-01 00:00:00", 2))
+        store.cleanup()
+        self.assertFalse(os.path.exists(store.store_dir))
+
+    def test_cleanup__store_dir_kept(self):
+        with tempfile.TemporaryDirectory() as store_dir:
+            store = FeatureStore(store_dir)
+            store.append("X", self.new_df("2023-01-01 00:00:00", 2))
+            store.cleanup()
+            self.assertTrue(os.path.exists(store.paths("X")[0]))
@@ -0,0 +1,67 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import lightgbm as lgb
+import numpy as np
+from keras import Sequential, Input
+from keras.layers import Dense
+from sklearn.multioutput import MultiOutputRegressor
+
+from strategy.persist.ModelBackends import ModelBackends, LgbBackend, KerasBackend
+
+
+class TestModelBackends(TestCase):
+
+    @staticmethod
+    def new_keras_model():
+        model = Sequential()
+        model.add(Input(shape=(2,)))
+        model.add(Dense(1))
+        return model
+
+    def test_of_lgb(self):
+        self.assertIsInstance(ModelBackends.of(MultiOutputRegressor(lgb.LGBMRegressor())), LgbBackend)
+        self.assertIsInstance(ModelBackends.of(lgb.LGBMRegressor()), LgbBackend)
+
+    def test_of_keras(self):
+        self.assertIsInstance(ModelBackends.of(self.new_keras_model()), KerasBackend)
+
+    def test_of_unknown(self):
+        self.assertIsNone(ModelBackends.of(object()))
+        self.assertIsNone(ModelBackends.of(None))
+
+    def test_of_file(self):
+        self.assertIsInstance(ModelBackends.of_file("2024-01-01T00:00:00_lgb.pkl"), LgbBackend)
+        self.assertIsInstance(ModelBackends.of_file("2024-01-01T00:00:00.weights.npz"), KerasBackend)
+        self.assertIsNone(ModelBackends.of_file("unknown.txt"))
+
+    def test_save_load_lgb(self):
+        X, y = np.random.rand(50, 2), np.random.rand(50, 2)
+        model = MultiOutputRegressor(lgb.LGBMRegressor(verbose=-1, n_estimators=2)).fit(X, y)
+        backend = ModelBackends.of(model)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = backend.save(model, str(Path(tmpdir, "model")))
+            loaded = backend.load(None, path)
+        self.assertTrue(np.array_equal(model.predict(X), loaded.predict(X)))
+
+    def test_save_load_keras(self):
+        model, loaded = self.new_keras_model(), self.new_keras_model()
+        backend = ModelBackends.of(model)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = backend.save(model, str(Path(tmpdir, "model")))
+            loaded = backend.load(loaded, path)
+        for expected, actual in zip(model.get_weights(), loaded.get_weights()):
+            self.assertTrue(np.array_equal(expected, actual))
+
+    def test_clear_session_keeps_live_keras_model(self):
+        model = self.new_keras_model()
+        x = np.random.rand(3, 2)
+        y_pred = KerasBackend().predict(model, x)
+        dense_name = Dense(1).name
+
+        KerasBackend().clear_session()
+
+        # Live model still predicts and keras layer names are not reset
+        self.assertTrue(np.array_equal(y_pred, KerasBackend().predict(model, x)))
+        self.assertNotEqual(dense_name, Dense(1).name)
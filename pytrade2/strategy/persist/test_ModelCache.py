@@ -0,0 +1,110 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from strategy.persist.ModelCache import ModelCache
+
+
+class TestModelCache(TestCase):
+
+    @staticmethod
+    def new_version(version: int):
+        model_version = MagicMock()
+        model_version.version = str(version)
+        model_version.source = f"mlflow://model/{version}"
+        return model_version
+
+    @staticmethod
+    def new_persister():
+        persister = MagicMock()
+
+        def download(model_version, dst_dir):
+            path = Path(dst_dir, "model")
+            path.mkdir()
+            Path(path, "model.pkl").write_text(model_version.version)
+            return str(path)
+
+        persister.download_model_version.side_effect = download
+        persister.load_model_version.side_effect = lambda path: f"model from {path}"
+        persister.get_model_params.return_value = {"param1": "1"}
+        persister.load_version_pipes.return_value = ("x_pipe", "y_pipe")
+        return persister
+
+    def test_refresh__new_version(self):
+        persister = self.new_persister()
+        persister.get_last_trade_ready_version.return_value = self.new_version(1)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ModelCache(persister, "model1", cache_dir)
+            cache.refresh()
+
+            model, model_version, params, pipes = cache.latest
+            expected_path = str(Path(cache_dir, "model1", "1"))
+            self.assertEqual(f"model from {expected_path}", model)
+            self.assertEqual("1", model_version.version)
+            self.assertEqual({"param1": "1"}, params)
+            self.assertEqual(("x_pipe", "y_pipe"), pipes)
+            persister.load_version_pipes.assert_called_once_with(model_version, expected_path)
+            self.assertEqual("1", Path(expected_path, "model.pkl").read_text())
+
+    def test_refresh__same_version_not_loaded_again(self):
+        persister = self.new_persister()
+        persister.get_last_trade_ready_version.return_value = self.new_version(1)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ModelCache(persister, "model1", cache_dir)
+            cache.refresh()
+            cache.refresh()
+
+        self.assertEqual(1, persister.download_model_version.call_count)
+        self.assertEqual(1, persister.load_model_version.call_count)
+
+    def test_refresh__cached_version_not_downloaded(self):
+        persister = self.new_persister()
+        persister.get_last_trade_ready_version.return_value = self.new_version(1)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            Path(cache_dir, "model1", "1").mkdir(parents=True)
+            ModelCache(persister, "model1", cache_dir).refresh()
+
+        persister.download_model_version.assert_not_called()
+        persister.load_model_version.assert_called_once()
+
+    def test_refresh__keep_last_versions(self):
+        persister = self.new_persister()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ModelCache(persister, "model1", cache_dir, keep_count=2)
+            for version in range(1, 5):
+                persister.get_last_trade_ready_version.return_value = self.new_version(version)
+                cache.refresh()
+
+            self.assertEqual(["3", "4"], sorted(os.listdir(Path(cache_dir, "model1"))))
+            self.assertEqual("4", cache.latest[1].version)
+
+    def test_refresh__on_new_version(self):
+        persister = self.new_persister()
+        persister.get_last_trade_ready_version.return_value = self.new_version(1)
+        on_new_version = MagicMock()
+        cache = ModelCache(persister, "model1", None, on_new_version=on_new_version)
+        cache.refresh()
+        cache.refresh()
+
+        on_new_version.assert_called_once_with(*cache.latest)
+
+    def test_refresh__error_keeps_latest(self):
+        persister = self.new_persister()
+        persister.get_last_trade_ready_version.return_value = self.new_version(1)
+        cache = ModelCache(persister, "model1", None)
+        cache.refresh()
+
+        persister.get_last_trade_ready_version.side_effect = Exception("mlflow is down")
+        cache.refresh()
+
+        self.assertEqual("1", cache.latest[1].version)
+        # No cache dir: loaded from source
+        persister.load_model_version.assert_called_once_with("mlflow://model/1")
+
+    def test_start__mlflow_disabled(self):
+        persister = self.new_persister()
+        persister.is_mlflow_enabled = False
+        ModelCache(persister, "model1", None).start()
+        persister.get_last_trade_ready_version.assert_not_called()
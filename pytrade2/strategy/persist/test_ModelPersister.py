@@ -0,0 +1,100 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import lightgbm as lgb
+import numpy as np
+from sklearn.multioutput import MultiOutputRegressor
+
+from metrics.MetricServer import MetricServer
+from strategy.persist.ModelPersister import ModelPersister
+
+
+class TestModelPersister(TestCase):
+    MetricServer.metrics = MagicMock()
+
+    @staticmethod
+    def new_model(n_estimators=2):
+        X, y = np.random.rand(50, 2), np.random.rand(50, 2)
+        return MultiOutputRegressor(lgb.LGBMRegressor(verbose=-1, n_estimators=n_estimators)).fit(X, y)
+
+    @staticmethod
+    def new_persister(data_dir, is_async=True, is_compressed=False):
+        config = {"pytrade2.data.dir": data_dir, "pytrade2.mlflow.enabled": False,
+                  "pytrade2.model.save.async": is_async, "pytrade2.model.save.compress": is_compressed}
+        return ModelPersister(config, "test")
+
+    def test_save_model__async(self):
+        model = self.new_model()
+        with tempfile.TemporaryDirectory() as data_dir:
+            persister = self.new_persister(data_dir)
+            persister.save_model(model)
+            self.assertTrue(persister.flush(timeout=10))
+
+            files = os.listdir(persister.model_dir)
+            self.assertEqual(1, len(files))
+            self.assertTrue(files[0].endswith("_lgb.pkl"))
+            loaded = persister.load_last_model(model)
+        self.assertTrue(np.array_equal(model.estimators_[0].predict([[0.5, 0.5]]),
+                                       loaded.estimators_[0].predict([[0.5, 0.5]])))
+
+    def test_has_last_model(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            persister = self.new_persister(data_dir, is_async=False)
+            self.assertFalse(persister.has_last_model())
+            persister.save_model(self.new_model())
+            self.assertTrue(persister.has_last_model())
+        self.assertFalse(self.new_persister(None).has_last_model())
+
+    def test_save_model__unchanged_skipped(self):
+        model = self.new_model()
+        with tempfile.TemporaryDirectory() as data_dir:
+            persister = self.new_persister(data_dir, is_async=False)
+            persister.save_model(model)
+            files = os.listdir(persister.model_dir)
+            persister.save_model(model)
+            self.assertEqual(files, os.listdir(persister.model_dir))
+
+    def test_save_model__compressed(self):
+        model = self.new_model()
+        with tempfile.TemporaryDirectory() as data_dir:
+            persister = self.new_persister(data_dir, is_async=False, is_compressed=True)
+            persister.save_model(model)
+            files = os.listdir(persister.model_dir)
+            loaded = persister.load_last_model(model)
+
+        self.assertTrue(files[0].endswith("_lgb.pkl.gz"))
+        self.assertEqual(len(model.estimators_), len(loaded.estimators_))
+
+    def test_save_model__with_pipes(self):
+        model = self.new_model()
+        with tempfile.TemporaryDirectory() as data_dir:
+            persister = self.new_persister(data_dir, is_async=False)
+            self.assertEqual((None, None), persister.load_last_pipes())
+
+            persister.save_model(model, ("x_pipe", "y_pipe"))
+
+            self.assertEqual(("x_pipe", "y_pipe"), persister.load_last_pipes())
+            self.assertEqual(2, len(os.listdir(persister.model_dir)))
+
+    def test_log_model_version__pipes_round_trip(self):
+        from mlflow import MlflowClient
+        from sklearn.preprocessing import StandardScaler
+        model = self.new_model()
+        x_pipe, y_pipe = StandardScaler().fit([[1.0], [3.0]]), StandardScaler().fit([[2.0], [6.0]])
+        with tempfile.TemporaryDirectory() as mlflow_dir, tempfile.TemporaryDirectory() as dst_dir:
+            persister = self.new_persister(None)
+            persister._mlflow_client = MlflowClient(tracking_uri=f"file:{mlflow_dir}",
+                                                    registry_uri=f"file:{mlflow_dir}")
+
+            model_version = persister.log_model_version("TestModel", model, (x_pipe, y_pipe), {"param1": 1})
+            loaded_x_pipe, loaded_y_pipe = persister.load_version_pipes(model_version, dst_dir)
+            params = persister.get_model_params(model_version)
+            loaded_model = persister.load_model_version(model_version.source)
+
+        self.assertEqual("1", str(model_version.version))
+        self.assertTrue(np.array_equal(model.predict([[0.5, 0.5]]), loaded_model.predict([[0.5, 0.5]])))
+        self.assertEqual(x_pipe.mean_, loaded_x_pipe.mean_)
+        self.assertEqual(y_pipe.mean_, loaded_y_pipe.mean_)
+        self.assertEqual({"param1": "1"}, params)
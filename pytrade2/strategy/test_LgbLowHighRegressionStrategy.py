@@ -1,11 +1,12 @@
 from datetime import datetime
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pandas as pd
 
 from metrics.MetricServer import MetricServer
 from strategy.LgbLowHighRegressionStrategy import LgbLowHighRegressionStrategy
+from strategy.common.TickerSlot import TickerSlot
 from strategy.feed.CandlesFeed import CandlesFeed
 
 
@@ -34,7 +35,7 @@ class TestLgbLowHighRegressionStrategy(TestCase):
                 "pytrade2.broker.comissionpct": 0
                 }
         CandlesFeed.__init__ = lambda \
-                self, config, ticker, exchange_provider, data_lock, new_data_event, strategy_name: None
+                self, config, ticker, exchange_provider, data_lock, new_data_event, strategy_name, is_ticker_only=False: None
 
         strategy = LgbLowHighRegressionStrategy(config=conf, exchange_provider=MagicMock())
         strategy.candles_feed = MagicMock()
@@ -74,3 +75,80 @@ class TestLgbLowHighRegressionStrategy(TestCase):
         strategy.signal_calc.calc_signal_ext = lambda close, fut_low, fut_high: signal_ext_data
         strategy.process_prediction(y_pred)
         self.assertIsNone(strategy.broker.create_cur_trade.call_args.kwargs["trailing_delta"])
+
+    def test_apply_params__prepared_candles_of_each_ticker(self):
+        strategy = self.new_strategy()
+        strategy.ticker_slots = {"ticker1": TickerSlot("ticker1"), "test": strategy.main_slot}
+        strategy.ticker_slots["ticker1"].candles_feed = MagicMock()
+        strategy.candles_feed.prepare_periods.return_value = "prepared_test"
+        strategy.ticker_slots["ticker1"].candles_feed.prepare_periods.return_value = "prepared_ticker1"
+        params = {"features_candles_periods": "1min,5min", "history_days": 3}
+
+        prepared = strategy.prepare_params(params)
+        strategy.apply_params(params, prepared)
+
+        # Candles of every ticker are prepared in background and only swapped when applied
+        self.assertEqual({"ticker1": "prepared_ticker1", "test": "prepared_test"}, prepared)
+        for ticker, slot in strategy.ticker_slots.items():
+            slot.candles_feed.prepare_periods.assert_called_once_with("1min,5min", 3)
+            slot.candles_feed.apply_prepared_periods.assert_called_once_with(f"prepared_{ticker}")
+            slot.candles_feed.apply_periods.assert_not_called()
+
+    def test_change_key__new_bar(self):
+        strategy = self.new_strategy()
+        candles = pd.DataFrame({"close": [1.0, 2.0]},
+                               index=[pd.Timestamp("2024-01-01 00:01"), pd.Timestamp("2024-01-01 00:02")])
+        strategy.candles_feed.candles_cnt_by_interval = {"1min": 2}
+        strategy.candles_feed.candles_by_interval = {"1min": candles}
+        now = pd.Timestamp("2024-01-01 00:02:30", tz="UTC")
+        with patch("pandas.Timestamp.utcnow", side_effect=lambda: now):
+            key = strategy.change_key()
+            # Same bar a bit later
+            now = pd.Timestamp("2024-01-01 00:02:59", tz="UTC")
+            self.assertEqual(key, strategy.change_key())
+            # New bar closed by clock, not downloaded yet
+            now = pd.Timestamp("2024-01-01 00:03:01", tz="UTC")
+            clock_key = strategy.change_key()
+            self.assertNotEqual(key, clock_key)
+            # New bar received
+            strategy.candles_feed.candles_by_interval = {"1min": pd.concat(
+                [candles, pd.DataFrame({"close": [3.0]}, index=[pd.Timestamp("2024-01-01 00:03")])])}
+            self.assertNotEqual(clock_key, strategy.change_key())
+
+    def test_prepare_last_x__features_under_read_lock(self):
+        strategy = self.new_strategy()
+        strategy.candles_feed.candles_by_interval = {"1min": pd.DataFrame({"close": [1.0]})}
+        lock = strategy.data_lock
+        # Candles are read from downloads without holding the lock
+        strategy.candles_feed.read_candles = MagicMock(side_effect=lambda: self.assertIsNone(lock._writer))
+
+        with patch("strategy.LgbLowHighRegressionStrategy.MultiIndiFeatures.multi_indi_features_last",
+                   side_effect=lambda candles: lock._read_depth()) as features:
+            read_depth = strategy.prepare_last_x()
+
+        strategy.candles_feed.read_candles.assert_called_once()
+        features.assert_called_once()
+        self.assertEqual(1, read_depth)
+
+    def test_predict_batch__one_model_call(self):
+        strategy = self.new_strategy()
+        strategy.data_persister = MagicMock()
+        strategy.ticker_slots = {"ticker1": TickerSlot("ticker1"), "ticker2": TickerSlot("ticker2")}
+        # Each ticker has own pipes: features scaled and predictions restored in the ticker units
+        for slot, scale in zip(strategy.ticker_slots.values(), (1, 100)):
+            slot.X_pipe, slot.y_pipe = MagicMock(), MagicMock()
+            slot.X_pipe.transform = lambda x, scale=scale: x.to_numpy() / scale
+            slot.y_pipe.inverse_transform = lambda y, scale=scale: y * scale
+        strategy.predict_model = None
+        strategy.model = MagicMock()
+        strategy.model.predict = MagicMock(side_effect=lambda x: x.repeat(2, axis=1) * [-1, 1])
+        index = pd.DatetimeIndex(["2024-01-01 00:01", "2024-01-01 00:02"])
+
+        y_preds = strategy.predict_batch({"ticker1": pd.DataFrame({"x": [0.0, 1.0]}, index=index),
+                                          "ticker2": pd.DataFrame({"x": [0.0, 200.0]}, index=index)})
+
+        strategy.model.predict.assert_called_once()
+        self.assertListEqual([[1.0], [2.0]], strategy.model.predict.call_args.args[0].tolist())
+        self.assertListEqual([-1.0, 1.0], y_preds["ticker1"].iloc[-1].tolist())
+        self.assertListEqual([-200.0, 200.0], y_preds["ticker2"].iloc[-1].tolist())
+        self.assertEqual(index[-1], y_preds["ticker2"].index[-1])
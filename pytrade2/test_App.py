@@ -1,7 +1,58 @@
 from unittest import TestCase
+from unittest.mock import MagicMock
+
+from App import App
 
 
 class TestApp(TestCase):
     def test__placeholder(self):
         """ Empty test to help IDE to autodetect tests in subfolders """
         ...
+
+    @staticmethod
+    def new_host_app(configs: dict) -> App:
+        """ App of host process without reading config files and args """
+        app = App.__new__(App)
+        app._logger = MagicMock()
+        app.config = {"pytrade2.strategies": ",".join(configs)}
+        app._load_config = lambda strategy: dict(configs[strategy])
+        app._create_strategy = lambda config, exchange: (config, exchange)
+        return app
+
+    def test_create_host_strategies__feeds_of_all_strategies(self):
+        app = self.new_host_app({
+            "Strategy1": {"pytrade2.strategy": "Strategy1", "pytrade2.tickers": "BTC-USDT",
+                          "pytrade2.feed.candles.periods": "1min,5min"},
+            "Strategy2": {"pytrade2.strategy": "Strategy2", "pytrade2.tickers": "ETH-USDT,BTC-USDT",
+                          "pytrade2.feed.candles.periods": "[5min, 15min]"}})
+
+        strategies = app._create_host_strategies()
+
+        # Host exchange subscribes to tickers and periods of all strategies
+        self.assertEqual("BTC-USDT,ETH-USDT", app.config["pytrade2.tickers"])
+        self.assertEqual("1min,5min,15min", app.config["pytrade2.feed.candles.periods"])
+        # Each strategy keeps own config and exchange provider, sharing exchanges and feeds of the host
+        (config1, exchange1), (config2, exchange2) = strategies
+        self.assertEqual(("Strategy1", "BTC-USDT"), (config1["pytrade2.strategy"], config1["pytrade2.tickers"]))
+        self.assertEqual(("Strategy2", "ETH-USDT,BTC-USDT"),
+                         (config2["pytrade2.strategy"], config2["pytrade2.tickers"]))
+        self.assertTrue(config1["pytrade2.host.feeds.shared"] and config2["pytrade2.host.feeds.shared"])
+        self.assertIs(config2, exchange2.config)
+        self.assertIs(exchange1.host, exchange2.host)
+        self.assertIs(exchange1.exchanges, exchange2.exchanges)
+        self.assertIsNotNone(exchange1.shared_feeds)
+        self.assertIs(exchange1.shared_feeds, exchange2.shared_feeds)
+
+    def test_create_host_strategies__no_candles_periods(self):
+        app = self.new_host_app({"Strategy1": {"pytrade2.tickers": "BTC-USDT"},
+                                 "Strategy2": {"pytrade2.tickers": "BTC-USDT"}})
+
+        app._create_host_strategies()
+
+        self.assertEqual("BTC-USDT", app.config["pytrade2.tickers"])
+        self.assertNotIn("pytrade2.feed.candles.periods", app.config)
+
+    def test_union_of(self):
+        configs = [{"key": "a, b"}, {"key": "['b', 'c']"}, {"key": None}, {}]
+        self.assertEqual("a,b,c", App.union_of(configs, "key"))
+        self.assertEqual("", App.union_of([{}], "key"))